@@ -0,0 +1,105 @@
+'''
+Non-interactive batch mode for the calculator.
+
+Reads '<operation> <num1> <num2>' commands from a file or stdin and writes
+one result per line, without any prompts. Commands are parsed exactly like
+in the REPL. Invalid lines are reported to stderr with their line number
+and the stream keeps going.
+
+Usage:
+    python main.py --batch commands.txt
+    cat commands.txt | python main.py --batch -
+'''
+
+import logging
+import sys
+from typing import Iterable, Iterator, TextIO, Tuple
+from app.config import configure_logging
+from app.calculator import parse_calculation
+from app.calculation import Calculation
+from app.history_manager import History
+from app.metrics import configure_metrics
+from app.operations import DivisionByZeroError
+from app.result_cache import configure_cache
+
+# Number of result lines collected before they are written out in one go
+WRITE_CHUNK_LINES = 4096
+
+# Buffer size used for the input and output streams
+BUFFER_SIZE = 1 << 20
+
+def read_commands(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    '''
+    Generator that yields (line number, command) for every non-empty line.
+    Lines are read lazily, so the whole input never sits in memory.
+    '''
+    for line_number, line in enumerate(lines, start=1):
+        command = line.strip()
+        if command:
+            yield line_number, command
+
+def run_batch(commands: Iterable[Tuple[int, str]], output: TextIO, errors: TextIO,
+              history: History = None) -> int:
+    '''
+    Evaluates every command and writes one result per line to 'output'.
+    Errors are written to 'errors' as 'line <n>: <message>'.
+    Stops early at an 'exit' command.
+    Records calculations in 'history' if one is given.
+    Returns the number of lines that failed.
+    '''
+    failed = 0
+    chunk = []  # Results waiting to be written
+
+    for line_number, command in commands:
+        if command.lower() == 'exit':
+            break
+
+        try:
+            operation, num1, num2 = parse_calculation(command)
+            result = Calculation(operation, num1, num2).perform_operation()
+        except ValueError as e:
+            # Report the bad line and keep going with the rest of the stream
+            logging.error("Invalid input or error on line %s: %s", line_number, e)
+            errors.write(f"line {line_number}: {e}\n")
+            failed += 1
+            if history is not None and isinstance(e, DivisionByZeroError):
+                history.record_division_error()
+            continue
+
+        chunk.append(f"{result}\n")
+        if len(chunk) >= WRITE_CHUNK_LINES:
+            output.write(''.join(chunk))
+            chunk.clear()
+
+        if history is not None:
+            history.add_to_history(operation, num1, num2, result)
+
+    output.write(''.join(chunk))
+    output.flush()
+    return failed
+
+def batch(source: str, record_history: bool = True) -> int:
+    '''
+    Runs the batch mode on a file path, or on stdin if 'source' is '-'.
+    Results go to stdout through a large buffered writer.
+    Returns the number of lines that failed.
+    '''
+    configure_logging()
+    configure_cache()  # Repeated lines are answered from the cache if it is on
+    configure_metrics()
+
+    # Write-behind keeps the history file open instead of reopening it per line
+    history = History(write_behind=True) if record_history else None
+
+    # Buffered writer on stdout's file descriptor, so results are not flushed per line
+    with open(sys.stdout.fileno(), mode='w', buffering=BUFFER_SIZE,
+              encoding='utf-8', closefd=False) as output:
+        try:
+            if source == '-':
+                return run_batch(read_commands(sys.stdin), output, sys.stderr, history)
+
+            with open(source, mode='r', buffering=BUFFER_SIZE, encoding='utf-8') as file:
+                return run_batch(read_commands(file), output, sys.stderr, history)
+        finally:
+            if history is not None:
+                history.close()  # Write out any queued history
@@ -1,18 +1,35 @@
 '''
 Uses OperationTemplate class provided by Operation_Factory to perform operations.
+Results come from the result cache when memoization is turned on.
+
+- Calculation:      one immutable calculation that keeps its result once performed.
+- CalculationBatch: many calculations stored column by column
+                    (opcode and operands in flat arrays) and evaluated in bulk.
 '''
-from dataclasses import dataclass
-from app.operations import OperationTemplate
+from __future__ import annotations
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+from app.metrics import timed
+from app.operations import OperationTemplate, OPERATIONS
+from app.result_cache import cached_calculate
+
+if TYPE_CHECKING:  # NumPy is only imported once a batch is evaluated
+    import numpy as np
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Calculation:
     '''
     Runs calculate method on operands.
     Decorator automatically generates __init__ methods.
+    Frozen and slotted: no per-instance __dict__, and fields cannot change.
+    The result is stored the first time it is calculated.
     '''
     operation: OperationTemplate  # operation to perform (add, subtract, etc.)
     operand1: float  # first operand
     operand2: float  # second operand
+    result: Optional[float] = field(default=None, compare=False)  # set once performed
 
     def __repr__(self) -> str:
         '''String representation for debugging & logging'''
@@ -22,12 +39,128 @@ class Calculation:
 
     def __str__(self) -> str:
         '''String representation for users'''
-        result = self.operation.calculate(self.operand1, self.operand2)  # Perform the calculation
+        result = self.perform_operation()  # Reuses the stored result
         return (
             f"{self.operand1} {self.operation} {self.operand2} = {result}"
         )
 
+    @timed('perform_operation', lambda self: repr(self.operation))
     def perform_operation(self):
         '''Performs operation with provided operands, delegates to operation'''
-        result = self.operation.calculate(self.operand1, self.operand2)  # Perform the calculation
-        return result  # return result
+        if self.result is None:
+            # Perform the calculation (or look it up) and keep the result
+            result = cached_calculate(self.operation, self.operand1, self.operand2)
+            object.__setattr__(self, 'result', result)
+        return self.result  # return result
+
+def _operations_by_opcode() -> dict:
+    '''Maps every registered opcode to its shared operation instance.'''
+    return {op.opcode: op for op in OPERATIONS.values() if op.opcode is not None}
+
+class CalculationBatch:
+    '''
+    Struct-of-arrays container for many calculations.
+
+    Columns are flat arrays instead of one object per calculation:
+        opcodes  : array('B')  1 byte per calculation
+        operand1 : array('d')  8 bytes per calculation
+        operand2 : array('d')  8 bytes per calculation
+        results  : array('d')  8 bytes per calculation, NaN until evaluated
+
+    Supports len(), iteration and indexing (both yield Calculation objects),
+    slicing (yields a new batch) and evaluate() to calculate every row at once.
+    '''
+    def __init__(self, opcodes: Iterable[int] = (), operand1: Iterable[float] = (),
+                 operand2: Iterable[float] = ()):
+        self.opcodes = array('B', opcodes)
+        self.operand1 = array('d', operand1)
+        self.operand2 = array('d', operand2)
+        if not len(self.opcodes) == len(self.operand1) == len(self.operand2):
+            raise ValueError("All columns must have the same length.")
+        self.results = array('d', [float('nan')]) * len(self.opcodes)
+
+    @classmethod
+    def from_calculations(cls, calculations: Iterable[Calculation]) -> CalculationBatch:
+        '''Builds a batch from Calculation objects, keeping results already performed.'''
+        batch = cls()
+        for calculation in calculations:
+            batch.append(calculation.operation, calculation.operand1, calculation.operand2)
+            if calculation.result is not None:
+                batch.results[-1] = calculation.result
+        return batch
+
+    def append(self, operation: OperationTemplate, operand1: float, operand2: float):
+        '''
+        Adds one calculation to the end of the batch.
+        Raises ValueError if the operation has no opcode.
+        '''
+        if operation.opcode is None:
+            raise ValueError(f"Operation {operation} has no opcode.")
+        self.opcodes.append(operation.opcode)
+        self.operand1.append(operand1)
+        self.operand2.append(operand2)
+        self.results.append(float('nan'))
+
+    def evaluate(self, zero_division: str = 'raise') -> np.ndarray:
+        '''
+        Calculates every row with one calculate_many call per operation
+        and stores the results. Returns the results as a NumPy array.
+        'zero_division' is passed on to calculate_many ('raise', 'nan' or 'mask');
+        with 'mask' the returned array masks the pairs that divided by zero.
+        '''
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        # Zero-copy NumPy views over the columns
+        opcodes = np.frombuffer(self.opcodes, dtype=np.uint8)
+        operand1 = np.frombuffer(self.operand1, dtype=np.float64)
+        operand2 = np.frombuffer(self.operand2, dtype=np.float64)
+        results = np.full(len(self), np.nan)
+        mask = np.zeros(len(self), dtype=bool)
+
+        operations = _operations_by_opcode()
+        for opcode in np.unique(opcodes):
+            if int(opcode) not in operations:
+                raise ValueError(f"Unknown opcode: {opcode}.")
+            rows = opcodes == opcode
+            calculated = operations[int(opcode)].calculate_many(
+                operand1[rows], operand2[rows], zero_division
+            )
+            results[rows] = np.ma.filled(calculated, np.nan)
+            mask[rows] = np.ma.getmaskarray(calculated)
+
+        # Only stored once every operation succeeded
+        np.frombuffer(self.results, dtype=np.float64)[:] = results
+        if zero_division == 'mask':
+            return np.ma.masked_array(results, mask=mask)
+        return results
+
+    @property
+    def nbytes(self) -> int:
+        '''Memory used by the columns, in bytes.'''
+        return sum(column.itemsize * len(column) for column in
+                   (self.opcodes, self.operand1, self.operand2, self.results))
+
+    def _calculation(self, index: int, operations: dict) -> Calculation:
+        '''Builds the Calculation for one row.'''
+        result = self.results[index]
+        return Calculation(operations[self.opcodes[index]], self.operand1[index],
+                           self.operand2[index], None if math.isnan(result) else result)
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def __iter__(self) -> Iterator[Calculation]:
+        operations = _operations_by_opcode()
+        for index in range(len(self)):
+            yield self._calculation(index, operations)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Calculation, CalculationBatch]:
+        if isinstance(index, slice):
+            batch = CalculationBatch(self.opcodes[index], self.operand1[index],
+                                     self.operand2[index])
+            batch.results = self.results[index]
+            return batch
+        return self._calculation(range(len(self))[index], _operations_by_opcode())
+
+    def __repr__(self) -> str:
+        return f"CalculationBatch({len(self)} calculations)"
@@ -1,16 +1,128 @@
 '''
 User can interact with this calculator in the terminal to perform basic
-arithmetic operations: addition, subtraction, multiplication, and division.
+arithmetic operations: addition, subtraction, multiplication, division,
+power, modulo and integer division.
 '''
 
 import logging
-import logging.config
-import os
-from dotenv import load_dotenv
+from app.config import configure_logging
 from app.operation_factory import OperationFactory
 from app.calculation import Calculation
+from app.operations import DivisionByZeroError
+from app.expression import compile_expression
+from app.metrics import METRICS, configure_metrics
+from app.result_cache import configure_cache
 from app.history_manager import History
 
+def parse_calculation(user_input: str):
+    '''
+    Parses a '<operation> <num1> <num2>' command.
+    Returns the operation instance and both operands as floats.
+    Raises ValueError for invalid input.
+    '''
+    # LBYL - checking user input is correct before trying operations
+    # Split user input into 3 components
+    operation_str, num1_str, num2_str = user_input.split()
+
+    # converting operation_str to lowercase
+    operation_str = operation_str.lower()
+
+    # Convert operands into floats
+    num1, num2 = float(num1_str), float(num2_str)
+
+    # Creat appropriate operation insance based on user input
+    operation = OperationFactory.create_operation(operation_str)
+
+    return operation, num1, num2
+
+def parse_list(command: str):
+    '''
+    Parses a 'list', 'list <count>' or 'list page <number>' command.
+    Returns (count, page), either can be None.
+    Raises ValueError for invalid input.
+    '''
+    args = command.split()[1:]
+
+    if not args:
+        return None, None  # Only this session's history
+    if len(args) == 1 and args[0].isdigit():
+        return int(args[0]), None
+    if len(args) == 2 and args[0] == 'page' and args[1].isdigit() and int(args[1]) > 0:
+        return None, int(args[1])
+
+    raise ValueError("Usage: list [<count> | page <number>]")
+
+def parse_count(command: str) -> int:
+    '''
+    Parses an 'undo', 'undo <count>', 'redo' or 'redo <count>' command.
+    Returns the count, 1 if none is given.
+    Raises ValueError for invalid input.
+    '''
+    name, *args = command.split()
+
+    if not args:
+        return 1
+    if len(args) == 1 and args[0].isdigit() and int(args[0]) > 0:
+        return int(args[0])
+
+    raise ValueError(f"Usage: {name} [<count>]")
+
+def import_file(history: History, args: list):
+    '''Handles 'import <path>' and 'import <path> check|recompute'.'''
+    verify = args[1].lower() if len(args) == 2 else None
+    if len(args) not in (1, 2) or verify not in (None, 'check', 'recompute'):
+        print("Invalid input. Usage: import <path> [check | recompute]")
+        return
+
+    # Imported here so sessions that never import skip the module
+    from app.history_import import import_history  # pylint: disable=import-outside-toplevel
+
+    try:
+        report = import_history(history, args[0], verify)
+    except (OSError, ValueError) as e:
+        logging.error("Could not import history: %s", e)
+        print(f"Could not import history: {e}")
+        return
+    print(f"Imported {report.imported} operations from {args[0]}.")
+    print(f"Skipped {report.duplicates} duplicates, {report.invalid} invalid rows "
+          f"and {report.mismatched} wrong results.")
+
+def export_columns(history: History, args: list):
+    '''Handles 'export' and 'export <directory>'.'''
+    if len(args) > 1:
+        print("Invalid input. Usage: export [<directory>]")
+        return
+
+    # Imported here so sessions that never export skip the module and NumPy
+    from app.history_export import export_history  # pylint: disable=import-outside-toplevel
+
+    try:
+        report = export_history(history, args[0] if args else None)
+    except (OSError, ValueError) as e:
+        logging.error("Could not export history: %s", e)
+        print(f"Could not export history: {e}")
+        return
+    print(f"Exported {report.added} new operations ({report.rows} in total).")
+
+def show_stats(args: list):
+    '''Handles 'stats' (prints the metrics) and 'stats export <file>'.'''
+    if not METRICS.enabled:
+        print("Metrics are off. Set METRICS=True to record them.")
+        return
+
+    if not args:
+        METRICS.print_stats()
+    elif len(args) == 2 and args[0].lower() == 'export':
+        try:
+            METRICS.write_prometheus(args[1])
+        except OSError as e:
+            logging.error("Could not write metrics: %s", e)
+            print(f"Could not write metrics: {e}")
+            return
+        print(f"Metrics written to {args[1]}.")
+    else:
+        print("Invalid input. Usage: stats [export <file>]")
+
 def calculator():
     '''
     Calculator REPL that loops continuously to take user input.
@@ -18,19 +130,22 @@ def calculator():
     Will end once the user types 'exit'.
     '''
 
-    load_dotenv()
+    # Loads the .env file and configures the logger (only once per process)
+    configure_logging()
 
-    if os.getenv('TEST_MODE') != 'True':
-         # Configure logger if TEST_MODE is FALSE
-        logging.config.fileConfig('logging.conf')
+    # Turns on result memoization if RESULT_CACHE_SIZE is set
+    configure_cache()
 
-    logging.getLogger('sampleLogger')
+    # Records latency metrics if METRICS is True
+    configure_metrics()
 
     # Flag to track calculator's start
     start = False
 
     history = History() # Create history instance
 
+    variables = {}  # 'ans' holds the last result for expressions
+
     print("Welcome to the calculator! Type 'help' for a list of commands.")
 
     # Start REPL
@@ -48,40 +163,98 @@ def calculator():
             print("    ✶ subtract <num1> <num2>    : Subtracts two numbers.")
             print("    ✶ multiply <num1> <num2>    : Multiplies two numbers.")
             print("    ✶ divide   <num1> <num2>    : Divides two numbers.")
+            print("    ✶ power    <num1> <num2>    : Raises num1 to the power of num2.")
+            print("    ✶ modulo   <num1> <num2>    : Remainder of num1 divided by num2.")
+            print("    ✶ intdivide <num1> <num2>   : Divides two numbers, rounded down.")
+            print("    ✶ eval     <expression>     : Calculates an expression, e.g. (3 + 4) * ans.")
             print("    ✶ list                      : Shows operation history.")
+            print("    ✶ list     <count>          : Shows the last <count> operations.")
+            print("    ✶ list     page <number>    : Shows one page of operations.")
             print("    ✶ undo                      : Removes last operation from history.")
+            print("    ✶ undo     <count>          : Removes the last <count> operations.")
+            print("    ✶ redo                      : Restores the last undone operation.")
+            print("    ✶ redo     <count>          : Restores the last <count> undone operations.")
+            print("    ✶ import   <path> [check]   : Adds new operations from a history file.")
+            print("    ✶ export   [<directory>]    : Writes history as NumPy .npy columns.")
+            print("    ✶ summary                   : Shows counts and statistics of history.")
+            print("    ✶ stats                     : Shows call counts and latencies.")
+            print("    ✶ stats    export <file>    : Writes metrics in Prometheus format.")
             print("    ✶ exit                      : Exits the calculator.")
             continue
 
         # Exit REPL
         if command == 'exit':
             logging.info("Calculator exited.")
+            history.close()  # Write out any queued history
             print("Exiting calculator...")
             break
 
-        # Undo last comment
-        if command == 'undo':
-            history.undo_last()
+        # Undo the last operations, or redo undone ones
+        if command.split()[:1] in (['undo'], ['redo']):
+            try:
+                count = parse_count(command)
+            except ValueError as e:
+                logging.error("Invalid input or error: %s", e)
+                print(f"Invalid input. {e}")
+                continue
+            if command.startswith('undo'):
+                history.undo(count)
+            else:
+                history.redo(count)
             continue
 
-        # Print operations performed in this instance's session
-        if command == 'list':
-            history.print_history()
+        # Print operations performed in this instance's session, or the last records
+        if command.split()[:1] == ['list']:
+            try:
+                count, page = parse_list(command)
+            except ValueError as e:
+                logging.error("Invalid input or error: %s", e)
+                print(f"Invalid input. {e}")
+                continue
+            history.print_history(count, page)
             continue
 
-        try:
-            # LBYL - checking user input is correct before trying operations
-            # Split user input into 3 components
-            operation_str, num1_str, num2_str = user_input.split()
+        # Summary of the whole history, kept up to date without reading the file
+        if command == 'summary':
+            history.print_summary()
+            continue
 
-            # converting operation_str to lowercase
-            operation_str = operation_str.lower()
+        # Merge another history file into this one
+        if command.split()[:1] == ['import']:
+            import_file(history, user_input.split()[1:])
+            continue
+
+        # Write the history as memory-mappable columns for analytics
+        if command.split()[:1] == ['export']:
+            export_columns(history, user_input.split()[1:])
+            continue
+
+        # Show the metrics or write them to a file
+        if command.split()[:1] == ['stats']:
+            show_stats(user_input.split()[1:])
+            continue
 
-            # Convert operands into floats
-            num1, num2 = float(num1_str), float(num2_str)
+        # Calculate an infix expression, recorded in history as its last operation
+        if command.split()[:1] == ['eval']:
+            try:
+                expression = compile_expression(user_input.split(maxsplit=1)[1])
+                operation, num1, num2, result = expression.evaluate_parts(variables)
+            except (ValueError, IndexError) as e:
+                logging.error("Invalid input or error: %s", e)
+                if isinstance(e, DivisionByZeroError):
+                    history.record_division_error()
+                print("Invalid expression. Type 'help' for instructions.")
+                continue
 
-            # Creat appropriate operation insance based on user input
-            operation = OperationFactory.create_operation(operation_str)
+            print(f"Result: {result}")
+            variables['ans'] = result
+            if operation is not None:
+                history.add_to_history(operation, num1, num2, result)
+            continue
+
+        try:
+            # Parse user input into an operation and two operands
+            operation, num1, num2 = parse_calculation(user_input)
 
             # Perform operation
             calculation  = Calculation(operation, num1, num2)
@@ -89,12 +262,15 @@ def calculator():
 
             # Print result
             print(f"Result: {result}")
+            variables['ans'] = result
 
             # Add calculation to history
             history.add_to_history(operation, num1, num2, result)
 
         except ValueError as e:
             logging.error("Invalid input or error: %s", e)
+            if isinstance(e, DivisionByZeroError):
+                history.record_division_error()
             print(
                 "Invalid input. Please enter a valid operation and two numbers. "
                 "Type 'help' for instructions."
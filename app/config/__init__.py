@@ -0,0 +1,108 @@
+'''
+Loads the calculator's configuration once per process.
+
+- load_env:          reads the .env file into the environment.
+- configure_logging: applies logging.conf unless TEST_MODE is True.
+
+Both are cached, so the REPL, the batch mode and History can all call
+them without reading the files again.
+
+High-throughput logging for the calculation hot path:
+- LOG_QUEUE=True:     records are handed to a queue and written to the
+                      handlers from logging.conf by a background thread.
+- LOG_SAMPLE_EVERY=N: only 1 in N success records per operation is logged.
+                      Errors are always logged.
+'''
+
+import functools
+import itertools
+import logging
+import os
+
+# Log 1 in every N success records (see LogSampler)
+_sampling = {'every': 1}
+
+class LogSampler:
+    '''
+    Decides whether a success record should be logged.
+    Checks the level first, so nothing is counted or built while INFO is off,
+    then lets 1 in every N records through. Use one sampler per operation.
+    '''
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+        self._count = itertools.count()
+
+    def __call__(self) -> bool:
+        '''Returns True if this record should be logged.'''
+        if not logging.root.isEnabledFor(self.level):
+            return False
+        every = _sampling['every']
+        return every == 1 or next(self._count) % every == 0
+
+def set_log_sampling(every: int):
+    '''Logs 1 in every 'every' success records. 1 logs all of them.'''
+    if every < 1:
+        raise ValueError("Sampling rate must be at least 1.")
+    _sampling['every'] = every
+
+@functools.cache
+def load_env() -> bool:
+    '''
+    Loads the .env file into the environment (only the first call does any work).
+    Variables that are already set are not overridden.
+    Returns True if a .env file was found.
+    '''
+    # Imported here so processes that never need the .env file skip it
+    from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+    return load_dotenv()
+
+@functools.cache
+def _file_config(path: str):
+    '''Applies a logging config file (only once per path).'''
+    import logging.config  # pylint: disable=import-outside-toplevel
+    logging.config.fileConfig(path)
+
+@functools.cache
+def start_queue_logging():
+    '''
+    Moves the root logger's handlers behind a QueueHandler/QueueListener pair
+    (only once). Logging calls then only put the record on a queue, and a
+    background thread does the file I/O. The listener is stopped at exit,
+    after writing every queued record.
+    '''
+    # pylint: disable=import-outside-toplevel
+    import atexit
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(records))
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def configure_logging(path: str = 'logging.conf'):
+    '''
+    Configures the logger from 'path' if TEST_MODE is not True.
+    The config file is only parsed the first time.
+    LOG_QUEUE and LOG_SAMPLE_EVERY turn on the high-throughput mode.
+    '''
+    load_env()
+
+    if os.getenv('LOG_SAMPLE_EVERY'):
+        set_log_sampling(int(os.getenv('LOG_SAMPLE_EVERY')))
+
+    if os.getenv('TEST_MODE') != 'True':
+         # Configure logger if TEST_MODE is FALSE
+        _file_config(path)
+        if os.getenv('LOG_QUEUE') == 'True':
+            start_queue_logging()
+
+    logging.getLogger('sampleLogger')
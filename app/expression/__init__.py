@@ -0,0 +1,280 @@
+'''
+Infix expression engine, e.g. '(3 + 4) * 2 / 7'.
+
+Steps:
+    1. Tokenize the text
+    2. Parse the tokens into an AST, respecting precedence
+    3. Constant-fold every subtree that only has numbers
+    4. Compile the AST into closures that call the existing operations
+
+Compiled expressions are kept in an LRU cache keyed by the normalized text,
+so an expression that repeats skips all of the steps above.
+
+Operators, from lowest to highest precedence:
+    +  -           : Add, Subtract
+    *  /  %  //    : Multiply, Divide, Modulo, IntegerDivide
+    -x             : negation
+    ^  **          : Power (right associative)
+Variables (such as 'ans', the last result) are given when evaluating.
+'''
+
+import functools
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from app.operation_factory import OperationFactory
+from app.operations import OperationTemplate
+
+# Maximum number of compiled expressions kept in the cache
+CACHE_SIZE = 1024
+
+# Operator symbols and the registered operation they use
+OPERATORS = {
+    '+': 'add',
+    '-': 'subtract',
+    '*': 'multiply',
+    '/': 'divide',
+    '%': 'modulo',
+    '//': 'intdivide',
+    '^': 'power',
+    '**': 'power',
+}
+
+TOKEN_PATTERN = re.compile(r'''
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<operator>\*\*|//|[-+*/%^()])
+      | (?P<name>[A-Za-z_]\w*)
+    )''', re.VERBOSE)
+
+# ----------------
+# AST NODES
+# ----------------
+
+@dataclass(frozen=True)
+class Number:
+    '''A constant.'''
+    value: float
+
+@dataclass(frozen=True)
+class Variable:
+    '''A name looked up when the expression is evaluated.'''
+    name: str
+
+@dataclass(frozen=True)
+class BinaryOp:
+    '''An operation on two subexpressions.'''
+    operation: OperationTemplate
+    left: 'Node'
+    right: 'Node'
+
+Node = Union[Number, Variable, BinaryOp]
+
+# ----------------
+# TOKENIZER & PARSER
+# ----------------
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    '''
+    Splits the text into (kind, value) tokens.
+    Raises ValueError for characters that are not part of an expression.
+    '''
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            raise ValueError(f"Invalid expression: unexpected '{text[position:].strip()[0]}'.")
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    '''Recursive descent parser, one method per precedence level.'''
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def parse(self) -> Node:
+        '''Parses the whole token list into one AST.'''
+        if not self.tokens:
+            raise ValueError("Invalid expression: it is empty.")
+        node = self._sum()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Invalid expression: unexpected '{self.tokens[self.position][1]}'.")
+        return node
+
+    def _peek(self) -> Optional[str]:
+        '''Returns the next operator without consuming it.'''
+        if self.position < len(self.tokens) and self.tokens[self.position][0] == 'operator':
+            return self.tokens[self.position][1]
+        return None
+
+    def _next(self) -> Tuple[str, str]:
+        '''Consumes the next token.'''
+        if self.position >= len(self.tokens):
+            raise ValueError("Invalid expression: it ends too early.")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _binary(self, operator: str, left: Node, right: Node) -> BinaryOp:
+        return BinaryOp(OperationFactory.create_operation(OPERATORS[operator]), left, right)
+
+    def _sum(self) -> Node:
+        '''sum := product (('+' | '-') product)*'''
+        node = self._product()
+        while self._peek() in ('+', '-'):
+            operator = self._next()[1]
+            node = self._binary(operator, node, self._product())
+        return node
+
+    def _product(self) -> Node:
+        '''product := unary (('*' | '/' | '%' | '//') unary)*'''
+        node = self._unary()
+        while self._peek() in ('*', '/', '%', '//'):
+            operator = self._next()[1]
+            node = self._binary(operator, node, self._unary())
+        return node
+
+    def _unary(self) -> Node:
+        '''unary := ('-' | '+') unary | power'''
+        if self._peek() == '-':
+            self._next()
+            operand = self._unary()
+            if isinstance(operand, Number):
+                return Number(-operand.value)  # Negative literal, no operation needed
+            return self._binary('*', Number(-1.0), operand)
+        if self._peek() == '+':
+            self._next()
+            return self._unary()
+        return self._power()
+
+    def _power(self) -> Node:
+        '''power := atom (('^' | '**') unary)?'''
+        node = self._atom()
+        if self._peek() in ('^', '**'):
+            operator = self._next()[1]
+            node = self._binary(operator, node, self._unary())
+        return node
+
+    def _atom(self) -> Node:
+        '''atom := number | name | '(' sum ')' '''
+        kind, value = self._next()
+        if kind == 'number':
+            return Number(float(value))
+        if kind == 'name':
+            return Variable(value)
+        if value == '(':
+            node = self._sum()
+            if self._peek() != ')':
+                raise ValueError("Invalid expression: missing ')'.")
+            self._next()
+            return node
+        raise ValueError(f"Invalid expression: unexpected '{value}'.")
+
+def parse(text: str) -> Node:
+    '''Parses infix text into an AST. Raises ValueError for invalid expressions.'''
+    return _Parser(tokenize(text)).parse()
+
+# ----------------
+# FOLDING & COMPILING
+# ----------------
+
+def fold(node: Node) -> Node:
+    '''
+    Replaces every operation whose operands are both constants by its result.
+    Raises ValueError if a constant part cannot be calculated (e.g. 1 / 0).
+    '''
+    if not isinstance(node, BinaryOp):
+        return node
+    left, right = fold(node.left), fold(node.right)
+    if isinstance(left, Number) and isinstance(right, Number):
+        return Number(node.operation.calculate(left.value, right.value))
+    return BinaryOp(node.operation, left, right)
+
+Evaluator = Callable[[Dict[str, float]], float]
+
+def _compile_node(node: Node) -> Evaluator:
+    '''Turns an AST node into a closure that takes the variables and returns its value.'''
+    if isinstance(node, Number):
+        value = node.value
+        return lambda variables: value
+
+    if isinstance(node, Variable):
+        name = node.name
+        def lookup(variables):
+            try:
+                return variables[name]
+            except KeyError as exc:
+                raise ValueError(f"Unknown variable: {name}.") from exc
+        return lookup
+
+    calculate = node.operation.calculate
+    left, right = _compile_node(node.left), _compile_node(node.right)
+    return lambda variables: calculate(left(variables), right(variables))
+
+class CompiledExpression:
+    '''
+    An expression compiled to closures.
+    The top-level operation is kept separately, so the whole expression can be
+    recorded in history as one (operation, operand #1, operand #2, result) row.
+    '''
+    def __init__(self, text: str, tree: Node):
+        self.text = text
+        self.tree = tree
+        # Children of the root are folded, the root itself is kept for history
+        if isinstance(tree, BinaryOp):
+            self.operation = tree.operation
+            self._left = _compile_node(fold(tree.left))
+            self._right = _compile_node(fold(tree.right))
+        else:
+            self.operation = None
+            self._left = _compile_node(tree)
+            self._right = None
+
+    def evaluate_parts(self, variables: Dict[str, float] = None):
+        '''
+        Evaluates the expression and returns (operation, operand #1, operand #2, result).
+        Operation and operand #2 are None if the expression is a single value.
+        '''
+        variables = variables or {}
+        left = self._left(variables)
+        if self.operation is None:
+            return None, left, None, left
+        right = self._right(variables)
+        return self.operation, left, right, self.operation.calculate(left, right)
+
+    def evaluate(self, variables: Dict[str, float] = None) -> float:
+        '''Evaluates the expression and returns its result.'''
+        return self.evaluate_parts(variables)[3]
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.text!r})"
+
+def normalize(text: str) -> str:
+    '''Normalizes expression text to use as the cache key.'''
+    return ' '.join(text.split()).lower()
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _compile_normalized(text: str) -> CompiledExpression:
+    '''Parses, folds and compiles normalized text (cached).'''
+    return CompiledExpression(text, parse(text))
+
+def compile_expression(text: str) -> CompiledExpression:
+    '''
+    Returns the compiled form of an expression.
+    Repeated expressions come from the LRU cache without being parsed again.
+    Raises ValueError for invalid expressions.
+    '''
+    return _compile_normalized(normalize(text))
+
+def cache_info():
+    '''Returns the hits, misses and size of the compiled expression cache.'''
+    return _compile_normalized.cache_info()
+
+def clear_cache():
+    '''Empties the compiled expression cache.'''
+    _compile_normalized.cache_clear()
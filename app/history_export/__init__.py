@@ -0,0 +1,186 @@
+'''
+Exports the history as one NumPy .npy file per column.
+
+The export directory holds:
+    opcode.npy    uint8    (opcodes of app.storage.opcodes(), 0 if the operation has none)
+    operand1.npy  float64
+    operand2.npy  float64
+    result.npy    float64
+    export.json   rows exported, the last record and the opcode -> name map
+
+Analytics jobs open the columns without parsing or copying anything:
+    columns = load_columns('history.csv.columns')   # np.load(..., mmap_mode='r')
+    columns['result'][columns['opcode'] == 4].mean()
+
+Exports are incremental. Every .npy file has a fixed-size header, so new rows
+are appended to the end of each file and only the row count in the header is
+rewritten. The new rows are read from the end of the history (tail) instead of
+the whole file. If the history no longer starts with the exported rows (e.g.
+they were undone), the columns are written again from scratch.
+'''
+
+from __future__ import annotations
+import itertools
+import json
+import logging
+import os
+import struct
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple
+from app.history_manager import History
+from app.storage import RECORD_FIELDS, BinaryStorage, Record, opcodes
+
+if TYPE_CHECKING:  # NumPy is only imported when the history is exported
+    import numpy as np
+
+# Export directory name: '<history file>' + EXPORT_SUFFIX
+EXPORT_SUFFIX = '.columns'
+
+# Rows converted to arrays at once when the whole history is streamed
+EXPORT_CHUNK_ROWS = 1 << 16
+
+# State of the last export, kept in the export directory
+STATE_FILE = 'export.json'
+
+# Size of every .npy header: magic, version, header length and the padded dict.
+# Fixed, so the row count can be rewritten in place as it grows.
+NPY_HEADER_SIZE = 128
+
+_NPY_PREFIX = b'\x93NUMPY\x01\x00' + struct.pack('<H', NPY_HEADER_SIZE - 10)
+
+class ExportReport(NamedTuple):
+    '''Result of one export.'''
+    rows: int  # Rows in the columns after the export
+    added: int  # Rows written by this export
+    rebuilt: bool  # True if the columns were written from scratch
+
+def _npy_header(descr: str, rows: int) -> bytes:
+    '''A version 1.0 .npy header for 'rows' values of type 'descr', NPY_HEADER_SIZE long.'''
+    text = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({rows},), }}"
+    return _NPY_PREFIX + text.ljust(NPY_HEADER_SIZE - len(_NPY_PREFIX) - 1).encode('latin1') + b'\n'
+
+def column_path(directory: str, name: str) -> str:
+    '''Path of one column file.'''
+    return os.path.join(directory, f"{name}.npy")
+
+def load_columns(directory: str) -> Dict[str, np.ndarray]:
+    '''Opens every column read-only and memory-mapped, without reading it.'''
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    return {name: np.load(column_path(directory, name), mmap_mode='r')
+            for name, _ in RECORD_FIELDS}
+
+def load_state(directory: str) -> dict:
+    '''Reads the state of the last export, or an empty state if there is none.'''
+    try:
+        with open(os.path.join(directory, STATE_FILE), mode='r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {'rows': 0, 'last': None}
+
+def _save_state(directory: str, rows: int, last: Record):
+    '''Writes the state in one step; it is what marks the appended rows as exported.'''
+    state = {
+        'rows': rows,
+        'last': list(last) if last is not None else None,
+        'opcodes': {code: name for name, code in opcodes().items()},
+    }
+    temporary = os.path.join(directory, f"{STATE_FILE}.tmp")
+    with open(temporary, mode='w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(temporary, os.path.join(directory, STATE_FILE))
+
+def _to_columns(records: List[Record]) -> Dict[str, np.ndarray]:
+    '''Turns records into one array per column.'''
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    codes = opcodes()
+    operations, operand1, operand2, result = zip(*records) if records else ((), (), (), ())
+    values = {
+        'opcode': [codes.get(str(operation), 0) for operation in operations],
+        'operand1': operand1, 'operand2': operand2, 'result': result,
+    }
+    return {name: np.asarray(values[name], dtype=dtype) for name, dtype in RECORD_FIELDS}
+
+def _append_columns(directory: str, rows: int, chunks: Iterable[Dict[str, np.ndarray]],
+                    suffix: str = '') -> int:
+    '''
+    Appends every chunk of columns after the first 'rows' rows of each column file
+    (anything after them, left by an interrupted export, is cut off) and updates
+    the headers. Returns the number of rows in the files.
+    '''
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    files = {}
+    try:
+        for name, dtype in RECORD_FIELDS:
+            path = column_path(directory, name) + suffix
+            file = open(path, mode='r+b' if rows else 'w+b')  # pylint: disable=consider-using-with
+            files[name] = file
+            file.truncate(NPY_HEADER_SIZE + rows * np.dtype(dtype).itemsize)
+            file.seek(0, os.SEEK_END)
+
+        total = rows
+        for columns in chunks:
+            for name, file in files.items():
+                columns[name].tofile(file)
+            total += len(columns['result'])
+
+        # Headers last, so a reader never sees a row count the data does not have yet
+        for name, dtype in RECORD_FIELDS:
+            files[name].seek(0)
+            files[name].write(_npy_header(np.dtype(dtype).str, total))
+    finally:
+        for file in files.values():
+            file.close()
+    return total
+
+def _record_chunks(records: Iterable[Record]) -> Iterable[Dict[str, np.ndarray]]:
+    '''Converts a stream of records to columns, EXPORT_CHUNK_ROWS rows at a time.'''
+    records = iter(records)
+    while chunk := list(itertools.islice(records, EXPORT_CHUNK_ROWS)):
+        yield _to_columns(chunk)
+
+def export_history(history: History, directory: str = None) -> ExportReport:
+    '''
+    Exports the history's records to columns in 'directory'
+    ('<history file>.columns' by default), adding only the rows
+    appended since the last export.
+    '''
+    directory = directory or history.filename + EXPORT_SUFFIX
+    os.makedirs(directory, exist_ok=True)
+    history.flush()  # Queued rows must be in the file before it is read
+    storage = history.storage
+
+    # Binary files know their length; other storages count records in the summary
+    total = len(storage) if isinstance(storage, BinaryStorage) else history.summary().count
+    state = load_state(directory)
+    exported = state['rows']
+
+    # The exported rows must still be the history's first rows
+    incremental = 0 < exported <= total and all(
+        os.path.exists(column_path(directory, name)) for name, _ in RECORD_FIELDS
+    ) and [list(record) for record in storage.tail(1, total - exported)] == [state['last']]
+
+    start = exported if incremental else 0
+    if isinstance(storage, BinaryStorage):
+        # The records already are fixed-width columns, copied without parsing
+        table = storage.load()[start:total]
+        chunks = [{name: table[name] for name, _ in RECORD_FIELDS}]
+    elif incremental and total - exported <= EXPORT_CHUNK_ROWS:
+        # Only the new rows, read backward from the end of the history
+        chunks = [_to_columns(storage.tail(total - exported))]
+    else:
+        chunks = _record_chunks(itertools.islice(storage.iter_records(), start, None))
+
+    if incremental:
+        rows = _append_columns(directory, exported, chunks)
+    else:
+        # Written beside the old columns and swapped in, so open readers keep a whole copy
+        rows = _append_columns(directory, 0, chunks, suffix='.tmp')
+        for name, _ in RECORD_FIELDS:
+            os.replace(column_path(directory, name) + '.tmp', column_path(directory, name))
+
+    last = storage.tail(1)
+    _save_state(directory, rows, last[0] if last else None)
+    logging.info("Exported %s rows of history to %s.", rows - start, directory)
+    return ExportReport(rows, rows - start, not incremental)
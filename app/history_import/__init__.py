@@ -0,0 +1,180 @@
+'''
+Imports history CSV files from other machines into the current history.
+
+The source is streamed with the csv module in chunks of 'chunk_rows' rows,
+and every chunk is appended to the history in one group, so memory stays
+bounded however large the source is. Rows are checked on the way:
+    - the file must start with the history header
+    - rows with an unknown operation or non-numeric fields are skipped
+    - 'verify' recomputes every result, and either skips rows whose stored
+      result is wrong ('check') or stores the recomputed one ('recompute')
+    - rows already in the history, or seen earlier in the source, are skipped
+
+Duplicates are found with a Bloom filter sized for the history and the
+source, so it needs a few bytes per record instead of a whole set of them.
+A Bloom filter can report a new record as already seen, with a chance of
+about ERROR_RATE per record; it never lets a real duplicate through.
+
+Usage:
+    Enter an command: import other_history.csv
+    Enter an command: import other_history.csv check
+'''
+
+import csv
+import hashlib
+import logging
+import math
+import os
+import struct
+from typing import Iterator, List, NamedTuple, Tuple
+from app.history_manager import History
+from app.operations import OPERATIONS
+from app.storage import HEADER, Record
+
+# Rows appended to the history in one group
+CHUNK_ROWS = 10000
+
+# Chance that the Bloom filter takes a new record for a duplicate
+ERROR_RATE = 1e-6
+
+# Upper bound of the Bloom filter's size; very large imports get a higher error rate
+MAX_FILTER_BYTES = 256 << 20
+
+# Smallest CSV row ('Add,1,2,3' and a line ending), used to estimate a source's rows
+MIN_ROW_BYTES = 11
+
+# Ways to check the results of imported rows
+VERIFY_MODES = ('check', 'recompute')
+
+_OPERANDS = struct.Struct('<ddd')
+
+class ImportReport(NamedTuple):
+    '''Counts of the rows of one import.'''
+    imported: int
+    duplicates: int
+    invalid: int  # Unknown operation, wrong number of fields or not a number
+    mismatched: int = 0  # Result differs from the recomputed one ('check' only)
+
+class BloomFilter:
+    '''
+    Set membership in a fixed-size bit array. 'hashes' bit positions per key
+    come from one BLAKE2 digest (double hashing).
+    '''
+    def __init__(self, capacity: int, error_rate: float = ERROR_RATE,
+                 max_bytes: int = MAX_FILTER_BYTES):
+        capacity = max(1, capacity)
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.size = max(64, min(bits, max_bytes * 8))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: bytes) -> Iterator[int]:
+        '''Bit positions of 'key'.'''
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, key: bytes) -> bool:
+        '''Adds 'key'. Returns False if it was (probably) there already.'''
+        new = False
+        bits = self._bits
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        return new
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(key))
+
+def record_key(record: Record) -> bytes:
+    '''Identifies a record by its operation and exact float values.'''
+    operation, operand1, operand2, result = record
+    return operation.encode('utf-8') + b'\0' + _OPERANDS.pack(operand1, operand2, result)
+
+def check_header(row: List[str], path: str):
+    '''Raises ValueError unless 'row' is the history header (spaces are ignored).'''
+    if [field.strip() for field in row] != HEADER:
+        raise ValueError(f"{path} is not a history file, its header must be: {', '.join(HEADER)}")
+
+def read_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[List[Tuple[int, list]]]:
+    '''
+    Streams (line number, row) pairs of a history CSV in lists of up to
+    'chunk_rows' rows. Raises ValueError if the header is wrong.
+    '''
+    with open(path, mode='r', encoding='utf-8', newline='') as file:
+        rows = csv.reader(file)
+        check_header(next(rows, []), path)
+        chunk = []
+        for row in rows:
+            chunk.append((rows.line_num, row))
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def import_history(history: History, path: str, verify: str = None,
+                   chunk_rows: int = CHUNK_ROWS) -> ImportReport:
+    '''
+    Appends the new records of the history CSV at 'path' to 'history'.
+    'verify' is None (trust the results), 'check' or 'recompute'.
+    Raises ValueError for a wrong header or verify mode, OSError if the file cannot be read.
+    '''
+    if verify is not None and verify not in VERIFY_MODES:
+        raise ValueError(f"Unknown verify mode: {verify}.")
+    operations = {repr(operation): operation for operation in OPERATIONS.values()}
+
+    # Every record already in the history, then every record imported
+    history.flush()
+    capacity = history.summary().count + os.path.getsize(path) // MIN_ROW_BYTES
+    seen = BloomFilter(capacity)
+    for record in history.storage.iter_records():
+        seen.add(record_key(record))
+
+    imported = duplicates = invalid = mismatched = 0
+    for chunk in read_chunks(path, chunk_rows):
+        records = []
+        for line_number, row in chunk:
+            try:
+                operation_name, operand1, operand2, result = row
+                operation_name = operation_name.strip()
+                operand1, operand2, result = float(operand1), float(operand2), float(result)
+                operation = operations[operation_name]
+            except (ValueError, KeyError) as e:
+                logging.error("Invalid history row on line %s of %s: %s", line_number, path, e)
+                invalid += 1
+                continue
+
+            if verify is not None:
+                try:
+                    expected = operation.calculate(operand1, operand2)
+                except (ValueError, ArithmeticError) as e:  # Division by zero or overflow
+                    logging.error("Invalid history row on line %s of %s: %s",
+                                  line_number, path, e)
+                    invalid += 1
+                    continue
+                if verify == 'recompute':
+                    result = expected
+                elif not math.isclose(result, expected, rel_tol=1e-9, abs_tol=1e-12):
+                    logging.error("Wrong result on line %s of %s: %s instead of %s",
+                                  line_number, path, result, expected)
+                    mismatched += 1
+                    continue
+
+            record = (operation_name, operand1, operand2, result)
+            if seen.add(record_key(record)):
+                records.append(record)
+            else:
+                duplicates += 1
+
+        history.add_records(records)
+        imported += len(records)
+
+    logging.info("Imported %s records from %s (%s duplicates, %s invalid, %s mismatched).",
+                 imported, path, duplicates, invalid, mismatched)
+    return ImportReport(imported, duplicates, invalid, mismatched)
@@ -1,99 +1,362 @@
 """
-Creates a Singleton history instance and saves history to a table using pandas.
+Creates a Singleton history instance and saves history to a storage backend.
+Pandas is only imported when the history is printed as a table.
 
 Features:
-- Loads history from an existing CSV or creates one if it doesn't exist.
-- Records Operation, Operands, and Result in CSV file.
-- Undoes the last operation.
-- Prints history for ONLY that session.
+- Loads history from an existing file or creates one if it doesn't exist.
+- Records Operation, Operands, and Result in a CSV file, or another storage backend.
+- Undoes the last operation by truncating the file.
+- Adds groups of records at once, e.g. imported from other history files.
+- Undo several operations and redo them, even after a restart, through an
+  append-only undo journal.
+- Prints history for ONLY that session from memory, or the last records page by page.
+- Optional write-behind mode that writes rows from a background thread.
+- Safe to use from many threads: records are handed over through a lock-free
+  queue and written in groups by one writer thread.
+- Summary (counts, sum, min, max, mean, variance) kept up to date as records
+  are added and undone, and saved to a sidecar file.
 """
 
 import logging
 import os
-import csv
-import pandas as pd
-from dotenv import load_dotenv
+import threading
+from collections import deque
+from app.config import LogSampler, load_env
+from app.metrics import timed
 from app.operations import OperationTemplate
+from app.history_writer import HistoryWriter
+from app.history_summary import (SIDECAR_SUFFIX, HistorySummary, SummaryReport,
+                                 history_signature)
+from app.storage import HEADER, StorageFactory
+from app.undo_journal import JOURNAL_SUFFIX, UndoJournal
+
+# Number of records shown on one page of 'list page <n>'
+PAGE_SIZE = 10
+
+# Records of the current session kept in memory for 'list' (the oldest are dropped)
+SESSION_SIZE = 10000
+
+# Changes between two saves of the summary sidecar (it is also saved on close)
+SUMMARY_SAVE_EVERY = 1000
 
 class History:
-    """Singleton class to manage and record a history of operations in a CSV file."""
+    """Singleton class to manage and record a history of operations in a storage backend."""
 
     _instance = None
 
-    def __new__(cls):
+    # Guards creating and initializing the singleton
+    _lock = threading.Lock()
+
+    # "Added"/"Queued" records follow LOG_SAMPLE_EVERY like the operations
+    _log_sampler = LogSampler()
+
+    def __new__(cls, *args, **kwargs):
         """Create or return the singleton instance."""
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
+            with cls._lock:
+                # Checked again, another thread may have created it while we waited
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        """Initialize the history."""
-        if not hasattr(self, '_initialized'):  # Check if initialization has occurred
-            load_dotenv()
-            self.filename = os.getenv('HISTORY_FILENAME', 'history.csv')
-            self._create_csv_writer()
+    def __init__(self, write_behind: bool = None, storage: str = None):
+        """
+        Initialize the history.
+        Write-behind mode is read from HISTORY_WRITE_BEHIND unless 'write_behind' is given.
+        The storage backend is read from HISTORY_STORAGE ('csv', 'binary' or 'sqlite',
+        default 'csv')
+        unless 'storage' is given.
+        Arguments are ignored once the singleton is initialized.
+        """
+        if hasattr(self, '_initialized'):  # Check if initialization has occurred
+            return
+        with History._lock:
+            if hasattr(self, '_initialized'):
+                return
+            load_env()
+            storage = storage or os.getenv('HISTORY_STORAGE', 'csv')
+            self.storage = StorageFactory.create_storage(storage, os.getenv('HISTORY_FILENAME'))
+            self.filename = self.storage.filename
+
+            if write_behind is None:
+                write_behind = os.getenv('HISTORY_WRITE_BEHIND') == 'True'
+            self._write_behind = write_behind
+            # Writes queued records from a background thread. Direct mode wakes it for
+            # every record, write-behind mode once per batch or flush interval.
+            self._writer = (HistoryWriter(self.storage) if write_behind
+                            else HistoryWriter(self.storage, batch_size=1))
+            # Keeps undone records in the journal in the order they were popped
+            self._undo_lock = threading.Lock()
+            # Guards the counter and the summary (held for a few additions, never for I/O)
+            self._stats_lock = threading.Lock()
+
+            self.summary_file = self.filename + SIDECAR_SUFFIX
+            self._summary = self._load_summary()
+            self._unsaved = 0  # Summary changes since the sidecar was saved
+
+            # Undone records that can be redone, persisted next to the history
+            self._journal = UndoJournal(self.filename + JOURNAL_SUFFIX)
 
             self.counter = 0  # Counter for number of operations
+            # The session's newest records, as floats, so 'list' never reads the file
+            self._session = deque(maxlen=int(os.getenv('HISTORY_SESSION_SIZE',
+                                                       str(SESSION_SIZE))))
             self._initialized = True  # Mark as initialized
 
-    def _create_csv_writer(self):
-        """Create or open the CSV file for appending history."""
-        if not os.path.exists(self.filename):
-            # If file doesn't exist, create it and write the header
-            with open(self.filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Operation', 'Operand #1', 'Operand #2', 'Result'])
-                logging.info("History file created.")
-        else:
-            logging.info("History file loaded.")
-
+    @timed('add_to_history', lambda self, operation, *args: repr(operation))
     def add_to_history(self, operation: OperationTemplate, operand1: float, operand2: float, result: float):
         """Add an operation to the history."""
+        record = (repr(operation), operand1, operand2, result)
+        self._journal.clear()  # A new calculation cannot be followed by a redo
 
-        # Open the file to append data to it
-        with open(self.filename, mode='a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow([operation, operand1, operand2, result])
-            file.flush()
-            logging.info("Added '%s %s %s = %s' to history.", operand1, operation, operand2, result)
+        # Only queued, the writer thread writes it (flush() waits for it)
+        self._writer.write(record)
+        if self._log_sampler():
+            logging.info("%s '%s %s %s = %s' to history.",
+                         "Queued" if self._write_behind else "Added",
+                         operand1, operation, operand2, result)
+
+        with self._stats_lock:
+            self._summary.add(record)
+            self._session.append((record[0], float(operand1), float(operand2), float(result)))
+            # Increment the operation counter
+            self.counter += 1
+            save = self._summary_changed()
+        if save:
+            self.save_summary()
+
+    def add_records(self, records: list):
+        """
+        Add a group of (operation name, operand #1, operand #2, result) records,
+        e.g. imported ones, in one append. Like added operations, they count
+        for this session and can be undone.
+        """
+        if not records:
+            return
+        self._journal.clear()
 
-        # Increment the operation counter
-        self.counter += 1
+        # Written now, after the queued records, so a whole group is written at once
+        self._writer.append_many(records)
 
-    def undo_last(self):
-        """Undo the last operation in the history."""
-        df = pd.read_csv(self.filename)  # Load file into a DataFrame
+        with self._stats_lock:
+            for record in records:
+                self._summary.add(record)
+            self._session.extend(records)
+            self.counter += len(records)
+            self._unsaved += len(records)
+            save = self._unsaved >= SUMMARY_SAVE_EVERY
+        if save:
+            self.save_summary()
 
+    def record_division_error(self):
+        """Count a calculation that failed dividing by zero in the summary."""
+        with self._stats_lock:
+            self._summary.add_division_error()
+            save = self._summary_changed()
+        if save:
+            self.save_summary()
+
+    def summary(self) -> SummaryReport:
+        """Return the summary of the whole history without reading the file."""
+        with self._stats_lock:
+            return self._summary.report()
+
+    def print_summary(self):
+        """Print the summary of the whole history."""
+        with self._stats_lock:
+            summary = self._summary.copy()
+        summary.print_summary()
+
+    def _load_summary(self) -> HistorySummary:
+        """
+        Load the summary sidecar, or rebuild it by reading the history once
+        if it is missing or does not match the history file.
+        """
+        summary = HistorySummary.load(self.summary_file, history_signature(self.filename))
+        if summary is None:
+            logging.info("Building the history summary from %s.", self.filename)
+            summary = HistorySummary.from_records(self.storage.iter_records())
+        return summary
+
+    def save_summary(self):
+        """Write the summary sidecar, after any queued rows are written."""
+        self.flush()
+        with self._stats_lock:
+            summary = self._summary.copy()  # Saved without holding up other threads
+            self._unsaved = 0
+        try:
+            summary.save(self.summary_file, history_signature(self.filename))
+        except OSError as e:
+            # The sidecar is only a shortcut, it is rebuilt from the history if missing
+            logging.error("Could not save the history summary: %s", e)
+
+    def _summary_changed(self) -> bool:
+        """Count a change of the summary (with _stats_lock held). True if a save is due."""
+        self._unsaved += 1
+        return self._unsaved >= SUMMARY_SAVE_EVERY
+
+    def flush(self):
+        """Make sure every queued row is written to the file."""
+        self._writer.flush()
+
+    def close(self):
+        """
+        Drain queued rows, stop the background writer and close the storage.
+        The summary is saved last, so it matches the closed history file.
+        """
+        self._writer.close()
+        self.storage.close()
+        self._journal.close()
+        self.save_summary()
+
+    @timed('undo_last')
+    def undo_last(self) -> bool:
+        """
+        Undo the last operation this process added to the history.
+        The storage removes only that record instead of rewriting the file,
+        so undo costs the same however large the history file grows.
+        Records added by other processes sharing the file are kept.
+        The record goes to the undo journal, so it can be redone.
+        Returns False if there was nothing to undo.
+        """
         if self.counter == 0:
             print("No operations to undo.")
-            return
+            return False
 
-        # Getting the last row and unpacking it into variables
-        last_row = df.iloc[-1]
-        operation, operand1, operand2, result = last_row
+        with self._undo_lock:
+            record = self._writer.pop()  # After the queued rows are written
+            if record is not None:
+                # In the journal before the next undo can pop, so redo keeps the order
+                self._journal.tombstone(record)
+        if record is None:
+            # No records are left, the file was emptied outside this session
+            print("No operations to undo.")
+            return False
+
+        with self._stats_lock:
+            self._summary.remove(record)
+            self._forget(record)
+            # Decrement the operation counter
+            self.counter -= 1
+            save = self._summary_changed()
+        if save:
+            self.save_summary()
 
-        # Remove the last row
-        df = df.drop(index=df.index[-1])
+        # Unpacking the last record into variables
+        operation, operand1, operand2, result = record
 
         print("Removed operation")
         print(f"    {operand1} {operation} {operand2} = {result}")
         print("from history.")
 
-        # Save the modified history back to the file
-        df.to_csv(self.filename, index=False)
-
-        # Decrement the operation counter
-        self.counter -= 1
-
         logging.info("Removed")
         logging.info("    %s %s %s = %s", operand1, operation, operand2, result)
         logging.info("from history.")
+        return True
 
-    def print_history(self):
-        """Print only that session's history."""
-        if self.counter == 0:
+    def undo(self, count: int = 1):
+        """Undo the last 'count' operations, newest first."""
+        for _ in range(count):
+            if not self.undo_last():
+                return
+
+    @timed('redo_last')
+    def redo_last(self) -> bool:
+        """
+        Add the most recently undone operation back to the history.
+        The record comes from the undo journal, so operations undone before
+        a restart can be redone. Returns False if there is nothing to redo.
+        """
+        record = self._journal.restore()
+        if record is None:
+            print("Nothing to redo.")
+            return False
+
+        operation, operand1, operand2, result = record
+        self._writer.write(record)
+
+        with self._stats_lock:
+            self._summary.add(record)
+            self._session.append((operation, float(operand1), float(operand2), float(result)))
+            self.counter += 1  # Can be undone again
+            save = self._summary_changed()
+        if save:
+            self.save_summary()
+
+        print("Restored operation")
+        print(f"    {operand1} {operation} {operand2} = {result}")
+        print("to history.")
+
+        logging.info("Restored")
+        logging.info("    %s %s %s = %s", operand1, operation, operand2, result)
+        logging.info("to history.")
+        return True
+
+    def redo(self, count: int = 1):
+        """Redo the last 'count' undone operations, most recently undone first."""
+        for _ in range(count):
+            if not self.redo_last():
+                return
+
+    def _forget(self, record: tuple):
+        """Remove an undone record from the session (with _stats_lock held)."""
+        if self._session and self._session[-1] == record:
+            self._session.pop()
+            return
+        try:
+            # Another thread added a record after it, or it is older than the session
+            self._session.remove(record)
+        except ValueError:
+            pass
+
+    def print_history(self, count: int = None, page: int = None):
+        """
+        Print history records.
+            - No arguments: only that session's history, from memory.
+            - 'count': the last 'count' records in the file.
+            - 'page': one page of PAGE_SIZE records, page 1 being the most recent.
+        The file is read backward from the end, and only the requested records are read.
+        """
+        if count is None and page is None:
+            self._print_session()
+            return
+
+        skip = 0  # Number of most recent records to skip
+        if page is not None:
+            skip, count = (page - 1) * PAGE_SIZE, PAGE_SIZE
+
+        if count == 0:
+            print("History is empty.")
+            return
+
+        self.flush()  # Queued rows must be in the file before it is read
+        records = self.storage.tail(count, skip)
+
+        self._print_records(records)
+
+    def _print_session(self):
+        """
+        Print this session's records from memory, without touching the file.
+        Very long sessions only show the newest HISTORY_SESSION_SIZE records.
+        """
+        with self._stats_lock:
+            records = list(self._session)
+            total = self.counter
+
+        self._print_records(records)
+        if total > len(records):
+            print(f"Showing the last {len(records)} of {total} operations of this session.")
+
+    @staticmethod
+    def _print_records(records: list):
+        """Print records as a table."""
+        if not records:
             print("History is empty.")
             return
 
-        df = pd.read_csv(self.filename)  # Load CSV file
-        print(df.tail(self.counter).to_string())  # Print only the instance's history
+        # Imported here so sessions that never list history skip pandas
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        # Only the requested records are put in a DataFrame for printing
+        df = pd.DataFrame(records, columns=HEADER)
+        print(df.to_string(index=False))
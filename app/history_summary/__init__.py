@@ -0,0 +1,207 @@
+'''
+Incrementally maintained aggregates of the calculation history.
+
+HistorySummary keeps, for every record in the history:
+    - the count per operation
+    - the sum, min, max, mean and variance of the results (Welford's algorithm)
+    - the number of calculations that failed dividing by zero
+
+Adding a record and removing the last one (undo) are both O(1), so the
+summary never needs to read the history file. Min and max cannot be undone
+from their current value alone, so every change of the min or max is kept
+on a small stack and popped again when the record that caused it is undone.
+For random results the stacks hold about log(n) entries.
+
+The summary is saved next to the history as '<history file>.summary.json'.
+The file also holds the size and modification time of the history it was
+saved with, so a summary that no longer matches the history is not used.
+'''
+
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Sidecar file name: '<history file>' + SIDECAR_SUFFIX
+SIDECAR_SUFFIX = '.summary.json'
+
+class SummaryReport(NamedTuple):
+    '''A copy of the summary, as returned by History.summary().'''
+    count: int
+    per_operation: Dict[str, int]
+    total: float  # Sum of every result
+    minimum: Optional[float]
+    maximum: Optional[float]
+    mean: Optional[float]
+    variance: Optional[float]  # Population variance of the results
+    division_errors: int
+
+    @property
+    def division_error_share(self) -> float:
+        '''Share of calculations (recorded or failed) that failed dividing by zero.'''
+        attempts = self.count + self.division_errors
+        return self.division_errors / attempts if attempts else 0.0
+
+class HistorySummary:
+    '''Running aggregates of the history records.'''
+    def __init__(self):
+        self.count = 0
+        self.per_operation: Dict[str, int] = {}
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        # (count when it changed, previous value), used to undo min and max
+        self._min_changes: List[Tuple[int, Optional[float]]] = []
+        self._max_changes: List[Tuple[int, Optional[float]]] = []
+        self.division_errors = 0
+
+    def add(self, record: tuple):
+        '''Adds one (operation, operand #1, operand #2, result) record.'''
+        operation, result = str(record[0]), record[3]
+        self.count += 1
+        self.per_operation[operation] = self.per_operation.get(operation, 0) + 1
+        self.total += result
+
+        delta = result - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (result - self.mean)
+
+        if self.minimum is None or result < self.minimum:
+            self._min_changes.append((self.count, self.minimum))
+            self.minimum = result
+        if self.maximum is None or result > self.maximum:
+            self._max_changes.append((self.count, self.maximum))
+            self.maximum = result
+
+    def remove(self, record: tuple):
+        '''Removes the last added record, reversing add().'''
+        operation, result = str(record[0]), record[3]
+        if self.count <= 1:
+            # Start again from zero instead of carrying rounding errors along
+            errors = self.division_errors
+            self.__init__()
+            self.division_errors = errors
+            return
+
+        if self._min_changes and self._min_changes[-1][0] == self.count:
+            self.minimum = self._min_changes.pop()[1]
+        if self._max_changes and self._max_changes[-1][0] == self.count:
+            self.maximum = self._max_changes.pop()[1]
+
+        self.count -= 1
+        remaining = self.per_operation.get(operation, 0) - 1
+        if remaining > 0:
+            self.per_operation[operation] = remaining
+        else:
+            self.per_operation.pop(operation, None)
+        self.total -= result
+
+        # Welford's update run backward
+        old_mean = self.mean
+        self.mean = old_mean - (result - old_mean) / self.count
+        self.m2 = max(0.0, self.m2 - (result - old_mean) * (result - self.mean))
+
+    def add_division_error(self):
+        '''Counts one calculation that failed dividing by zero.'''
+        self.division_errors += 1
+
+    def report(self) -> SummaryReport:
+        '''Returns a copy of the current aggregates.'''
+        empty = self.count == 0
+        return SummaryReport(
+            self.count, dict(self.per_operation), self.total, self.minimum, self.maximum,
+            None if empty else self.mean, None if empty else self.m2 / self.count,
+            self.division_errors,
+        )
+
+    def print_summary(self):
+        '''Prints the aggregates for the 'summary' command.'''
+        report = self.report()
+        print(f"Calculations: {report.count}")
+        for operation, count in sorted(report.per_operation.items()):
+            print(f"    {operation:<14} {count:>8}")
+        if report.count:
+            print(f"Sum: {report.total}  Min: {report.minimum}  Max: {report.maximum}")
+            print(f"Mean: {report.mean}  Variance: {report.variance}")
+        print(f"Division errors: {report.division_errors} "
+              f"({report.division_error_share:.1%} of calculations)")
+
+    def copy(self) -> 'HistorySummary':
+        '''Returns an independent copy, e.g. to save it while records keep coming.'''
+        summary = HistorySummary()
+        summary.__dict__.update(vars(self))
+        summary.per_operation = dict(self.per_operation)
+        summary._min_changes = list(self._min_changes)
+        summary._max_changes = list(self._max_changes)
+        return summary
+
+    @staticmethod
+    def from_records(records: Iterable[tuple]) -> 'HistorySummary':
+        '''Builds a summary by reading every record once.'''
+        summary = HistorySummary()
+        for record in records:
+            summary.add(record)
+        return summary
+
+    def save(self, path: str, signature: list):
+        '''
+        Writes the summary to 'path' with the history's 'signature'.
+        The file is replaced at once, so a reader never sees half of it.
+        '''
+        state = dict(vars(self), signature=signature)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def load(path: str, signature: list = None) -> Optional['HistorySummary']:
+        '''
+        Loads a summary saved by save().
+        Returns None if there is none, it is unreadable, or it was saved with a
+        different signature than 'signature' (the history changed since).
+        '''
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if signature is not None and state.pop('signature', None) != signature:
+            logging.info("History summary %s is out of date.", path)
+            return None
+
+        summary = HistorySummary()
+        try:
+            for name in vars(summary):
+                setattr(summary, name, state[name])
+        except KeyError:
+            return None
+        summary._min_changes = [tuple(change) for change in summary._min_changes]
+        summary._max_changes = [tuple(change) for change in summary._max_changes]
+        return summary
+
+def history_signature(filename: str) -> list:
+    '''
+    Size and modification time of a history file, its SQLite '-wal' file,
+    or every file of a history directory. Changes whenever the history does.
+    '''
+    if os.path.isdir(filename):
+        paths = sorted(os.path.join(filename, name) for name in os.listdir(filename))
+    else:
+        paths = [filename, f"{filename}-wal"]
+
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_size == 0 and path.endswith('-wal'):
+            continue  # Created empty whenever the database is opened
+        stamps.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return stamps
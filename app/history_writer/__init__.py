@@ -0,0 +1,123 @@
+"""
+Background writer for the history storage.
+
+Features:
+- Callers only enqueue rows; a background thread writes them.
+- Enqueueing is a lock-free deque append, so many threads can write at once
+  without waiting on each other.
+- The queue is bounded, so callers block if the writer falls behind.
+- Rows are written in groups, by count or after a time interval. With
+  batch_size=1 the thread is woken as soon as a row is queued, and writes
+  every row queued while it was busy in one group.
+- flush() writes the queued rows in the calling thread, so waiting for them
+  to be durable costs no hand-off to the writer thread.
+- Drains the queue on close() or at interpreter shutdown.
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+from app.storage import Record, StorageBackend
+
+class HistoryWriter:
+    """Writes history rows to a storage backend from a background thread."""
+
+    def __init__(self, storage: StorageBackend, max_queue: int = 10000,
+                 batch_size: int = 256, flush_interval: float = 0.5):
+        """Start the writer thread for 'storage'."""
+        self.storage = storage
+        self.max_queue = max_queue  # Callers wait once this many rows are queued
+        self.batch_size = batch_size  # Flush after this many rows
+        self.flush_interval = flush_interval  # Or after this many seconds
+
+        # Rows in order. deque.append and popleft are atomic
+        self._queue = deque()
+        self._wake = threading.Event()  # Set when a batch is full and on close
+        self._drained = threading.Condition()  # Only used while the queue is full
+        # Held while rows are taken from the queue and written, so they stay in order
+        self._drain_lock = threading.Lock()
+        self._stopping = False
+
+        self._thread = threading.Thread(target=self._run, name="HistoryWriter", daemon=True)
+        self._thread.start()
+
+        # Make sure queued rows reach the file when the interpreter exits
+        atexit.register(self.close)
+
+    def write(self, row: tuple):
+        """Queue a row to be written. Blocks only if the queue is full."""
+        queue = self._queue
+        queue.append(row)
+        if len(queue) >= self.batch_size:
+            if not self._wake.is_set():
+                self._wake.set()
+            if len(queue) >= self.max_queue:
+                # The writer fell behind: wait for it to catch up instead of growing
+                with self._drained:
+                    self._drained.wait_for(
+                        lambda: len(self._queue) < self.max_queue or not self._thread.is_alive()
+                    )
+        if self._stopping:
+            self.flush()  # No thread writes the rows of a closed writer
+
+    def append_many(self, rows: list):
+        """Write a group of rows now, in one append after every row queued before them."""
+        with self._drain_lock:
+            self._drain()
+            self.storage.append_many(rows)
+
+    def pop(self) -> Record:
+        """
+        Remove and return the newest row: taken back from the queue if it is
+        not written yet, otherwise popped from the storage.
+        """
+        with self._drain_lock:
+            try:
+                # Only the lock holder takes rows, so this one is not being written
+                return tuple(self._queue.pop())
+            except IndexError:
+                return self.storage.pop()
+
+    def flush(self):
+        """Write every row queued so far to the file before returning."""
+        with self._drain_lock:
+            self._drain()
+
+    def close(self):
+        """Drain the queue and stop the writer thread. The storage stays open."""
+        atexit.unregister(self.close)
+        self._stopping = True
+        if self._thread.is_alive():
+            self._wake.set()
+            self._thread.join()
+        self.flush()
+
+    def _write_rows(self, rows: list):
+        """Write a group of rows to the storage in one append."""
+        if rows:
+            self.storage.append_many(rows)
+            logging.debug("Wrote %s rows to history.", len(rows))
+
+    def _drain(self):
+        """
+        Writes everything queued so far (with _drain_lock held),
+        in groups of up to 'max_queue' rows.
+        """
+        queue = self._queue
+        full = len(queue) >= self.max_queue  # Callers may be waiting in write()
+        while queue:
+            # Only the lock holder takes rows, so at least this many are there
+            count = min(len(queue), self.max_queue)
+            self._write_rows([queue.popleft() for _ in range(count)])
+        if full:
+            with self._drained:
+                self._drained.notify_all()
+
+    def _run(self):
+        """Writer thread loop. Wakes when a batch is full, or once per flush interval."""
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()  # Before draining, so a row queued meanwhile wakes it again
+            with self._drain_lock:
+                self._drain()
@@ -0,0 +1,188 @@
+'''
+Built-in metrics for the calculator.
+
+Every instrumented call is recorded per stage and operation:
+    - a call counter and an error counter
+    - a latency histogram with fixed buckets (BUCKETS, in seconds)
+
+Stages: create_operation, perform_operation, add_to_history, undo_last, redo_last.
+
+Metrics are off by default. While they are off, an instrumented function
+only checks one flag before calling the original function. Turn them on with
+METRICS=True or enable_metrics(). They can be read with the 'stats' command
+or written to a file in the Prometheus text format.
+'''
+
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+# Upper bounds of the latency buckets, in seconds (the last bucket is +Inf)
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+           1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+
+class Series:
+    '''Counters and latency histogram of one (stage, operation) pair.'''
+    __slots__ = ('calls', 'errors', 'total', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0  # Sum of every latency, in seconds
+        self.buckets = [0] * (len(BUCKETS) + 1)  # Not cumulative, last one is +Inf
+
+    def quantile(self, q: float) -> float:
+        '''Upper bound of the bucket holding the q-th quantile (inf if past the last bucket).'''
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+class SeriesStats(NamedTuple):
+    '''A copy of one series, safe to read while calls keep being recorded.'''
+    stage: str
+    operation: str
+    calls: int
+    errors: int
+    total: float
+    buckets: Tuple[int, ...]
+    p50: float
+    p99: float
+
+class Metrics:
+    '''Registry of every series, keyed by (stage, operation).'''
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], Series] = {}
+
+    def observe(self, stage: str, operation: str, seconds: float, error: bool = False):
+        '''Records one call.'''
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            series = self._series.get((stage, operation))
+            if series is None:
+                series = self._series[(stage, operation)] = Series()
+            series.calls += 1
+            series.errors += error
+            series.total += seconds
+            series.buckets[index] += 1
+
+    def snapshot(self) -> List[SeriesStats]:
+        '''Returns a copy of every series, sorted by stage and operation.'''
+        with self._lock:
+            return [
+                SeriesStats(stage, operation, series.calls, series.errors, series.total,
+                            tuple(series.buckets), series.quantile(0.5), series.quantile(0.99))
+                for (stage, operation), series in sorted(self._series.items())
+            ]
+
+    def reset(self):
+        '''Drops every series.'''
+        with self._lock:
+            self._series.clear()
+
+    def to_prometheus(self) -> str:
+        '''Returns every series in the Prometheus text exposition format.'''
+        histogram, calls, errors = [], [], []
+        for stats in self.snapshot():
+            labels = f'stage="{stats.stage}",operation="{stats.operation}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, stats.buckets):
+                cumulative += count
+                histogram.append(f'calculator_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                                 f'{cumulative}')
+            histogram.append(f'calculator_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                             f'{stats.calls}')
+            histogram.append(f'calculator_duration_seconds_sum{{{labels}}} {stats.total!r}')
+            histogram.append(f'calculator_duration_seconds_count{{{labels}}} {stats.calls}')
+            calls.append(f'calculator_calls_total{{{labels}}} {stats.calls}')
+            errors.append(f'calculator_errors_total{{{labels}}} {stats.errors}')
+
+        return '\n'.join([
+            '# HELP calculator_duration_seconds Time spent per call.',
+            '# TYPE calculator_duration_seconds histogram',
+            *histogram,
+            '# HELP calculator_calls_total Calls made.',
+            '# TYPE calculator_calls_total counter',
+            *calls,
+            '# HELP calculator_errors_total Calls that raised an error.',
+            '# TYPE calculator_errors_total counter',
+            *errors,
+        ]) + '\n'
+
+    def write_prometheus(self, path: str):
+        '''
+        Writes every series to 'path' in the Prometheus text format.
+        The file is replaced at once, so a scraper never reads half of it.
+        '''
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary, path)
+        logging.info("Metrics written to %s.", path)
+
+    def print_stats(self):
+        '''Prints one line per series: calls, errors and latency in microseconds.'''
+        snapshot = self.snapshot()
+        if not snapshot:
+            print("No metrics recorded yet.")
+            return
+
+        print(f"{'Stage':<18} {'Operation':<14} {'Calls':>8} {'Errors':>7} "
+              f"{'Mean µs':>9} {'p50 µs':>8} {'p99 µs':>8}")
+        for stats in snapshot:
+            mean = stats.total / stats.calls * 1e6
+            print(f"{stats.stage:<18} {stats.operation or '-':<14} {stats.calls:>8} "
+                  f"{stats.errors:>7} {mean:>9.1f} {_micro(stats.p50):>8} {_micro(stats.p99):>8}")
+
+def _micro(seconds: float) -> str:
+    '''Formats a bucket bound in microseconds.'''
+    return '>1e6' if seconds == float('inf') else f"{seconds * 1e6:g}"
+
+# Metrics of this process
+METRICS = Metrics()
+
+def enable_metrics():
+    '''Starts recording metrics.'''
+    METRICS.enabled = True
+
+def disable_metrics():
+    '''Stops recording metrics (recorded series are kept).'''
+    METRICS.enabled = False
+
+def configure_metrics():
+    '''Turns metrics on if METRICS is True.'''
+    if os.getenv('METRICS') == 'True':
+        enable_metrics()
+
+def timed(stage: str, label: Callable[..., str] = None):
+    '''
+    Decorator that records calls of the decorated function under 'stage'.
+    'label' gets the same arguments as the function and returns the operation name.
+    Costs one flag check per call while metrics are off.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+
+            error = True
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                METRICS.observe(stage, label(*args, **kwargs) if label else '', seconds, error)
+        return wrapper
+    return decorator
@@ -2,34 +2,59 @@
 Uses the Factory Pattern to dynamically instantiate the appropriate operation class
 based on user input.
 
+Operations come from the registry in app.operations, which is built once when the
+operations are defined. Creating an operation is a single dictionary lookup that
+returns the shared instance.
+
 Exceptions:
-- Raises KeyError if incorrect input is entered
+- Raises ValueError if incorrect input is entered
 '''
 
 import logging
-from app.operations import OperationTemplate, Add, Subtract, Multiply, Divide
+import threading
+from app.metrics import timed
+from app.operations import OperationTemplate, OPERATIONS, register_operation, load_entry_points
+
+def _metric_label(operation: str) -> str:
+    '''Operation name used in metrics. Unknown names share one label.'''
+    operation = operation.lower()
+    return operation if operation in OPERATIONS else 'unknown'
 
 class OperationFactory:
     '''
     Factory class that creates instances of operations based on the operation type.
     '''
+    # Decorator to register new operations without editing the factory
+    register_operation = staticmethod(register_operation)
+
+    # Entry points are only looked at the first time a name is missing
+    _entry_points_loaded = False
+    _entry_points_lock = threading.RLock()
+
     @staticmethod
+    @timed('create_operation', _metric_label)
     def create_operation(operation: str) -> OperationTemplate:
         '''
-        Creates an instance of the correct operation subclass based on user input.
+        Returns the shared instance of the correct operation subclass based on user input.
         '''
-
-        # dictionary matching operation commands to operation class
-        operations_map = {
-            'add': Add(),
-            'subtract': Subtract(),
-            'multiply': Multiply(),
-            'divide': Divide(),
-        }
+        logging.debug("Creating operation: %s", operation)
+        name = operation.lower()
+        if name not in OPERATIONS:
+            # Give installed plugins one chance to register the operation.
+            # Other threads missing a name wait here until the plugins are loaded.
+            with OperationFactory._entry_points_lock:
+                if not OperationFactory._entry_points_loaded:
+                    # Set first, so a plugin looking up an operation does not load again
+                    OperationFactory._entry_points_loaded = True
+                    load_entry_points()
 
         try:
-            logging.debug("Creating operation: %s", operation)
-            return operations_map[operation.lower()]
+            return OPERATIONS[name]
         except KeyError as exc:
             logging.error("Tried to call unknown operation.")
             raise ValueError("Operation does not exist.") from exc
+
+    @staticmethod
+    def available_operations() -> list:
+        '''Returns the names of every registered operation.'''
+        return list(OPERATIONS)
@@ -4,16 +4,104 @@ Operations:
     - Subtract
     - Multiply
     - Divide
+    - Power
+    - Modulo
+    - IntegerDivide
 All inputs and outputs are typehinted to be floats.
+Batches of operands can be calculated at once with 'calculate_many'.
+
+Every operation is registered once, under its command name, with the
+'register_operation' decorator. New operations can be added the same way
+from any module, or from a package's 'calculator.operations' entry points.
 '''
 
+from __future__ import annotations
 from abc import ABC, abstractmethod # Importing abstract base classes (ABC) and methods
 import logging
+from typing import TYPE_CHECKING
+from app.config import LogSampler
+
+if TYPE_CHECKING:  # NumPy is only imported once a batch is calculated
+    import numpy as np
+
+# Policies for handling division by zero inside a batch
+ZERO_DIVISION_POLICIES = ('raise', 'nan', 'mask')
+
+# Registry of shared operation instances by command name, e.g. {'add': Add()}
+OPERATIONS = {}
+
+# Entry point group other packages can use to provide operations
+ENTRY_POINT_GROUP = 'calculator.operations'
+
+class DivisionByZeroError(ValueError):
+    '''Raised when an operation divides by zero. Counted by the history summary.'''
+
+def register_operation(name: str, opcode: int = None):
+    '''
+    Class decorator that registers one shared instance of an operation under 'name'.
+    Operations are stateless, so every caller can use the same instance.
+    'opcode' is the byte the binary history storage uses for the operation.
+    Raises ValueError if the name or opcode is already taken.
+    '''
+    def decorator(cls):
+        name_key = name.lower()
+        if name_key in OPERATIONS:
+            raise ValueError(f"Operation '{name_key}' is already registered.")
+        if opcode is not None and any(op.opcode == opcode for op in OPERATIONS.values()):
+            raise ValueError(f"Opcode {opcode} is already registered.")
+
+        cls.opcode = opcode
+        OPERATIONS[name_key] = cls()
+        return cls
+    return decorator
+
+def load_entry_points():
+    '''
+    Imports the modules behind the 'calculator.operations' entry points,
+    so their operations register themselves. Only called when a lookup misses.
+    '''
+    from importlib.metadata import entry_points  # pylint: disable=import-outside-toplevel
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            entry_point.load()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.exception("Could not load operation entry point: %s", entry_point.name)
+
+def _check_divisor(b: float):
+    '''Raises DivisionByZeroError for a zero divisor.'''
+    if b == 0:
+        # Sends an error message when someone tries to divide by zero.
+        logging.error("Attempted to divide by zero.")
+        raise DivisionByZeroError("Cannot divide by zero.")
+
+def _execute_dividing(ufunc: str, a: np.ndarray, b: np.ndarray, zero_division: str) -> np.ndarray:
+    '''
+    Runs a dividing NumPy ufunc ('divide', 'mod', 'floor_divide') on two arrays.
+    Pairs dividing by zero are handled by the 'zero_division' policy.
+    '''
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    function = getattr(np, ufunc)
+    zeros = b == 0
+    if not zeros.any():
+        return function(a, b)
+
+    if zero_division == 'raise':
+        logging.error("Attempted to divide by zero in %s of %s pairs.", zeros.sum(), b.size)
+        raise DivisionByZeroError("Cannot divide by zero.")
+
+    # Only divide where the divisor is not zero, other slots stay NaN
+    result = function(a, b, out=np.full(a.shape, np.nan), where=~zeros)
+    if zero_division == 'mask':
+        return np.ma.masked_array(result, mask=zeros)
+    return result
 
 class OperationTemplate(ABC):
     '''
     Abstract base class defining the template for arithmetic operations.
     All subclasses must implement the 'execute' method.
+    'opcode' is set when the subclass is registered.
+    Each subclass gets its own log sampler, so sampling is per operation.
 
     
     Template method 'calculate' makes each operation:
@@ -21,6 +109,12 @@ class OperationTemplate(ABC):
         2. Execute the operation
         3. Logs the result
     '''
+    opcode = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._log_sampler = LogSampler()
+
     def calculate(self, a: float, b: float) -> float:
         '''
         Template method for performing the operation:
@@ -33,6 +127,24 @@ class OperationTemplate(ABC):
         self.log_result(a, b, result)
         return result
 
+    def calculate_many(self, a, b, zero_division: str = 'raise') -> np.ndarray:
+        '''
+        Batch version of the template method for arrays of operands:
+            1. Validate the whole batch once
+            2. Execute operation on every pair at once
+            3. Log one summary for the batch
+
+        'a' and 'b' can be NumPy arrays or any buffer-protocol sequence.
+        'zero_division' decides what happens to pairs that divide by zero:
+            - 'raise': raise ValueError (nothing is returned)
+            - 'nan':   put NaN in the result for those pairs
+            - 'mask':  return a masked array with those pairs masked
+        '''
+        a, b = self.validate_many(a, b, zero_division)
+        result = self.execute_many(a, b, zero_division)
+        self.log_many(a, result)
+        return result
+
     def validate(self, a: float, b: float):
         '''
         Checks if inputs are either integers or floats.
@@ -42,9 +154,51 @@ class OperationTemplate(ABC):
             logging.error("Invalid input: %s, %s (Inputs must be numbers)", a, b)
             raise ValueError("Both inputs must be numbers.")
 
+    def validate_many(self, a, b, zero_division: str = 'raise'):
+        '''
+        Checks a batch of operands once and converts them to float arrays.
+        Raises ValueError for non-numeric data, mismatched shapes
+        or an unknown zero division policy.
+        '''
+        if zero_division not in ZERO_DIVISION_POLICIES:
+            raise ValueError(f"Unknown zero division policy: {zero_division}.")
+
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        try:
+            a, b = np.asarray(a), np.asarray(b)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Both inputs must be numbers.") from exc
+
+        # Only integer and float arrays count as numbers (no bools, strings or objects)
+        if a.dtype.kind not in 'iuf' or b.dtype.kind not in 'iuf':
+            logging.error("Invalid batch input: %s, %s (Inputs must be numbers)", a.dtype, b.dtype)
+            raise ValueError("Both inputs must be numbers.")
+
+        if a.shape != b.shape:
+            logging.error("Invalid batch input: shapes %s and %s do not match", a.shape, b.shape)
+            raise ValueError("Both inputs must have the same shape.")
+
+        return a.astype(np.float64, copy=False), b.astype(np.float64, copy=False)
+
+    def execute_many(
+        self, a: np.ndarray, b: np.ndarray, zero_division: str = 'raise'
+    ) -> np.ndarray:
+        '''
+        Executes the operation on whole arrays.
+        NumPy arrays support the same operators as floats, so by default
+        this reuses 'execute'. Subclasses override it when they need to.
+        '''
+        return self.execute(a, b)
+
     def log_result(self, a: float, b: float, result: float):
-        '''Logs result of operation'''
-        logging.info("Operation performed: %s and %s -> Result: %s", a, b, result)
+        '''Logs result of operation (sampled, errors are logged elsewhere)'''
+        if self._log_sampler():
+            logging.info("Operation performed: %s and %s -> Result: %s", a, b, result)
+
+    def log_many(self, a: np.ndarray, result: np.ndarray):
+        '''Logs one summary for a batch of operations'''
+        logging.info("Batch operation performed: %s on %s pairs", self, a.size)
 
     @abstractmethod
     def execute(self, a: float, b: float) -> float:
@@ -64,6 +218,7 @@ class OperationTemplate(ABC):
 # ARITHMETIC OPERATIONS START HERE
 # --------------------------------
 
+@register_operation('add', opcode=1)
 class Add(OperationTemplate):
     '''
     Addition operation inheriting from OperationTemplate.
@@ -78,6 +233,7 @@ class Add(OperationTemplate):
         '''String representation for debugging'''
         return "Add"
 
+@register_operation('subtract', opcode=2)
 class Subtract(OperationTemplate):
     '''
     Subtraction operation inheriting from OperationTemplate.
@@ -92,6 +248,7 @@ class Subtract(OperationTemplate):
         '''String representation for debugging'''
         return "Subtract"
 
+@register_operation('multiply', opcode=3)
 class Multiply(OperationTemplate):
     '''
     Multiplication operation inheriting from OperationTemplate.
@@ -106,6 +263,7 @@ class Multiply(OperationTemplate):
         '''String representation for debugging'''
         return "Multiply"
 
+@register_operation('divide', opcode=4)
 class Divide(OperationTemplate):
     '''
     Division operation inheriting from OperationTemplate.
@@ -114,12 +272,97 @@ class Divide(OperationTemplate):
         '''
         Returns the quotient of two floats.
         '''
-        if b == 0:
-            # Sends an error message when someone tries to divide by zero.
-            logging.error("Attempted to divide by zero.")
-            raise ValueError("Cannot divide by zero.")
+        _check_divisor(b)
         return a / b
 
+    def execute_many(
+        self, a: np.ndarray, b: np.ndarray, zero_division: str = 'raise'
+    ) -> np.ndarray:
+        '''
+        Returns the quotients of two float arrays.
+        Pairs dividing by zero are handled by the 'zero_division' policy.
+        '''
+        return _execute_dividing('divide', a, b, zero_division)
+
     def __repr__(self):
         '''String representation for debugging'''
         return "Divide"
+
+@register_operation('power', opcode=5)
+class Power(OperationTemplate):
+    '''
+    Power operation inheriting from OperationTemplate.
+    '''
+    def execute(self, a: float, b: float) -> float:
+        '''
+        Returns a raised to the power of b.
+        '''
+        try:
+            result = a ** b
+        except ZeroDivisionError as exc:
+            # Zero to a negative power
+            logging.error("Attempted to divide by zero.")
+            raise DivisionByZeroError("Cannot divide by zero.") from exc
+        except OverflowError as exc:
+            logging.error("Result of %s ** %s is too large.", a, b)
+            raise ValueError("Result is too large.") from exc
+
+        if isinstance(result, complex):
+            # Negative number to a fractional power
+            logging.error("Result of %s ** %s is not a real number.", a, b)
+            raise ValueError("Result is not a real number.")
+        return result
+
+    def __repr__(self):
+        '''String representation for debugging'''
+        return "Power"
+
+@register_operation('modulo', opcode=6)
+class Modulo(OperationTemplate):
+    '''
+    Modulo operation inheriting from OperationTemplate.
+    '''
+    def execute(self, a: float, b: float) -> float:
+        '''
+        Returns the remainder of a divided by b (same sign as b).
+        '''
+        _check_divisor(b)
+        return a % b
+
+    def execute_many(
+        self, a: np.ndarray, b: np.ndarray, zero_division: str = 'raise'
+    ) -> np.ndarray:
+        '''
+        Returns the remainders of two float arrays.
+        Pairs dividing by zero are handled by the 'zero_division' policy.
+        '''
+        return _execute_dividing('mod', a, b, zero_division)
+
+    def __repr__(self):
+        '''String representation for debugging'''
+        return "Modulo"
+
+@register_operation('intdivide', opcode=7)
+class IntegerDivide(OperationTemplate):
+    '''
+    Integer division operation inheriting from OperationTemplate.
+    '''
+    def execute(self, a: float, b: float) -> float:
+        '''
+        Returns the quotient of two floats rounded down.
+        '''
+        _check_divisor(b)
+        return a // b
+
+    def execute_many(
+        self, a: np.ndarray, b: np.ndarray, zero_division: str = 'raise'
+    ) -> np.ndarray:
+        '''
+        Returns the rounded down quotients of two float arrays.
+        Pairs dividing by zero are handled by the 'zero_division' policy.
+        '''
+        return _execute_dividing('floor_divide', a, b, zero_division)
+
+    def __repr__(self):
+        '''String representation for debugging'''
+        return "IntegerDivide"
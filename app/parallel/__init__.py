@@ -0,0 +1,169 @@
+'''
+Parallel batch mode for large command files.
+
+The file is split into byte ranges that end on a line boundary, each range
+is evaluated by a worker process, and the results are merged back in input
+order. Output, error line numbers and history rows come out exactly as the
+single-process batch mode would write them.
+
+Usage:
+    python main.py --batch commands.txt --workers 8
+'''
+
+import io
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, TextIO, Tuple
+from app.config import configure_logging
+from app.batch import BUFFER_SIZE, read_commands
+from app.calculator import parse_calculation
+from app.calculation import Calculation
+from app.history_manager import History
+from app.operation_factory import OperationFactory
+from app.operations import DivisionByZeroError
+from app.result_cache import configure_cache
+
+# Bytes of input per chunk (each chunk is one task for a worker)
+CHUNK_SIZE = 16 << 20
+
+# Chunks in flight per worker, bounds how many finished results wait to be merged
+CHUNKS_PER_WORKER = 2
+
+class ChunkResult(NamedTuple):
+    '''What a worker sends back for one chunk.'''
+    output: str  # One result per line, ready to write
+    errors: List[Tuple[int, str]]  # (line number inside the chunk, message)
+    rows: List[Tuple[str, float, float, float]]  # (command name, num1, num2, result)
+    lines: int  # Lines read from the chunk
+    stopped: bool  # True if the chunk has an 'exit' command
+    division_errors: int = 0  # Errors that were divisions by zero
+
+def chunk_ranges(path: str, chunk_size: int = CHUNK_SIZE) -> List[Tuple[int, int]]:
+    '''
+    Splits a file into (start, end) byte ranges of about 'chunk_size' bytes.
+    Every range except the last ends right after a newline.
+    '''
+    ranges = []
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        start = 0
+        while start < size:
+            file.seek(min(start + chunk_size, size))
+            file.readline()  # Move to the end of the line the boundary falls in
+            end = min(file.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def count_lines(data: bytes) -> int:
+    '''Counts lines the way text mode reads them ('\n', '\r\n' and '\r' all end a line).'''
+    endings = data.count(b'\n') + data.count(b'\r') - data.count(b'\r\n')
+    return endings + (bool(data) and not data.endswith((b'\n', b'\r')))
+
+def evaluate_chunk(path: str, start: int, end: int) -> ChunkResult:
+    '''
+    Worker task: evaluates the commands in bytes [start, end) of 'path'.
+    Line numbers in the result are relative to the start of the chunk.
+    '''
+    with open(path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+
+    # newline=None reads '\r\n' and '\r' line endings like the batch mode's text file
+    lines = io.StringIO(data.decode('utf-8'), newline=None)
+
+    output, errors, rows = [], [], []
+    division_errors = 0
+    stopped = False
+    for line_number, command in read_commands(lines):
+        if command.lower() == 'exit':
+            stopped = True
+            break
+        try:
+            operation, num1, num2 = parse_calculation(command)
+            result = Calculation(operation, num1, num2).perform_operation()
+        except ValueError as e:
+            errors.append((line_number, str(e)))
+            division_errors += isinstance(e, DivisionByZeroError)
+            continue
+        output.append(f"{result}\n")
+        rows.append((command.split(maxsplit=1)[0].lower(), num1, num2, result))
+
+    # Lines in the chunk, needed to number the next chunk's lines
+    return ChunkResult(''.join(output), errors, rows, count_lines(data), stopped,
+                       division_errors)
+
+def _init_worker():
+    '''Loads the configuration once in every worker process.'''
+    configure_logging()
+    configure_cache()
+
+def run_parallel(path: str, output: TextIO, errors: TextIO, history: History = None,
+                 workers: int = None, chunk_size: int = CHUNK_SIZE) -> int:
+    '''
+    Evaluates the commands in 'path' on a process pool and merges the results in order.
+    Errors are written to 'errors' as 'line <n>: <message>' with lines counted
+    from the start of the file. Stops at the first 'exit' command.
+    Returns the number of lines that failed.
+    '''
+    workers = workers or os.cpu_count() or 1
+    ranges = deque(chunk_ranges(path, chunk_size))
+    failed = 0
+    lines_before = 0  # Lines in the chunks merged so far
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = deque()
+        while ranges or pending:
+            # Keep every worker busy without holding the whole file's results in memory
+            while ranges and len(pending) < workers * CHUNKS_PER_WORKER:
+                pending.append(executor.submit(evaluate_chunk, path, *ranges.popleft()))
+
+            chunk = pending.popleft().result()  # Oldest chunk first, so order is kept
+            output.write(chunk.output)
+            for line_number, message in chunk.errors:
+                logging.error("Invalid input or error on line %s: %s",
+                              lines_before + line_number, message)
+                errors.write(f"line {lines_before + line_number}: {message}\n")
+            failed += len(chunk.errors)
+
+            if history is not None:
+                for name, num1, num2, result in chunk.rows:
+                    history.add_to_history(OperationFactory.create_operation(name),
+                                           num1, num2, result)
+                for _ in range(chunk.division_errors):
+                    history.record_division_error()
+
+            lines_before += chunk.lines
+            if chunk.stopped:
+                # Everything after 'exit' is dropped, like in the batch mode
+                for future in pending:
+                    future.cancel()
+                break
+
+    output.flush()
+    return failed
+
+def parallel_batch(source: str, workers: int = None, record_history: bool = True,
+                   chunk_size: int = CHUNK_SIZE) -> int:
+    '''
+    Runs the parallel batch mode on a file. Results go to stdout, errors to stderr.
+    Raises ValueError for stdin, which cannot be split into byte ranges.
+    Returns the number of lines that failed.
+    '''
+    if source == '-':
+        raise ValueError("Parallel batch mode needs a file, not stdin.")
+
+    configure_logging()
+
+    history = History(write_behind=True) if record_history else None
+
+    with open(sys.stdout.fileno(), mode='w', buffering=BUFFER_SIZE,
+              encoding='utf-8', closefd=False) as output:
+        try:
+            return run_parallel(source, output, sys.stderr, history, workers, chunk_size)
+        finally:
+            if history is not None:
+                history.close()  # Write out any queued history
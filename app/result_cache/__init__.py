@@ -0,0 +1,182 @@
+'''
+Opt-in memoization cache for calculation results.
+
+Repeated (operation, operand1, operand2) triples are answered from the
+cache, skipping validation, execution and logging entirely. Only
+successful results are stored; inputs that raise are calculated again.
+
+Eviction policies:
+    - 'lru': drops the least recently used result
+    - 'lfu': drops the least frequently used result (oldest first on ties)
+
+The cache is off by default. Turn it on with enable_cache() or with the
+RESULT_CACHE_SIZE (and optionally RESULT_CACHE_POLICY) environment variables.
+'''
+
+import logging
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Hashable, NamedTuple, Optional
+from app.config import load_env
+from app.operations import OperationTemplate
+
+# Supported eviction policies
+CACHE_POLICIES = ('lru', 'lfu')
+
+class CacheStats(NamedTuple):
+    '''Counters of a ResultCache.'''
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+    policy: str
+
+    @property
+    def hit_rate(self) -> float:
+        '''Share of lookups answered from the cache (0.0 before any lookup).'''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+class ResultCache:
+    '''
+    Bounded result cache with LRU or LFU eviction.
+    Safe to share between threads.
+    '''
+    def __init__(self, maxsize: int = 1024, policy: str = 'lru'):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Unknown cache policy: {policy}.")
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._values = {}
+        # LRU: keys in use order. LFU: use count per key and keys per use count
+        self._order = OrderedDict()
+        self._counts = {}
+        self._buckets = defaultdict(OrderedDict)
+        self._min_count = 0
+        self._hits = self._misses = self._evictions = 0
+
+    def get(self, key: Hashable, compute: Callable[[], float]) -> float:
+        '''
+        Returns the cached result for 'key', or calls 'compute' and caches its result.
+        Exceptions from 'compute' are not cached.
+        '''
+        with self._lock:
+            if key in self._values:
+                self._hits += 1
+                self._touch(key)
+                return self._values[key]
+            self._misses += 1
+
+        # Calculated outside the lock, so a slow calculation does not block other threads
+        result = compute()
+
+        with self._lock:
+            if key not in self._values:
+                if len(self._values) >= self.maxsize:
+                    self._evict()
+                self._insert(key, result)
+        return result
+
+    def _touch(self, key: Hashable):
+        '''Records a use of 'key'.'''
+        if self.policy == 'lru':
+            self._order.move_to_end(key)
+            return
+
+        count = self._counts[key]
+        del self._buckets[count][key]
+        if not self._buckets[count]:
+            del self._buckets[count]
+            if self._min_count == count:
+                self._min_count = count + 1
+        self._counts[key] = count + 1
+        self._buckets[count + 1][key] = None
+
+    def _insert(self, key: Hashable, result: float):
+        '''Stores a new result.'''
+        self._values[key] = result
+        if self.policy == 'lru':
+            self._order[key] = None
+        else:
+            self._counts[key] = 1
+            self._buckets[1][key] = None
+            self._min_count = 1
+
+    def _evict(self):
+        '''Drops one result chosen by the policy.'''
+        if self.policy == 'lru':
+            key, _ = self._order.popitem(last=False)
+        else:
+            bucket = self._buckets[self._min_count]
+            key, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self._buckets[self._min_count]
+            del self._counts[key]
+        del self._values[key]
+        self._evictions += 1
+
+    def stats(self) -> CacheStats:
+        '''Returns the hit, miss and eviction counters.'''
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions,
+                              len(self._values), self.maxsize, self.policy)
+
+    def clear(self):
+        '''Drops every result and resets the counters.'''
+        with self._lock:
+            self._values.clear()
+            self._order.clear()
+            self._counts.clear()
+            self._buckets.clear()
+            self._min_count = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+# The cache used by calculations, None while memoization is off
+_cache: Optional[ResultCache] = None
+
+def enable_cache(maxsize: int = 1024, policy: str = 'lru') -> ResultCache:
+    '''Turns memoization on with a new, empty cache and returns it.'''
+    global _cache  # pylint: disable=global-statement
+    _cache = ResultCache(maxsize, policy)
+    logging.info("Result cache enabled: %s entries, %s eviction.", maxsize, policy)
+    return _cache
+
+def disable_cache():
+    '''Turns memoization off and drops the cache.'''
+    global _cache  # pylint: disable=global-statement
+    _cache = None
+
+def get_cache() -> Optional[ResultCache]:
+    '''Returns the active cache, or None if memoization is off.'''
+    return _cache
+
+def configure_cache() -> Optional[ResultCache]:
+    '''
+    Turns memoization on if RESULT_CACHE_SIZE is set to a positive number.
+    RESULT_CACHE_POLICY picks the eviction policy ('lru' by default).
+    '''
+    load_env()
+    size = int(os.getenv('RESULT_CACHE_SIZE', '0'))
+    if size > 0:
+        return enable_cache(size, os.getenv('RESULT_CACHE_POLICY', 'lru').lower())
+    return None
+
+def cached_calculate(operation: OperationTemplate, a: float, b: float) -> float:
+    '''
+    Calculates 'a' and 'b' with 'operation', using the cache if memoization is on.
+    '''
+    cache = _cache
+    if cache is None:
+        return operation.calculate(a, b)
+    # repr keeps 1 apart from 1.0 and 0.0 apart from -0.0, so results match exactly
+    key = (type(operation), repr(a), repr(b))
+    return cache.get(key, lambda: operation.calculate(a, b))
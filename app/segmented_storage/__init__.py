@@ -0,0 +1,179 @@
+"""
+Segmented storage backend for the calculation history.
+
+Features:
+- History is a directory of numbered CSV segments instead of one growing file.
+- New records go to the small active segment, which is rotated once it
+  reaches 'segment_size' bytes.
+- Rotated (sealed) segments are compressed with gzip or lzma.
+- Undo and tail only touch the active segment unless they need older records.
+- iter_records() streams every record across all segments in order.
+
+Layout of the directory:
+    000001.csv.gz  000002.csv.gz  ...  000007.csv   (last one is active)
+"""
+
+import csv
+import gzip
+import logging
+import lzma
+import os
+import re
+import shutil
+from typing import Iterable, Iterator, List, Optional, Tuple
+from app.storage import CsvStorage, Record, StorageBackend, _parse_line
+
+# Active segment size (bytes) that triggers a rotation
+SEGMENT_SIZE = 1 << 20
+
+# Compressors for sealed segments: name -> (file extension, open function)
+COMPRESSIONS = {
+    'gzip': ('.gz', gzip.open),
+    'lzma': ('.xz', lzma.open),
+}
+
+# Segment file names: '000001.csv', or '000001.csv.gz' / '000001.csv.xz' once sealed
+SEGMENT_PATTERN = re.compile(r'^(\d{6})\.csv(\.gz|\.xz)?$')
+
+class SegmentedStorage(StorageBackend):
+    '''
+    Stores records in a directory of CSV segments.
+    Only the active segment is ever written; sealed segments are compressed.
+    '''
+    def __init__(self, filename: str, segment_size: int = None, compression: str = None):
+        super().__init__(filename)
+        self.segment_size = segment_size or int(
+            os.getenv('HISTORY_SEGMENT_SIZE', str(SEGMENT_SIZE))
+        )
+        self.compression = (compression or os.getenv('HISTORY_COMPRESSION', 'gzip')).lower()
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {self.compression}.")
+
+        os.makedirs(filename, exist_ok=True)
+        self._sealed, active = self._scan()
+        self._active_index = active if active is not None else self._next_index()
+        self._active = CsvStorage(self._path(self._active_index))
+
+    def _path(self, index: int, extension: str = '') -> str:
+        '''Path of segment 'index', with a compression extension once sealed.'''
+        return os.path.join(self.filename, f"{index:06d}.csv{extension}")
+
+    def _next_index(self) -> int:
+        '''Index for a new active segment.'''
+        return self._sealed[-1][0] + 1 if self._sealed else 1
+
+    def _scan(self) -> Tuple[List[Tuple[int, str]], Optional[int]]:
+        '''
+        Lists the sealed segments as (index, extension) and the active segment's index.
+        A plain segment that also exists sealed was being rotated when the process
+        stopped; the sealed copy is complete, so the plain one is removed.
+        '''
+        sealed, plain = {}, []
+        for name in os.listdir(self.filename):
+            match = SEGMENT_PATTERN.match(name)
+            if match is None:
+                continue
+            index = int(match.group(1))
+            if match.group(2):
+                sealed[index] = match.group(2)
+            else:
+                plain.append(index)
+
+        for index in [index for index in plain if index in sealed]:
+            os.remove(self._path(index))
+            plain.remove(index)
+
+        return sorted(sealed.items()), max(plain, default=None)
+
+    def _open_sealed(self, index: int, extension: str):
+        '''Opens a sealed segment for reading as text.'''
+        opener = next(opener for ext, opener in COMPRESSIONS.values() if ext == extension)
+        return opener(self._path(index, extension), mode='rt', encoding='utf-8', newline='')
+
+    def _rotate(self):
+        '''Seals the active segment (compressed) and starts a new one.'''
+        self._active.close()
+        extension, opener = COMPRESSIONS[self.compression]
+        source = self._path(self._active_index)
+        target = self._path(self._active_index, extension)
+
+        # Write the compressed copy under a temporary name, then rename it in one step
+        with open(source, mode='rb') as plain, opener(f"{target}.tmp", mode='wb') as packed:
+            shutil.copyfileobj(plain, packed)
+        os.replace(f"{target}.tmp", target)
+        os.remove(source)
+
+        self._sealed.append((self._active_index, extension))
+        logging.info("History segment %s sealed.", target)
+        self._active_index += 1
+        self._active = CsvStorage(self._path(self._active_index))
+
+    def _unseal_last(self):
+        '''Makes the newest sealed segment the active one again (used by undo).'''
+        index, extension = self._sealed.pop()
+        self._active.close()
+        os.remove(self._path(self._active_index))  # The empty active segment
+
+        target = self._path(index)
+        with self._open_sealed(index, extension) as packed, \
+             open(f"{target}.tmp", mode='w', encoding='utf-8', newline='') as plain:
+            shutil.copyfileobj(packed, plain)
+        os.replace(f"{target}.tmp", target)
+        os.remove(self._path(index, extension))
+
+        self._active_index = index
+        self._active = CsvStorage(target)
+
+    def append_many(self, records: Iterable[Record]):
+        if os.path.getsize(self._active.filename) >= self.segment_size:
+            self._rotate()
+        self._active.append_many(records)
+
+    def pop(self) -> Optional[Record]:
+        record = self._active.pop()
+        while record is None and self._sealed:
+            # The active segment is empty, continue with the previous one
+            self._unseal_last()
+            record = self._active.pop()
+        return record
+
+    def _sealed_records(self, index: int, extension: str) -> Iterator[Record]:
+        '''Streams the records of one sealed segment.'''
+        with self._open_sealed(index, extension) as file:
+            rows = csv.reader(file)
+            next(rows, None)  # Header
+            for operation, operand1, operand2, result in rows:
+                yield operation, float(operand1), float(operand2), float(result)
+
+    def tail(self, count: int, skip: int = 0) -> List[Record]:
+        wanted = count + skip
+        records = self._active.tail(wanted)
+
+        # Older records come from the sealed segments, newest first
+        for index, extension in reversed(self._sealed):
+            if len(records) >= wanted:
+                break
+            older = list(self._sealed_records(index, extension))
+            records = older[max(0, len(older) - (wanted - len(records))):] + records
+
+        return records[max(0, len(records) - wanted):max(0, len(records) - skip)]
+
+    def iter_records(self) -> Iterator[Record]:
+        '''Streams every record, oldest first, one segment at a time.'''
+        for index, extension in list(self._sealed):
+            yield from self._sealed_records(index, extension)
+
+        # Appends are flushed after every group, so the active file is up to date
+        with open(self._active.filename, mode='rb') as file:
+            next(file, None)  # Header
+            for line in file:
+                yield _parse_line(line)
+
+    def segments(self) -> List[str]:
+        '''Paths of every segment, oldest first. The last one is active.'''
+        return [self._path(index, extension) for index, extension in self._sealed] + [
+            self._active.filename
+        ]
+
+    def close(self):
+        self._active.close()
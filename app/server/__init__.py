@@ -0,0 +1,157 @@
+'''
+Calculator server: serves the calculator to many clients over TCP or a Unix socket.
+
+Line protocol, one request per line and one response per line, in order:
+    <operation> <num1> <num2>   ->  ok <result>
+    eval <expression>           ->  ok <result>   ('ans' is the connection's last result)
+    quit | exit                 ->  closes the connection
+Invalid requests get 'error <message>' and the connection stays open.
+
+Clients can pipeline: write many requests without waiting, then read the responses.
+Every connection is a coroutine on one event loop, so a single process can hold
+thousands of idle or busy clients. Backpressure comes from the stream limits:
+a client that stops reading stalls only its own connection once its write
+buffer is full, and lines longer than MAX_LINE_BYTES are rejected.
+
+Usage:
+    python main.py --serve 127.0.0.1:8765
+    python main.py --unix /tmp/calculator.sock
+'''
+
+import asyncio
+import logging
+from typing import Optional
+from app.config import configure_logging
+from app.calculator import parse_calculation
+from app.calculation import Calculation
+from app.expression import compile_expression
+from app.metrics import configure_metrics
+from app.operations import DivisionByZeroError
+from app.result_cache import configure_cache
+from app.history_manager import History
+
+# Longest request line accepted, in bytes
+MAX_LINE_BYTES = 64 * 1024
+
+# Pending responses per connection before writing waits for the client to read
+WRITE_BUFFER_HIGH = 256 * 1024
+
+# Connections the OS queues while the server accepts others
+BACKLOG = 1024
+
+class CalculatorServer:
+    '''
+    Serves calculator requests on an asyncio event loop.
+    Uses the same command grammar, operations and history as the REPL.
+    '''
+    def __init__(self, history: Optional[History] = None):
+        self.history = history  # Calculations are recorded here if given
+        self.connections = 0  # Clients connected right now
+
+    def handle_command(self, command: str, variables: dict) -> str:
+        '''
+        Evaluates one request and returns its response line (without newline).
+        'variables' holds the connection's 'ans'.
+        '''
+        try:
+            if command.split()[:1] == ['eval']:
+                expression = compile_expression(command.split(maxsplit=1)[1])
+                operation, num1, num2, result = expression.evaluate_parts(variables)
+            else:
+                operation, num1, num2 = parse_calculation(command)
+                result = Calculation(operation, num1, num2).perform_operation()
+        except (ValueError, IndexError) as e:
+            logging.error("Invalid request: %s", e)
+            if self.history is not None and isinstance(e, DivisionByZeroError):
+                self.history.record_division_error()
+            return f"error {e}"
+
+        variables['ans'] = result
+        if self.history is not None and operation is not None:
+            self.history.add_to_history(operation, num1, num2, result)
+        return f"ok {result}"
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        '''Answers every request on one connection until the client leaves.'''
+        self.connections += 1
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+        variables = {}  # Each connection has its own 'ans'
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than MAX_LINE_BYTES; the rest of the stream cannot be trusted
+                    writer.write(b"error Line is too long.\n")
+                    break
+                if not line:
+                    break  # Client closed the connection
+
+                command = line.decode('utf-8', errors='replace').strip()
+                if not command:
+                    continue
+                if command.lower() in ('quit', 'exit'):
+                    break
+
+                writer.write(f"{self.handle_command(command.lower(), variables)}\n".encode())
+                # Only waits if the client is not reading its responses
+                await writer.drain()
+        except ConnectionError:
+            logging.info("Client disconnected.")
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start_tcp(self, host: str, port: int) -> asyncio.Server:
+        '''Starts listening on a TCP address. Port 0 picks a free port.'''
+        return await asyncio.start_server(self.handle_client, host, port,
+                                          limit=MAX_LINE_BYTES, backlog=BACKLOG)
+
+    async def start_unix(self, path: str) -> asyncio.Server:
+        '''Starts listening on a Unix socket.'''
+        return await asyncio.start_unix_server(self.handle_client, path,
+                                               limit=MAX_LINE_BYTES, backlog=BACKLOG)
+
+def parse_address(address: str):
+    '''
+    Parses '[host:]port' into (host, port). The host defaults to 127.0.0.1.
+    Raises ValueError for an invalid address.
+    '''
+    host, _, port = address.rpartition(':')
+    if not port.isdigit():
+        raise ValueError("Usage: [host:]port")
+    return host.strip('[]') or '127.0.0.1', int(port)  # '[::1]' is an IPv6 host
+
+async def _serve(server: CalculatorServer, address: Optional[str], path: Optional[str]):
+    '''Runs the server until it is cancelled.'''
+    if path is not None:
+        listener = await server.start_unix(path)
+    else:
+        listener = await server.start_tcp(*parse_address(address))
+
+    logging.info("Server listening on %s.", path or address)
+    async with listener:
+        await listener.serve_forever()
+
+def serve(address: Optional[str] = None, path: Optional[str] = None,
+          record_history: bool = True):
+    '''
+    Runs the calculator server on a TCP '[host:]port' address or a Unix socket 'path'
+    until interrupted. History rows are written from a background thread.
+    '''
+    configure_logging()
+    configure_cache()
+    configure_metrics()
+
+    history = History(write_behind=True) if record_history else None
+    try:
+        asyncio.run(_serve(CalculatorServer(history), address, path))
+    except KeyboardInterrupt:
+        logging.info("Server stopped.")
+    finally:
+        if history is not None:
+            history.close()
@@ -0,0 +1,135 @@
+"""
+SQLite storage backend for the calculation history.
+
+Features:
+- Uses the standard library sqlite3 module, no server needed.
+- WAL journaling, so readers do not block the writer.
+- Groups of records are inserted in a single transaction.
+- Indexes on operation, session and result make the query API index-backed.
+- Every record is tagged with the session that wrote it, and undo only
+  removes the session's own records.
+"""
+
+import logging
+import sqlite3
+import threading
+import uuid
+from typing import Iterable, List, Optional
+from app.storage import Record, StorageBackend
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS history (
+        id        INTEGER PRIMARY KEY,
+        session   TEXT NOT NULL,
+        operation TEXT NOT NULL,
+        operand1  REAL NOT NULL,
+        operand2  REAL NOT NULL,
+        result    REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS history_operation ON history (operation, result)",
+    "CREATE INDEX IF NOT EXISTS history_session ON history (session, operation)",
+    "CREATE INDEX IF NOT EXISTS history_session_id ON history (session, id)",
+    "CREATE INDEX IF NOT EXISTS history_result ON history (result)",
+)
+
+class SqliteStorage(StorageBackend):
+    '''
+    Stores records in a table of an SQLite database.
+    The connection is shared with the write-behind thread, so it is guarded by a lock.
+    '''
+    def __init__(self, filename: str, session: str = None):
+        super().__init__(filename)
+        self.session = session or uuid.uuid4().hex  # Identifies this process's records
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connect()
+        logging.info("History database loaded.")
+
+    def _connect(self) -> sqlite3.Connection:
+        '''Opens the database on first use, or again after close().'''
+        if self._connection is None:
+            connection = sqlite3.connect(self.filename, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, fewer fsyncs
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            self._connection = connection
+        return self._connection
+
+    def append_many(self, records: Iterable[Record]):
+        '''Inserts a group of records in one transaction.'''
+        rows = [(self.session, str(operation), operand1, operand2, result)
+                for operation, operand1, operand2, result in records]
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO history (session, operation, operand1, operand2, result) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def pop(self) -> Optional[Record]:
+        '''Removes this session's newest record; other processes' records are kept.'''
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                "SELECT id, operation, operand1, operand2, result "
+                "FROM history WHERE session = ? ORDER BY id DESC LIMIT 1",
+                (self.session,),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("DELETE FROM history WHERE id = ?", (row[0],))
+        return row[1:]
+
+    def tail(self, count: int, skip: int = 0) -> List[Record]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT operation, operand1, operand2, result "
+                "FROM history ORDER BY id DESC LIMIT ? OFFSET ?",
+                (count, skip),
+            ).fetchall()
+        return rows[::-1]
+
+    def __len__(self) -> int:
+        '''Number of records in the database.'''
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def query(self, operation: str = None, session: str = None,
+              min_result: float = None, max_result: float = None,
+              limit: int = None) -> List[Record]:
+        '''
+        Returns records matching every given filter, oldest first.
+            - operation:  operation name, e.g. 'Divide'
+            - session:    session id, e.g. another process's SqliteStorage.session
+            - min_result: smallest result to include
+            - max_result: largest result to include
+            - limit:      maximum number of records
+        '''
+        filters = {
+            "operation = ?": operation,
+            "session = ?": session,
+            "result >= ?": min_result,
+            "result <= ?": max_result,
+        }
+        clauses = [clause for clause, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+
+        sql = "SELECT operation, operand1, operand2, result FROM history"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,478 @@
+"""
+Storage backends for the calculation history.
+
+Every backend stores records of (operation, operand #1, operand #2, result)
+in an append-only file and supports:
+- Appending records one at a time or in groups.
+- Removing the last record (undo).
+- Reading the last records (tail) without loading the whole file.
+
+The CSV and binary files can be shared by several processes: appends and
+undo hold an fcntl lock on the file, and undo only removes records the
+calling process appended.
+
+Backends:
+- CsvStorage:    text CSV file with a header row (default).
+- BinaryStorage: fixed-width binary records that can be read with numpy.memmap.
+- SqliteStorage: SQLite database with a query API (in app.sqlite_storage).
+- SegmentedStorage: rotated CSV segments, compressed once sealed (in app.segmented_storage).
+
+StorageFactory creates the right backend from its name.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections import deque
+import csv
+import importlib
+import io
+import logging
+import os
+import struct
+import sys
+import threading
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+from app.operations import OPERATIONS
+
+if TYPE_CHECKING:  # NumPy is only imported when a binary file is loaded
+    import numpy as np
+
+# A history record: (operation name, operand #1, operand #2, result)
+Record = Tuple[str, float, float, float]
+
+# Columns of the history file
+HEADER = ['Operation', 'Operand #1', 'Operand #2', 'Result']
+
+# First line of a CSV history file (the csv module ends rows with '\r\n')
+HEADER_LINE = (','.join(HEADER) + '\r\n').encode('utf-8')
+
+# Size of the blocks read when scanning a file backward
+SCAN_BLOCK_SIZE = 4096
+
+class StorageBackend(ABC):
+    '''
+    Abstract base class for history storage.
+    All subclasses must implement appending, popping and tailing records.
+    '''
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def append(self, record: Record):
+        '''Appends one record.'''
+        self.append_many([record])
+
+    @abstractmethod
+    def append_many(self, records: Iterable[Record]):
+        '''Appends a group of records in order.'''
+
+    @abstractmethod
+    def pop(self) -> Optional[Record]:
+        '''Removes the last record and returns it, or None if there are no records.'''
+
+    @abstractmethod
+    def tail(self, count: int, skip: int = 0) -> List[Record]:
+        '''Returns up to 'count' records that come before the last 'skip' records.'''
+
+    def iter_records(self) -> Iterator[Record]:
+        '''Yields every record, oldest first.'''
+        yield from self.tail(sys.maxsize)
+
+    def close(self):
+        '''Releases any open file. Backends reopen the file if used again.'''
+
+# ----------------
+# FILE LOCKING
+# ----------------
+
+try:
+    import fcntl
+except ImportError:  # No fcntl on Windows, history files are not locked there
+    fcntl = None
+
+# Records of this process remembered for undo, newest last
+OWN_RECORDS = 1 << 16
+
+class _FileLock:
+    '''
+    Holds an advisory lock on an open file while in a 'with' block:
+    shared for readers, exclusive for writers. A class rather than a
+    generator, since it is entered on every append.
+    '''
+    __slots__ = ('fd', 'shared')
+
+    def __init__(self, fd: int, shared: bool = False):
+        self.fd = fd
+        self.shared = shared
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+def _write_all(fd: int, data: bytes):
+    '''Writes all of 'data', even if the system writes it in parts.'''
+    written = os.write(fd, data)
+    while written < len(data):
+        written += os.write(fd, data[written:])
+
+def _create_file(filename: str, content: bytes) -> bool:
+    '''
+    Creates 'filename' holding 'content' in one step, so another process
+    never sees the file without its header. Returns False if it already exists.
+    '''
+    temporary = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        _write_all(fd, content)
+    finally:
+        os.close(fd)
+    try:
+        os.link(temporary, filename)  # Fails if the file exists, unlike a rename
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(temporary)
+
+class LockedFileStorage(StorageBackend):
+    '''
+    Base class for file backends that several processes can share.
+    Each group of records is appended with one write while holding an
+    exclusive lock, so records of different processes never interleave.
+    pop() removes the newest record this process appended, wherever
+    other processes' records have put it since.
+    '''
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self._fd = None  # Opened on the first append
+        # (offset when appended, encoded record) of this process's records
+        self._own = deque(maxlen=OWN_RECORDS)
+
+    @abstractmethod
+    def _encode(self, records: Iterable[Record]) -> List[bytes]:
+        '''Encodes every record as it is stored in the file.'''
+
+    @abstractmethod
+    def _decode(self, data: bytes) -> Record:
+        '''Decodes one stored record.'''
+
+    @abstractmethod
+    def _last_offset(self, file, end: int) -> Optional[int]:
+        '''Where the file's last record starts, or None if it has no records.'''
+
+    @abstractmethod
+    def _starts_record(self, window: bytes, index: int, start: int) -> bool:
+        '''True if window[index:], read from file offset 'start', is the start of a record.'''
+
+    def append_many(self, records: Iterable[Record]):
+        chunks = self._encode(records)
+        if not chunks:
+            return
+        data = b''.join(chunks)
+
+        if self._fd is None:
+            # O_APPEND moves every write to the end of the file, even if others wrote since
+            self._fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND)
+        with _FileLock(self._fd):
+            _write_all(self._fd, data)
+            # The write moved the file offset to the end of this group
+            offset = os.lseek(self._fd, 0, os.SEEK_CUR) - len(data)
+            for chunk in chunks:
+                self._own.append((offset, chunk))
+                offset += len(chunk)
+
+    def pop(self) -> Optional[Record]:
+        '''
+        Removes this process's newest record. If this process has not appended any,
+        removes the file's last record. Records after it are moved back over it,
+        which is a plain truncation when it is the file's last record.
+        '''
+        with open(self.filename, mode='rb+') as file, _FileLock(file.fileno()):
+            end = file.seek(0, os.SEEK_END)
+            if self._own:
+                hint, data = self._own.pop()
+                offset = self._find(file, hint, data, end)
+            else:
+                offset = self._last_offset(file, end)
+                if offset is not None:
+                    file.seek(offset)
+                    data = file.read(end - offset)
+            if offset is None:
+                return None  # No records left, or they were removed elsewhere
+
+            file.seek(offset + len(data))
+            rest = file.read()
+            file.seek(offset)
+            file.write(rest)
+            file.truncate(end - len(data))
+
+        return self._decode(data)
+
+    def _find(self, file, hint: int, data: bytes, end: int) -> Optional[int]:
+        '''
+        Returns where record 'data', appended at offset 'hint', starts now.
+        Other processes only remove records, so it can only have moved back.
+        Searches backward from 'hint' in growing windows.
+        '''
+        span = SCAN_BLOCK_SIZE
+        stop = min(end, hint + len(data))
+        while True:
+            start = max(0, stop - len(data) - span)
+            file.seek(start)
+            window = file.read(stop - start)
+
+            index = window.rfind(data)
+            while index != -1:
+                if self._starts_record(window, index, start):
+                    return start + index
+                index = window.rfind(data, 0, index + len(data) - 1)
+
+            if start == 0:
+                return None
+            span *= 2
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+# ----------------
+# CSV STORAGE
+# ----------------
+
+# Characters that make the csv module quote a field
+_CSV_SPECIAL = frozenset(',"\r\n')
+
+def _parse_line(line: bytes) -> Record:
+    '''Parses one CSV line into a record.'''
+    operation, operand1, operand2, result = next(csv.reader([line.decode('utf-8')]))
+    return operation, float(operand1), float(operand2), float(result)
+
+def _last_line_offset(file, end: int) -> int:
+    '''
+    Scans a binary file backward from 'end' and returns the offset
+    where its last line starts. Only reads the last line's bytes.
+    '''
+    position = end - 1  # Skip the line ending of the last line
+    while position > 0:
+        start = max(0, position - SCAN_BLOCK_SIZE)
+        file.seek(start)
+        index = file.read(position - start).rfind(b'\n')
+        if index != -1:
+            return start + index + 1
+        position = start
+    return 0
+
+def _tail_lines(file, count: int, skip: int = 0) -> list:
+    '''
+    Scans a binary CSV file backward from the end and returns up to 'count'
+    lines that come before the last 'skip' lines. The header is never returned.
+    Only reads as many blocks as those lines need.
+    '''
+    wanted = count + skip
+    position = file.seek(0, os.SEEK_END)
+    chunks = []
+    newlines = 0
+
+    # One more newline than wanted, so the first wanted line is complete
+    while position > 0 and newlines <= wanted:
+        start = max(0, position - SCAN_BLOCK_SIZE)
+        file.seek(start)
+        chunk = file.read(position - start)
+        chunks.append(chunk)
+        newlines += chunk.count(b'\n')
+        position = start
+
+    # First line is either cut off by the scan or is the header
+    lines = b''.join(reversed(chunks)).splitlines()[1:]
+    return lines[max(0, len(lines) - wanted):max(0, len(lines) - skip)]
+
+class CsvStorage(LockedFileStorage):
+    '''
+    Stores records as rows of a CSV file with a header.
+    The file is kept open for appending; every group is written at once.
+    '''
+    def __init__(self, filename: str):
+        super().__init__(filename)
+
+        # If file doesn't exist, create it with the header
+        if _create_file(filename, HEADER_LINE):
+            logging.info("History file created.")
+        else:
+            logging.info("History file loaded.")
+
+    def _encode(self, records: Iterable[Record]) -> List[bytes]:
+        lines = []
+        for operation, operand1, operand2, result in records:
+            operation = str(operation)
+            if _CSV_SPECIAL.isdisjoint(operation):
+                # Same text the csv module writes, without creating a writer per group
+                lines.append(f"{operation},{operand1},{operand2},{result}\r\n".encode('utf-8'))
+            else:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerow((operation, operand1, operand2, result))
+                lines.append(buffer.getvalue().encode('utf-8'))
+        return lines
+
+    def _decode(self, data: bytes) -> Record:
+        return _parse_line(data)
+
+    def _last_offset(self, file, end: int) -> Optional[int]:
+        offset = _last_line_offset(file, end)
+        return offset or None  # Offset 0 is the header
+
+    def _starts_record(self, window: bytes, index: int, start: int) -> bool:
+        # Offset 0 is the header; a record starts right after a newline
+        return index > 0 and window[index - 1:index] == b'\n'
+
+    def tail(self, count: int, skip: int = 0) -> List[Record]:
+        with open(self.filename, mode='rb') as file, _FileLock(file.fileno(), shared=True):
+            return [_parse_line(line) for line in _tail_lines(file, count, skip)]
+
+    def iter_records(self) -> Iterator[Record]:
+        '''Streams the file line by line instead of loading it.'''
+        with open(self.filename, mode='rb') as file:
+            lines = iter(file)
+            next(lines, None)  # Header
+            for line in lines:
+                yield _parse_line(line)
+
+# ----------------
+# BINARY STORAGE
+# ----------------
+
+def opcodes() -> dict:
+    '''Maps every registered operation's name to the opcode byte it is stored as.'''
+    return {repr(op): op.opcode for op in OPERATIONS.values() if op.opcode is not None}
+
+# Identifies a binary history file, followed by fixed-width records
+MAGIC = b'CALCHST1'
+
+# One record: opcode byte, then operand #1, operand #2 and result as little-endian float64
+RECORD_FORMAT = struct.Struct('<Bddd')
+
+# Same layout as RECORD_FORMAT, as a NumPy structured dtype
+RECORD_FIELDS = [('opcode', 'u1'), ('operand1', '<f8'), ('operand2', '<f8'), ('result', '<f8')]
+
+class BinaryStorage(LockedFileStorage):
+    '''
+    Stores records as fixed-width binary rows after a short header.
+    Record 'i' starts at len(MAGIC) + i * RECORD_FORMAT.size, so undo and tail
+    are offset arithmetic and the file can be opened zero-copy with load().
+    '''
+    def __init__(self, filename: str):
+        super().__init__(filename)
+
+        if _create_file(filename, MAGIC):
+            logging.info("History file created.")
+        else:
+            with open(filename, mode='rb') as file:
+                if file.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{filename} is not a binary history file.")
+            logging.info("History file loaded.")
+
+    def __len__(self) -> int:
+        '''Number of records in the file.'''
+        return (os.path.getsize(self.filename) - len(MAGIC)) // RECORD_FORMAT.size
+
+    def _encode(self, records: Iterable[Record]) -> List[bytes]:
+        codes = opcodes()
+        try:
+            return [
+                RECORD_FORMAT.pack(codes[str(operation)], operand1, operand2, result)
+                for operation, operand1, operand2, result in records
+            ]
+        except KeyError as exc:
+            raise ValueError(f"Operation {exc} has no opcode.") from exc
+
+    def _decode(self, data: bytes) -> Record:
+        return self._unpack(data)[0]
+
+    def _last_offset(self, file, end: int) -> Optional[int]:
+        count = (end - len(MAGIC)) // RECORD_FORMAT.size
+        return len(MAGIC) + (count - 1) * RECORD_FORMAT.size if count else None
+
+    def _starts_record(self, window: bytes, index: int, start: int) -> bool:
+        offset = start + index - len(MAGIC)
+        return offset >= 0 and offset % RECORD_FORMAT.size == 0
+
+    def tail(self, count: int, skip: int = 0) -> List[Record]:
+        with open(self.filename, mode='rb') as file, _FileLock(file.fileno(), shared=True):
+            records = (os.fstat(file.fileno()).st_size - len(MAGIC)) // RECORD_FORMAT.size
+            end = max(0, records - skip)
+            start = max(0, end - count)
+            file.seek(len(MAGIC) + start * RECORD_FORMAT.size)
+            data = file.read((end - start) * RECORD_FORMAT.size)
+        return self._unpack(data)
+
+    def iter_records(self) -> Iterator[Record]:
+        '''Streams the file in blocks of whole records.'''
+        block = RECORD_FORMAT.size * SCAN_BLOCK_SIZE
+        with open(self.filename, mode='rb') as file:
+            file.seek(len(MAGIC))
+            while data := file.read(block):
+                yield from self._unpack(data)
+
+    def load(self) -> np.ndarray:
+        '''
+        Opens every record as a read-only structured array without copying it.
+        Columns are 'opcode', 'operand1', 'operand2' and 'result'.
+        '''
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        dtype = np.dtype(RECORD_FIELDS)
+        if len(self) == 0:
+            return np.empty(0, dtype=dtype)  # memmap cannot map zero bytes
+        return np.memmap(self.filename, dtype=dtype, mode='r',
+                         offset=len(MAGIC), shape=(len(self),))
+
+    @staticmethod
+    def _unpack(data: bytes) -> List[Record]:
+        '''Turns packed records back into record tuples.'''
+        names = {opcode: name for name, opcode in opcodes().items()}
+        return [
+            (names[opcode], operand1, operand2, result)
+            for opcode, operand1, operand2, result in RECORD_FORMAT.iter_unpack(data)
+        ]
+
+class StorageFactory:
+    '''
+    Factory class that creates storage backends based on their name.
+    Backends in other modules are given as 'module:class' and imported on first use.
+    '''
+    backends = {
+        'csv': CsvStorage,
+        'binary': BinaryStorage,
+        'sqlite': 'app.sqlite_storage:SqliteStorage',
+        'segmented': 'app.segmented_storage:SegmentedStorage',
+    }
+
+    # Default file name for each backend
+    default_filenames = {
+        'csv': 'history.csv',
+        'binary': 'history.bin',
+        'sqlite': 'history.db',
+        'segmented': 'history_segments',
+    }
+
+    @staticmethod
+    def create_storage(kind: str, filename: str = None) -> StorageBackend:
+        '''
+        Creates the storage backend named 'kind' for 'filename'.
+        Uses the backend's default file name if none is given.
+        '''
+        kind = kind.lower()
+        try:
+            backend = StorageFactory.backends[kind]
+        except KeyError as exc:
+            logging.error("Tried to use unknown history storage: %s", kind)
+            raise ValueError("Storage does not exist.") from exc
+
+        if isinstance(backend, str):
+            module, name = backend.split(':')
+            backend = getattr(importlib.import_module(module), name)
+
+        return backend(filename or StorageFactory.default_filenames[kind])
@@ -0,0 +1,193 @@
+'''
+Append-only journal behind multi-level undo and redo.
+
+Undo removes a record from the history storage and writes a tombstone entry
+holding it; redo writes a restore entry and appends the record again. The
+records that can be redone form a stack, kept in memory (O(1) push and pop)
+and rebuilt on startup by replaying the journal after its last clear entry.
+Adding a new calculation clears the stack, like in any editor.
+
+Journal lines are JSON arrays:
+    ["U", operation, operand1, operand2, result]   tombstone (undone record)
+    ["R"]                                          restore (newest tombstone redone)
+    ["C"]                                          clear (nothing left to redo)
+
+Entries are appended with one write under an fcntl lock. Once enough entries
+were written, a background thread compacts the journal down to one tombstone
+per record that can still be redone.
+'''
+
+import json
+import logging
+import os
+import threading
+from typing import List, Optional
+from app.storage import SCAN_BLOCK_SIZE, Record, _FileLock, _write_all
+
+# Journal file name: '<history file>' + JOURNAL_SUFFIX
+JOURNAL_SUFFIX = '.journal'
+
+# Entries written before the journal is compacted in the background
+# (or more, if more records than that can be redone)
+COMPACT_AFTER = 256
+
+TOMBSTONE, RESTORE, CLEAR = 'U', 'R', 'C'
+
+def _entry(kind: str, record: Record = None) -> bytes:
+    '''Encodes one journal line.'''
+    return (json.dumps([kind, *record] if record else [kind]) + '\n').encode('utf-8')
+
+# Restore and clear entries never change, so they are encoded once
+_RESTORE_LINE, _CLEAR_LINE = _entry(RESTORE), _entry(CLEAR)
+
+def _read_tail(file) -> List[list]:
+    '''
+    Reads the entries after the last clear entry, oldest first,
+    scanning backward from the end of the file.
+    '''
+    position = file.seek(0, os.SEEK_END)
+    data = b''
+    while position > 0:
+        start = max(0, position - SCAN_BLOCK_SIZE)
+        file.seek(start)
+        data = file.read(position - start) + data
+        position = start
+
+        # Only the entries after the last complete clear line are parsed
+        index = data.rfind(b'\n' + _CLEAR_LINE)
+        if index != -1:
+            data = data[index + 1 + len(_CLEAR_LINE):]
+            break
+        if start == 0 and data.startswith(_CLEAR_LINE):
+            data = data[len(_CLEAR_LINE):]
+
+    entries = []
+    for line in data.splitlines():
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue  # Cut off by a crash in the middle of a write
+    return entries
+
+def _replay(entries: List[list]) -> List[Record]:
+    '''Turns entries after the last clear into the stack of records to redo.'''
+    stack = []
+    for entry in entries:
+        if entry[0] == TOMBSTONE:
+            stack.append(tuple(entry[1:]))
+        elif entry[0] == RESTORE and stack:
+            stack.pop()
+    return stack
+
+class UndoJournal:
+    '''The redo stack of a history file, persisted in an append-only journal.'''
+    def __init__(self, filename: str, compact_after: int = COMPACT_AFTER):
+        self.filename = filename
+        self.compact_after = compact_after
+        self._lock = threading.Lock()  # Guards the stack, the file and compaction
+        self._fd = None
+        self._inode = None  # Inode of the open file, to notice it was replaced
+        self._written = 0  # Entries since the last compaction
+        self._compactor = None
+
+        self._stack: List[Record] = []
+        if os.path.exists(filename):
+            with open(filename, mode='rb') as file, _FileLock(file.fileno(), shared=True):
+                self._stack = _replay(_read_tail(file))
+
+    def __len__(self) -> int:
+        '''Number of records that can be redone.'''
+        return len(self._stack)
+
+    def _append(self, data: bytes):
+        '''Appends entries with one write (with _lock held).'''
+        while True:
+            if self._fd is None:
+                self._fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                self._inode = os.fstat(self._fd).st_ino
+            with _FileLock(self._fd):
+                # Checked under the lock, so a compaction cannot replace the file meanwhile
+                if not self._replaced():
+                    _write_all(self._fd, data)
+                    break
+            os.close(self._fd)  # Open the new file and try again
+            self._fd = None
+
+        self._written += 1
+        # Compacting rewrites the whole stack, so a large stack waits for more entries
+        if self._written >= max(self.compact_after, len(self._stack)) \
+                and self._compactor is None:
+            self._written = 0
+            if len(self._stack) <= self.compact_after:
+                # A small stack is rewritten at once, cheaper than handing it to a thread
+                self._compact()
+            else:
+                self._compactor = threading.Thread(target=self.compact, daemon=True,
+                                                   name="JournalCompactor")
+                self._compactor.start()
+
+    def _replaced(self) -> bool:
+        '''True if another process compacted the journal into a new file.'''
+        try:
+            return os.stat(self.filename).st_ino != self._inode
+        except OSError:
+            return True
+
+    def tombstone(self, record: Record):
+        '''Records an undone record, so it can be redone.'''
+        with self._lock:
+            self._append(_entry(TOMBSTONE, record))
+            self._stack.append(tuple(record))
+
+    def restore(self) -> Optional[Record]:
+        '''Takes the newest undone record off the stack, or None if there is none.'''
+        with self._lock:
+            if not self._stack:
+                return None
+            self._append(_RESTORE_LINE)
+            return self._stack.pop()
+
+    def clear(self):
+        '''Drops every record that could be redone. Nothing is written if there are none.'''
+        if not self._stack:
+            return
+        with self._lock:
+            if self._stack:
+                self._append(_CLEAR_LINE)
+                self._stack.clear()
+
+    def compact(self):
+        '''
+        Rewrites the journal as one tombstone per record that can still be redone.
+        The stack is read back from the file, so entries of other processes are kept.
+        '''
+        try:
+            with self._lock:
+                self._compact()
+        finally:
+            self._compactor = None
+
+    def _compact(self):
+        '''Compacts the journal (with _lock held).'''
+        try:
+            with open(self.filename, mode='rb') as file, _FileLock(file.fileno()):
+                if os.stat(self.filename).st_ino != os.fstat(file.fileno()).st_ino:
+                    return  # Another process compacted it while we waited for the lock
+                stack = _replay(_read_tail(file))
+                temporary = f"{self.filename}.tmp"
+                with open(temporary, mode='wb') as compacted:
+                    compacted.write(b''.join(_entry(TOMBSTONE, record) for record in stack))
+                os.replace(temporary, self.filename)
+                logging.debug("Journal compacted to %s entries.", len(stack))
+        except OSError as e:
+            logging.error("Could not compact the undo journal: %s", e)
+
+    def close(self):
+        '''Waits for a running compaction and closes the journal.'''
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,3 @@
+'''
+Benchmarks for the calculator. Not part of the regular test run.
+'''
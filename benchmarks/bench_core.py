@@ -0,0 +1,62 @@
+"""
+Microbenchmarks for the core components:
+the factory, every operation, Calculation and History.
+History benchmarks run once per --history-rows size.
+"""
+
+import contextlib
+import io
+import pytest
+from app.calculation import Calculation
+from app.operation_factory import OperationFactory
+from app.operations import OPERATIONS
+
+@pytest.fixture(autouse=True)
+def set_test_mode(monkeypatch):
+    """Keeps logging.conf from being applied while measuring."""
+    monkeypatch.setenv('TEST_MODE', 'True')
+
+@pytest.fixture(name="quiet")
+def fixture_quiet():
+    """Drops everything printed while measuring."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def bench_create_operation(benchmark):
+    """OperationFactory.create_operation for a registered name."""
+    benchmark("factory.create_operation", lambda: OperationFactory.create_operation('Add'))
+
+@pytest.mark.parametrize("name", sorted(OPERATIONS))
+def bench_calculate(benchmark, name):
+    """OperationTemplate.calculate for every registered operation."""
+    operation = OPERATIONS[name]
+    benchmark(f"operation.calculate[{name}]", lambda: operation.calculate(7.0, 3.0))
+
+def bench_calculation_construct(benchmark):
+    """Building a Calculation."""
+    operation = OPERATIONS['add']
+    benchmark("calculation.construct", lambda: Calculation(operation, 7.0, 3.0))
+
+def bench_calculation_evaluate(benchmark):
+    """Building a Calculation and performing it."""
+    operation = OPERATIONS['add']
+    benchmark("calculation.perform_operation",
+              lambda: Calculation(operation, 7.0, 3.0).perform_operation())
+
+def bench_add_to_history(benchmark, history, history_rows):
+    """History.add_to_history on a file that already has many rows."""
+    operation = OPERATIONS['add']
+    benchmark(f"history.add_to_history[{history_rows}]",
+              lambda: history.add_to_history(operation, 1.0, 2.0, 3.0))
+
+@pytest.mark.usefixtures("quiet")
+def bench_undo_last(benchmark, history, history_rows):
+    """History.undo_last on a file with many rows (one row is added before every call)."""
+    operation = OPERATIONS['add']
+    benchmark(f"history.undo_last[{history_rows}]", history.undo_last,
+              setup=lambda: history.add_to_history(operation, 1.0, 2.0, 3.0))
+
+@pytest.mark.usefixtures("quiet")
+def bench_print_history(benchmark, history, history_rows):
+    """History.print_history of the last page on a file with many rows."""
+    benchmark(f"history.print_history[{history_rows}]", lambda: history.print_history(page=1))
@@ -0,0 +1,119 @@
+"""
+Fixtures and options for the benchmark suite.
+
+Options:
+    --bench-json FILE       save the results as JSON
+    --bench-baseline FILE   compare with a saved run ('none' skips the comparison)
+    --max-slowdown RATIO    fail a benchmark slower than RATIO times its baseline
+    --history-rows N,N,...  history file sizes for the History benchmarks
+    --bench-min-time SEC    seconds spent on each repeat
+"""
+
+import os
+import sys
+import pytest
+from benchmarks import micro
+from app.history_manager import History
+from app.storage import StorageFactory
+
+# Saved run that new results are compared against
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Rows written to a history file per call when generating it
+GENERATE_CHUNK = 100_000
+
+RESULTS = pytest.StashKey[dict]()
+
+def pytest_addoption(parser):
+    """Adds the benchmark options."""
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-json', metavar='FILE', help="save the results as JSON")
+    group.addoption('--bench-baseline', metavar='FILE', default=DEFAULT_BASELINE,
+                    help="results to compare with, 'none' skips the comparison")
+    group.addoption('--max-slowdown', metavar='RATIO', type=float, default=1.5,
+                    help="fail a benchmark more than RATIO times slower than the baseline")
+    group.addoption('--history-rows', metavar='N,N', default='1000,1000000,10000000',
+                    help="history file sizes for the History benchmarks")
+    group.addoption('--bench-min-time', metavar='SEC', type=float, default=micro.MIN_TIME,
+                    help="seconds spent on each repeat of a benchmark")
+
+def pytest_configure(config):
+    """Starts an empty result table and refuses to run under a tracer."""
+    config.stash[RESULTS] = {}
+    if sys.gettrace() is not None:
+        raise pytest.UsageError("A tracer (coverage or a debugger) would distort the timings.")
+
+def pytest_generate_tests(metafunc):
+    """Runs the History benchmarks once per --history-rows size."""
+    if 'history_rows' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('history_rows').split(',')]
+        metafunc.parametrize('history_rows', sizes, indirect=True, scope='session', ids=str)
+
+@pytest.fixture(scope='session')
+def history_rows(request):
+    """Number of rows in the benchmark's history file."""
+    return request.param
+
+@pytest.fixture(scope='session')
+def history_file(history_rows, tmp_path_factory):
+    """A CSV history file with 'history_rows' rows (written once per session, then removed)."""
+    rows = history_rows
+    path = str(tmp_path_factory.mktemp('history') / f"history-{rows}.csv")
+    storage = StorageFactory.create_storage('csv', path)
+    for start in range(0, rows, GENERATE_CHUNK):
+        storage.append_many([('Add', 1.0, 2.0, 3.0)] * min(GENERATE_CHUNK, rows - start))
+    storage.close()
+    yield path
+    os.remove(path)  # Large files are not kept around with pytest's temporary directories
+
+@pytest.fixture
+def history(history_file, monkeypatch):
+    """A fresh History on the generated file."""
+    monkeypatch.setenv('TEST_MODE', 'True')
+    monkeypatch.setenv('HISTORY_FILENAME', history_file)
+    monkeypatch.delenv('HISTORY_STORAGE', raising=False)
+    monkeypatch.delenv('HISTORY_WRITE_BEHIND', raising=False)
+    History._instance = None
+    yield History()
+    History._instance.close()
+    History._instance = None
+
+@pytest.fixture
+def benchmark(request):
+    """
+    Returns run(name, func, setup=None): measures 'func', records the result
+    and fails if it is slower than the baseline allows.
+    """
+    config = request.config
+    baseline_path = config.getoption('bench_baseline')
+    baseline = {}
+    if baseline_path != 'none' and os.path.exists(baseline_path):
+        baseline = micro.load(baseline_path)
+
+    def run(name, func, setup=None):
+        result = micro.measure(func, setup, min_time=config.getoption('bench_min_time'))
+        config.stash[RESULTS][name] = result
+        regressions = micro.compare({name: result}, baseline, config.getoption('max_slowdown'))
+        if regressions:
+            regression = regressions[0]
+            pytest.fail(f"{name} is {regression.ratio:.2f}x slower than the baseline "
+                        f"({regression.current * 1e6:.2f} µs vs {regression.baseline * 1e6:.2f} µs)")
+        return result
+    return run
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Prints every result as a table."""
+    results = config.stash[RESULTS]
+    if not results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(f"{'benchmark':<48} {'median µs':>12} {'best µs':>12} {'calls':>10}")
+    for name, result in sorted(results.items()):
+        terminalreporter.write_line(f"{name:<48} {result.median * 1e6:>12.3f} "
+                                    f"{result.best * 1e6:>12.3f} {result.calls:>10}")
+
+def pytest_sessionfinish(session):
+    """Saves the results if --bench-json is given."""
+    path = session.config.getoption('bench_json')
+    if path and session.config.stash[RESULTS]:
+        micro.save(session.config.stash[RESULTS], path)
@@ -0,0 +1,99 @@
+'''
+Microbenchmark harness used by the benchmark suite (benchmarks/bench_*.py).
+
+- measure: times a function and returns the median time per call.
+- save / load: store results as JSON.
+- compare: lists the benchmarks that got slower than a baseline allows.
+
+Run the suite with pytest from the repository root:
+    python -m pytest benchmarks
+    python -m pytest benchmarks --bench-json results.json --max-slowdown 1.5
+    python -m pytest benchmarks --history-rows 1000 --bench-baseline none
+'''
+
+import json
+import platform
+import statistics
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Seconds spent calling the function in each repeat
+MIN_TIME = 0.2
+
+# Repeats per benchmark; the median of the repeats is reported
+REPEAT = 5
+
+class BenchResult(NamedTuple):
+    '''Timing of one benchmark, in seconds per call.'''
+    median: float
+    best: float
+    calls: int  # Calls made across every repeat
+
+class Regression(NamedTuple):
+    '''A benchmark that got slower than the baseline allows.'''
+    name: str
+    current: float
+    baseline: float
+
+    @property
+    def ratio(self) -> float:
+        '''How many times slower than the baseline.'''
+        return self.current / self.baseline
+
+def measure(func: Callable[[], object], setup: Optional[Callable[[], object]] = None,
+            repeat: int = REPEAT, min_time: float = MIN_TIME) -> BenchResult:
+    '''
+    Calls 'func' for at least 'min_time' seconds, 'repeat' times.
+    If 'setup' is given it runs before every call and is not timed.
+    '''
+    func()  # Warm up caches and lazy imports
+    per_call, calls = [], 0
+    for _ in range(repeat):
+        elapsed, count = 0.0, 0
+        if setup is None:
+            # Time calls in growing groups, so the timer's own cost stays small
+            number = 1
+            while elapsed < min_time:
+                start = time.perf_counter()
+                for _ in range(number):
+                    func()
+                elapsed += time.perf_counter() - start
+                count += number
+                number *= 2
+        else:
+            while elapsed < min_time:
+                setup()
+                start = time.perf_counter()
+                func()
+                elapsed += time.perf_counter() - start
+                count += 1
+        per_call.append(elapsed / count)
+        calls += count
+    return BenchResult(statistics.median(per_call), min(per_call), calls)
+
+def save(results: Dict[str, BenchResult], path: str):
+    '''Saves results as JSON, along with the Python version they were measured on.'''
+    with open(path, mode='w', encoding='utf-8') as file:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': {name: result._asdict() for name, result in sorted(results.items())},
+        }, file, indent=2)
+
+def load(path: str) -> Dict[str, BenchResult]:
+    '''Loads results saved by save().'''
+    with open(path, mode='r', encoding='utf-8') as file:
+        data = json.load(file)
+    return {name: BenchResult(**result) for name, result in data['results'].items()}
+
+def compare(results: Dict[str, BenchResult], baseline: Dict[str, BenchResult],
+            max_slowdown: float) -> List[Regression]:
+    '''
+    Returns every benchmark whose median is more than 'max_slowdown' times
+    the baseline's median. Benchmarks missing from the baseline are skipped.
+    '''
+    return [
+        Regression(name, result.median, baseline[name].median)
+        for name, result in sorted(results.items())
+        if name in baseline and result.median > baseline[name].median * max_slowdown
+    ]
@@ -0,0 +1,91 @@
+'''
+Startup benchmark. Reports how long each module takes to import when the
+calculator starts, using Python's '-X importtime' option.
+
+Fails (exit code 1) if the startup is slower than '--max-ms' or if a heavy
+module such as pandas or numpy is imported before it is needed.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --top 20 --max-ms 150 --json startup.json
+'''
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Modules that must only be imported when a feature first needs them
+HEAVY_MODULES = ('pandas', 'numpy', 'sqlite3')
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    '''
+    Parses '-X importtime' output into (module, self us, cumulative us) tuples.
+    Nested modules are reported by their full name without the indentation.
+    '''
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        timings.append((module.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+def measure_imports(module: str = 'main', runs: int = 5) -> Dict[str, Tuple[int, int]]:
+    '''
+    Imports 'module' in a fresh interpreter 'runs' times.
+    Returns the median (self us, cumulative us) for every imported module.
+    '''
+    samples: Dict[str, List[Tuple[int, int]]] = {}
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True, text=True, check=True,
+        )
+        for name, self_us, cumulative_us in parse_importtime(completed.stderr):
+            samples.setdefault(name, []).append((self_us, cumulative_us))
+
+    return {
+        name: (int(statistics.median(s for s, _ in values)),
+               int(statistics.median(c for _, c in values)))
+        for name, values in samples.items()
+    }
+
+def main(argv=None) -> int:
+    '''Prints the slowest imports and checks the regression limits.'''
+    parser = argparse.ArgumentParser(description="Measure calculator import time per module.")
+    parser.add_argument('--module', default='main', help="module to import (default: main)")
+    parser.add_argument('--runs', type=int, default=5, help="number of fresh interpreters")
+    parser.add_argument('--top', type=int, default=15, help="number of modules to print")
+    parser.add_argument('--max-ms', type=float, help="fail if the total import time is higher")
+    parser.add_argument('--json', metavar='FILE', help="also save every timing as JSON")
+    args = parser.parse_args(argv)
+
+    timings = measure_imports(args.module, args.runs)
+    total_ms = timings[args.module][1] / 1000
+
+    print(f"{'module':<40} {'self ms':>9} {'cumulative ms':>14}")
+    slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[:args.top]:
+        print(f"{name:<40} {self_us / 1000:>9.2f} {cumulative_us / 1000:>14.2f}")
+    print(f"Total import time of {args.module}: {total_ms:.2f} ms")
+
+    if args.json:
+        with open(args.json, mode='w', encoding='utf-8') as file:
+            json.dump({'module': args.module, 'total_ms': total_ms, 'timings': timings},
+                      file, indent=2)
+
+    failed = False
+    heavy = [name for name in HEAVY_MODULES if name in timings]
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"FAIL: startup took {total_ms:.2f} ms, limit is {args.max_ms:.2f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,64 @@
 '''
 Runs the calculator program. Checks the script is being executed directly.
+
+Usage:
+    python main.py                    : Starts the interactive calculator.
+    python main.py --batch FILE       : Evaluates the commands in FILE ('-' reads stdin).
+    python main.py --batch FILE --workers N : Evaluates FILE on N processes.
+    python main.py --serve [HOST:]PORT: Serves the calculator over TCP.
+    python main.py --unix PATH        : Serves the calculator over a Unix socket.
 '''
+import argparse
+import sys
 from app.calculator import calculator
 
+def main(argv=None) -> int:
+    '''Parses the command line and starts the requested mode.'''
+    parser = argparse.ArgumentParser(description="Command line calculator.")
+    parser.add_argument(
+        '--batch', metavar='FILE',
+        help="evaluate '<operation> <num1> <num2>' lines from FILE, or stdin if FILE is '-'",
+    )
+    parser.add_argument(
+        '--workers', metavar='N', type=int,
+        help="evaluate the batch FILE on N worker processes (0 uses every core)",
+    )
+    parser.add_argument(
+        '--serve', metavar='[HOST:]PORT',
+        help="serve the calculator line protocol over TCP",
+    )
+    parser.add_argument(
+        '--unix', metavar='PATH',
+        help="serve the calculator line protocol over a Unix socket",
+    )
+    parser.add_argument(
+        '--no-history', action='store_true',
+        help="do not record batch or server calculations in the history file",
+    )
+    args = parser.parse_args(argv)
+
+    if args.serve is not None or args.unix is not None:
+        # Imported here so the REPL does not pay for asyncio
+        from app.server import serve  # pylint: disable=import-outside-toplevel
+        serve(args.serve, args.unix, record_history=not args.no_history)
+        return 0
+
+    if args.batch is None:
+        calculator()
+        return 0
+
+    if args.workers is not None:
+        if args.batch == '-':
+            parser.error("--workers needs a batch FILE, stdin cannot be split")
+        from app.parallel import parallel_batch  # pylint: disable=import-outside-toplevel
+        failed = parallel_batch(args.batch, args.workers or None,
+                                record_history=not args.no_history)
+        return 1 if failed else 0
+
+    # Imported here so the REPL does not pay for the batch module
+    from app.batch import batch  # pylint: disable=import-outside-toplevel
+    failed = batch(args.batch, record_history=not args.no_history)
+    return 1 if failed else 0
+
 if __name__ == "__main__":
-    calculator()
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""Shared fixtures for all tests."""
+
+import pytest
+from app.history_manager import History
+from app import result_cache
+from app.metrics import METRICS
+
+
+@pytest.fixture(autouse=True)
+def isolated_history(tmp_path, monkeypatch):
+    """Keep every test's history file in a temporary directory."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history.csv"))
+    monkeypatch.delenv("HISTORY_STORAGE", raising=False)
+    monkeypatch.delenv("HISTORY_WRITE_BEHIND", raising=False)
+    History._instance = None
+    result_cache.disable_cache()
+    METRICS.enabled = False
+    METRICS.reset()
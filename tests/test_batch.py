@@ -0,0 +1,104 @@
+'''
+Tests the non-interactive batch mode.
+Checks results are written one per line, errors are reported
+per line without stopping the stream, and history is recorded.
+'''
+
+import io
+from unittest.mock import patch, MagicMock
+import pytest
+
+import main
+from app.batch import read_commands, run_batch, batch
+from app.operations import Add, Divide
+
+@pytest.fixture(autouse=True)
+def set_test_mode(monkeypatch):
+    """Fixture to set TEST_MODE to 'True' during tests."""
+    monkeypatch.setenv("TEST_MODE", "True")
+
+def test_read_commands_skips_blank_lines():
+    """Test blank lines are skipped and line numbers match the input."""
+    lines = io.StringIO("add 1 2\n\n   \nDivide 4 2\n")
+    assert list(read_commands(lines)) == [(1, "add 1 2"), (4, "Divide 4 2")]
+
+def test_run_batch_results():
+    """Test each command writes one result line."""
+    output, errors = io.StringIO(), io.StringIO()
+    commands = read_commands(["add 3 4", "subtract 5 2", "multiply 3 3", "divide 6 2"])
+    failed = run_batch(commands, output, errors)
+    assert failed == 0
+    assert output.getvalue() == "7.0\n3.0\n9.0\n3.0\n"
+    assert errors.getvalue() == ""
+
+def test_run_batch_errors_do_not_stop_stream():
+    """Test invalid lines are reported with their line number and the stream continues."""
+    output, errors = io.StringIO(), io.StringIO()
+    commands = read_commands(["add abc 2", "add 1 1", "divide 8 0", "root 2 2", "add 2 2"])
+    failed = run_batch(commands, output, errors)
+    assert failed == 3
+    assert output.getvalue() == "2.0\n4.0\n"
+    assert errors.getvalue().splitlines() == [
+        "line 1: could not convert string to float: 'abc'",
+        "line 3: Cannot divide by zero.",
+        "line 4: Operation does not exist.",
+    ]
+
+def test_run_batch_stops_at_exit():
+    """Test the stream stops at an 'exit' command."""
+    output = io.StringIO()
+    run_batch(read_commands(["add 1 1", "EXIT", "add 2 2"]), output, io.StringIO())
+    assert output.getvalue() == "2.0\n"
+
+def test_run_batch_writes_in_chunks():
+    """Test results are written in chunks instead of one write per line."""
+    output = MagicMock()
+    with patch('app.batch.WRITE_CHUNK_LINES', 3):
+        run_batch(read_commands(["add 1 1"] * 7), output, io.StringIO())
+    # Two full chunks of 3 lines plus the remaining line
+    assert output.write.call_count == 3
+    output.write.assert_any_call("2.0\n2.0\n2.0\n")
+    output.write.assert_called_with("2.0\n")
+
+def test_run_batch_records_history():
+    """Test successful calculations are added to history."""
+    history = MagicMock()
+    run_batch(read_commands(["add 1 2", "divide 1 0"]), io.StringIO(), io.StringIO(), history)
+    history.add_to_history.assert_called_once()
+    operation, num1, num2, result = history.add_to_history.call_args.args
+    assert isinstance(operation, Add)
+    assert (num1, num2, result) == (1.0, 2.0, 3.0)
+
+def test_batch_from_file(tmp_path, capfd):
+    """Test batch mode reads a file and writes results to stdout."""
+    commands = tmp_path / "commands.txt"
+    commands.write_text("add 1 2\ndivide 1 0\nmultiply 2 3\n", encoding='utf-8')
+    failed = batch(str(commands), record_history=False)
+    out, err = capfd.readouterr()
+    assert failed == 1
+    assert out == "3.0\n6.0\n"
+    assert err == "line 2: Cannot divide by zero.\n"
+
+def test_batch_from_stdin(capfd):
+    """Test batch mode reads stdin when the source is '-'."""
+    with patch('sys.stdin', io.StringIO("divide 9 3\n")), \
+         patch('app.batch.History') as mock_history:
+        failed = batch('-')
+    out, _ = capfd.readouterr()
+    assert failed == 0
+    assert out == "3.0\n"
+    operation = mock_history.return_value.add_to_history.call_args.args[0]
+    assert isinstance(operation, Divide)
+
+@pytest.mark.parametrize("failed, exit_code", [(0, 0), (2, 1)])
+def test_main_batch(failed, exit_code):
+    """Test main starts batch mode and returns a failing exit code on errors."""
+    with patch('app.batch.batch', return_value=failed) as mock_batch:
+        assert main.main(['--batch', 'commands.txt', '--no-history']) == exit_code
+    mock_batch.assert_called_once_with('commands.txt', record_history=False)
+
+def test_main_repl():
+    """Test main starts the REPL without arguments."""
+    with patch('main.calculator') as mock_calculator:
+        assert main.main([]) == 0
+    mock_calculator.assert_called_once()
@@ -1,8 +1,11 @@
 """Unit tests for the Calculation class in the app.calculation module."""
 
+from dataclasses import FrozenInstanceError
 from unittest.mock import patch
-from app.operations import Add, Subtract
-from app.calculation import Calculation
+import pytest
+from app.operations import Add, Subtract, Divide, Power, OPERATIONS
+from app.calculation import Calculation, CalculationBatch
+from app import result_cache
 
 
 def test_calculation_initialization():
@@ -67,3 +70,103 @@ def test_perform_operation_subtract(mock_calculate):
 
     # Check that the result is correct
     assert result == 2  # The mock value for the calculate method is 2
+
+def test_perform_operation_uses_cache():
+    """Test repeated calculations are served from the cache when it is on."""
+    cache = result_cache.enable_cache(maxsize=8)
+    with patch.object(Add, 'calculate', wraps=Add().calculate) as mock_calculate:
+        calc = Calculation(Add(), 5.0, 3.0)
+        assert calc.perform_operation() == 8.0
+        assert str(calc) == "5.0 Add 3.0 = 8.0"
+        assert Calculation(Add(), 5.0, 3.0).perform_operation() == 8.0
+    mock_calculate.assert_called_once_with(5.0, 3.0)
+    assert cache.stats()[:3] == (1, 1, 0)
+
+def test_perform_operation_without_cache():
+    """Test every new calculation is performed while the cache is off."""
+    with patch.object(Add, 'calculate', return_value=8) as mock_calculate:
+        Calculation(Add(), 5, 3).perform_operation()
+        Calculation(Add(), 5, 3).perform_operation()
+    assert mock_calculate.call_count == 2
+
+def test_result_is_stored():
+    """Test the result is calculated once, then reused by perform_operation and __str__."""
+    with patch.object(Add, 'calculate', return_value=8) as mock_calculate:
+        calc = Calculation(Add(), 5, 3)
+        assert calc.result is None
+        assert calc.perform_operation() == 8
+        assert calc.perform_operation() == 8
+        assert str(calc) == "5 Add 3 = 8"
+    mock_calculate.assert_called_once_with(5, 3)
+    assert calc.result == 8
+
+def test_calculation_is_compact_and_frozen():
+    """Test calculations have no __dict__ and cannot be changed."""
+    calc = Calculation(Add(), 5, 3)
+    assert not hasattr(calc, '__dict__')
+    with pytest.raises(FrozenInstanceError):
+        calc.operand1 = 10
+    # The stored result does not change equality
+    performed = Calculation(calc.operation, 5, 3)
+    performed.perform_operation()
+    assert performed == calc
+
+def test_batch_evaluate():
+    """Test a batch evaluates every row with its own operation."""
+    batch = CalculationBatch()
+    for operation, a, b in [(Add(), 1, 2), (Divide(), 9, 3), (Power(), 2, 10), (Add(), 4, 4)]:
+        batch.append(operation, a, b)
+    assert batch.evaluate().tolist() == [3.0, 3.0, 1024.0, 8.0]
+    assert [calc.result for calc in batch] == [3.0, 3.0, 1024.0, 8.0]
+    assert str(batch[-2]) == "2.0 Power 10.0 = 1024.0"
+
+def test_batch_zero_division():
+    """Test zero division policies apply to the whole batch."""
+    batch = CalculationBatch([1, 4], [1, 1], [1, 0])
+    with pytest.raises(ValueError, match="Cannot divide by zero."):
+        batch.evaluate()
+    assert batch[0].result is None  # Nothing is stored when a row fails
+
+    masked = batch.evaluate('mask')
+    assert masked.mask.tolist() == [False, True]
+    assert batch[0].result == 2.0
+    assert batch[1].result is None
+
+def test_batch_iteration_and_slicing():
+    """Test a batch yields Calculation objects and slices into a new batch."""
+    add, subtract, divide = (OPERATIONS[name] for name in ('add', 'subtract', 'divide'))
+    calculations = [Calculation(add, 1.0, 2.0), Calculation(subtract, 5.0, 3.0, 2.0),
+                    Calculation(divide, 8.0, 2.0)]
+    batch = CalculationBatch.from_calculations(calculations)
+    assert list(batch) == calculations
+    assert batch[1].result == 2.0  # Results performed before are kept
+
+    part = batch[1:]
+    assert isinstance(part, CalculationBatch) and len(part) == 2
+    assert list(part) == calculations[1:]
+    assert part.evaluate().tolist() == [2.0, 4.0]
+    assert batch[2].result is None  # The slice is a copy
+
+    with pytest.raises(IndexError):
+        batch[3]  # pylint: disable=pointless-statement
+
+def test_batch_is_compact():
+    """Test a batch uses 25 bytes per calculation."""
+    batch = CalculationBatch([1] * 1000, range(1000), range(1000))
+    assert batch.nbytes == 25 * 1000
+
+@pytest.mark.parametrize("columns, message", [
+    (([1, 2], [1.0], [1.0, 2.0]), "All columns must have the same length."),
+    (([99], [1.0], [2.0]), "Unknown opcode: 99."),
+])
+def test_batch_invalid(columns, message):
+    """Test invalid batches raise a ValueError."""
+    with pytest.raises(ValueError, match=message):
+        CalculationBatch(*columns).evaluate()
+
+def test_batch_append_needs_opcode():
+    """Test operations without an opcode cannot be stored in a batch."""
+    class Unregistered(Add):
+        opcode = None
+    with pytest.raises(ValueError, match="has no opcode."):
+        CalculationBatch().append(Unregistered(), 1, 2)
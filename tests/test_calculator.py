@@ -10,7 +10,7 @@ from unittest.mock import patch, call, MagicMock, PropertyMock
 import pytest
 import pandas as pd
 
-from app.calculator import calculator
+from app.calculator import calculator, parse_list
 from app.operations import Add, Subtract, Multiply, Divide
 
 @pytest.fixture(autouse=True)
@@ -64,10 +64,34 @@ def test_help_command(mock_print, caplog):
     mock_print.assert_any_call("    ✶ subtract <num1> <num2>    : Subtracts two numbers.")
     mock_print.assert_any_call("    ✶ multiply <num1> <num2>    : Multiplies two numbers.")
     mock_print.assert_any_call("    ✶ divide   <num1> <num2>    : Divides two numbers.")
+    mock_print.assert_any_call("    ✶ power    <num1> <num2>    : Raises num1 to the power of num2.")
+    mock_print.assert_any_call("    ✶ modulo   <num1> <num2>    : Remainder of num1 divided by num2.")
+    mock_print.assert_any_call("    ✶ intdivide <num1> <num2>   : Divides two numbers, rounded down.")
+    mock_print.assert_any_call(
+        "    ✶ eval     <expression>     : Calculates an expression, e.g. (3 + 4) * ans."
+    )
     mock_print.assert_any_call("    ✶ list                      : Shows operation history.")
+    mock_print.assert_any_call("    ✶ list     <count>          : Shows the last <count> operations.")
+    mock_print.assert_any_call("    ✶ list     page <number>    : Shows one page of operations.")
     mock_print.assert_any_call(
         "    ✶ undo                      : Removes last operation from history."
     )
+    mock_print.assert_any_call("    ✶ undo     <count>          : Removes the last <count> operations.")
+    mock_print.assert_any_call("    ✶ redo                      : Restores the last undone operation.")
+    mock_print.assert_any_call(
+        "    ✶ redo     <count>          : Restores the last <count> undone operations."
+    )
+    mock_print.assert_any_call(
+        "    ✶ import   <path> [check]   : Adds new operations from a history file."
+    )
+    mock_print.assert_any_call(
+        "    ✶ export   [<directory>]    : Writes history as NumPy .npy columns."
+    )
+    mock_print.assert_any_call(
+        "    ✶ summary                   : Shows counts and statistics of history."
+    )
+    mock_print.assert_any_call("    ✶ stats                     : Shows call counts and latencies.")
+    mock_print.assert_any_call("    ✶ stats    export <file>    : Writes metrics in Prometheus format.")
     mock_print.assert_any_call("    ✶ exit                      : Exits the calculator.")
     mock_print.assert_any_call("Exiting calculator...")
     assert len(caplog.records) == 0
@@ -152,3 +176,76 @@ def test_various_invalid_inputs(mock_print, _mock_input):
 
     # Ensure the calls are in the correct order and match exactly
     mock_print.assert_has_calls([call(expected) for expected in expected_calls], any_order=False)
+
+@pytest.mark.parametrize("command, expected", [
+    ("list", (None, None)),
+    ("list 50", (50, None)),
+    ("list page 3", (None, 3)),
+])
+def test_parse_list(command, expected):
+    """Test the list command arguments are parsed into a count or a page."""
+    assert parse_list(command) == expected
+
+@pytest.mark.parametrize("command", ["list abc", "list -1", "list page", "list page 0", "list 1 2"])
+def test_parse_list_invalid(command):
+    """Test invalid list arguments raise a ValueError."""
+    with pytest.raises(ValueError, match="Usage: list"):
+        parse_list(command)
+
+@patch('builtins.input', side_effect=["list", "list 5", "LIST PAGE 2", "list page x", "exit"])
+@patch('builtins.print')
+def test_list_commands(mock_print, _mock_input):
+    """Test the list commands are passed to print_history."""
+    with patch('app.calculator.History') as mock_history:
+        calculator()
+    assert mock_history.return_value.print_history.call_args_list == [
+        call(None, None), call(5, None), call(None, 2)
+    ]
+    mock_print.assert_any_call("Invalid input. Usage: list [<count> | page <number>]")
+
+@patch('builtins.input', side_effect=[
+    "eval (3 + 4) * 2 / 7", "eval ans ^ 3", "eval -ans", "eval 1 / 0", "eval", "add 1 1",
+    "eval ans * 10", "exit"
+])
+@patch('builtins.print')
+def test_eval_command(mock_print, _mock_input):
+    """Test expressions are calculated, use 'ans' and are added to history."""
+    with patch('app.calculator.History') as mock_history:
+        calculator()
+    results = [c.args[0] for c in mock_print.call_args_list if str(c.args[0]).startswith("Re")]
+    assert results == ["Result: 2.0", "Result: 8.0", "Result: -8.0", "Result: 2.0", "Result: 20.0"]
+    invalid = [c for c in mock_print.call_args_list
+               if c == call("Invalid expression. Type 'help' for instructions.")]
+    assert len(invalid) == 2
+
+    # Each expression is recorded as its last operation
+    recorded = mock_history.return_value.add_to_history.call_args_list
+    assert [(repr(c.args[0]),) + c.args[1:] for c in recorded] == [
+        ("Divide", 14.0, 7.0, 2.0),
+        ("Power", 2.0, 3.0, 8.0),
+        ("Multiply", -1.0, 8.0, -8.0),
+        ("Add", 1.0, 1.0, 2.0),
+        ("Multiply", 2.0, 10.0, 20.0),
+    ]
+
+@patch('builtins.print')
+def test_stats_command(mock_print, tmp_path, monkeypatch):
+    """Test 'stats' shows the metrics and 'stats export' writes them to a file."""
+    path = tmp_path / "metrics.prom"
+    monkeypatch.setenv("METRICS", "True")
+    commands = ["add 1 2", "stats", f"stats export {path}", "stats oops", "exit"]
+    with patch('builtins.input', side_effect=commands), \
+         patch('app.calculator.METRICS.print_stats') as mock_stats:
+        calculator()
+    mock_stats.assert_called_once()
+    mock_print.assert_any_call(f"Metrics written to {path}.")
+    mock_print.assert_any_call("Invalid input. Usage: stats [export <file>]")
+    assert 'stage="perform_operation",operation="Add"' in path.read_text(encoding='utf-8')
+
+@patch('builtins.input', side_effect=["stats", "exit"])
+@patch('builtins.print')
+def test_stats_command_disabled(mock_print, _mock_input, monkeypatch):
+    """Test 'stats' explains how to turn metrics on."""
+    monkeypatch.delenv("METRICS", raising=False)
+    calculator()
+    mock_print.assert_any_call("Metrics are off. Set METRICS=True to record them.")
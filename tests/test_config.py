@@ -0,0 +1,109 @@
+'''
+Tests configuration is loaded only once per process.
+'''
+
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler
+from unittest.mock import patch
+import pytest
+from app import config
+from app.config import (
+    load_env, configure_logging, _file_config, LogSampler, set_log_sampling, start_queue_logging
+)
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with nothing loaded."""
+    load_env.cache_clear()
+    _file_config.cache_clear()
+    yield
+    load_env.cache_clear()
+    _file_config.cache_clear()
+    set_log_sampling(1)
+
+def test_load_env_once():
+    """Test the .env file is only read on the first call."""
+    with patch('dotenv.load_dotenv', return_value=True) as mock_load:
+        assert load_env() is True
+        assert load_env() is True
+    mock_load.assert_called_once()
+
+def test_configure_logging_once(monkeypatch):
+    """Test logging.conf is only parsed once."""
+    monkeypatch.setenv("TEST_MODE", "False")
+    with patch('dotenv.load_dotenv'), patch('logging.config.fileConfig') as mock_config:
+        configure_logging()
+        configure_logging()
+    mock_config.assert_called_once_with('logging.conf')
+
+def test_configure_logging_test_mode(monkeypatch):
+    """Test logging.conf is not applied in TEST_MODE."""
+    monkeypatch.setenv("TEST_MODE", "True")
+    with patch('dotenv.load_dotenv'), patch('logging.config.fileConfig') as mock_config:
+        configure_logging()
+    mock_config.assert_not_called()
+
+def test_configure_logging_high_throughput(monkeypatch):
+    """Test LOG_QUEUE and LOG_SAMPLE_EVERY turn on queued, sampled logging."""
+    monkeypatch.setenv("TEST_MODE", "False")
+    monkeypatch.setenv("LOG_QUEUE", "True")
+    monkeypatch.setenv("LOG_SAMPLE_EVERY", "10")
+    with patch('dotenv.load_dotenv'), patch('logging.config.fileConfig'), \
+         patch('app.config.start_queue_logging') as mock_queue:
+        configure_logging()
+    mock_queue.assert_called_once()
+    assert config._sampling['every'] == 10
+
+def test_log_sampler_one_in_n():
+    """Test a sampler lets 1 in every N records through."""
+    set_log_sampling(3)
+    sampler = LogSampler()
+    with patch.object(logging.root, 'isEnabledFor', return_value=True):
+        assert [sampler() for _ in range(7)] == [True, False, False, True, False, False, True]
+
+def test_log_sampler_level_guard():
+    """Test nothing is logged or counted while the level is off."""
+    set_log_sampling(2)
+    sampler = LogSampler(logging.INFO)
+    with patch.object(logging.root, 'isEnabledFor', return_value=False):
+        assert not sampler()
+    with patch.object(logging.root, 'isEnabledFor', return_value=True):
+        assert sampler()  # The first record is still the first one counted
+
+def test_set_log_sampling_invalid():
+    """Test a sampling rate below 1 raises a ValueError."""
+    with pytest.raises(ValueError, match="Sampling rate must be at least 1."):
+        set_log_sampling(0)
+
+def test_start_queue_logging():
+    """Test records go through a queue to the original handlers on a background thread."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    records = []
+
+    class ListHandler(logging.Handler):
+        """Collects records and the thread that handled them."""
+        def emit(self, record):
+            records.append((record.getMessage(), threading.current_thread().name))
+
+    for handler in saved_handlers:
+        root.removeHandler(handler)
+    root.addHandler(ListHandler())
+    root.setLevel(logging.INFO)
+    start_queue_logging.cache_clear()
+    try:
+        listener = start_queue_logging()
+        assert start_queue_logging() is listener  # Only started once
+        assert [type(handler) for handler in root.handlers] == [QueueHandler]
+        logging.info("Operation performed: %s", 1)
+        listener.stop()  # Writes every queued record
+        atexit.unregister(listener.stop)  # Already stopped
+    finally:
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+        start_queue_logging.cache_clear()
+
+    assert records == [("Operation performed: 1", records[0][1])]
+    assert records[0][1] != threading.current_thread().name
@@ -0,0 +1,106 @@
+'''
+Tests the infix expression engine: parsing with precedence,
+constant folding, compiling and the compiled expression cache.
+'''
+
+from unittest.mock import patch
+import pytest
+from app import expression
+from app.expression import (
+    BinaryOp, Number, Variable, compile_expression, parse, fold, normalize, cache_info, clear_cache
+)
+from app.operations import Add, Divide, Multiply, Power
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start every test with an empty cache."""
+    clear_cache()
+
+@pytest.mark.parametrize("text, expected", [
+    ("(3 + 4) * 2 / 7", 2.0),
+    ("3 + 4 * 2", 11.0),
+    ("10 - 4 - 3", 3.0),          # left associative
+    ("2 ^ 3 ^ 2", 512.0),         # right associative
+    ("2 ** 3", 8.0),
+    ("-2 ^ 2", -4.0),             # power binds tighter than negation
+    ("2 ^ -1", 0.5),
+    ("-(3 + 4)", -7.0),
+    ("+5", 5.0),
+    ("7 % 4 + 7 // 4", 4.0),
+    ("1.5e2 / .5", 300.0),
+    ("42", 42.0),
+])
+def test_evaluate(text, expected):
+    """Test expressions are calculated with the right precedence."""
+    assert compile_expression(text).evaluate() == expected
+
+def test_parse_tree():
+    """Test the AST uses the existing operations."""
+    tree = parse("1 + 2 * x")
+    assert isinstance(tree, BinaryOp) and isinstance(tree.operation, Add)
+    assert tree.left == Number(1.0)
+    assert isinstance(tree.right.operation, Multiply)
+    assert tree.right.right == Variable("x")
+
+def test_fold():
+    """Test constant subtrees are replaced by their result and variables are kept."""
+    assert fold(parse("(1 + 2) * 3")) == Number(9.0)
+    folded = fold(parse("(1 + 2) * x"))
+    assert isinstance(folded.operation, Multiply)
+    assert folded.left == Number(3.0)
+    assert folded.right == Variable("x")
+
+def test_variables():
+    """Test variables are given when the expression is evaluated."""
+    compiled = compile_expression("ans * 2 + 1")
+    assert compiled.evaluate({"ans": 3}) == 7.0
+    assert compiled.evaluate({"ans": 10}) == 21.0
+    with pytest.raises(ValueError, match="Unknown variable: ans."):
+        compiled.evaluate()
+
+def test_evaluate_parts():
+    """Test the last operation and its operands are returned for history."""
+    operation, left, right, result = compile_expression("(3 + 4) * 2 / 7").evaluate_parts()
+    assert isinstance(operation, Divide)
+    assert (left, right, result) == (14.0, 7.0, 2.0)
+    assert compile_expression("-5").evaluate_parts() == (None, -5.0, None, -5.0)
+
+@pytest.mark.parametrize("text, message", [
+    ("", "it is empty"),
+    ("3 +", "it ends too early"),
+    ("(3 + 4", "missing '\\)'"),
+    ("3 4", "unexpected '4'"),
+    ("3 $ 4", "unexpected '\\$'"),
+    ("* 3", "unexpected '\\*'"),
+    ("1 / 0", "Cannot divide by zero."),
+    ("2 ^ 0.5 ^ -8 ^ 9 ^ 9", "Result is too large."),
+])
+def test_invalid_expressions(text, message):
+    """Test invalid expressions raise a ValueError."""
+    with pytest.raises(ValueError, match=message):
+        compile_expression(text).evaluate()
+
+def test_cache_skips_parsing():
+    """Test an expression is parsed once and then served from the cache."""
+    with patch.object(expression, 'parse', wraps=parse) as mock_parse:
+        first = compile_expression("(3 + 4) * 2")
+        second = compile_expression("  (3  +  4)   *  2 ")
+    assert first is second
+    mock_parse.assert_called_once()
+    info = cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+def test_cache_is_bounded():
+    """Test the cache evicts old expressions past its size."""
+    for i in range(expression.CACHE_SIZE + 10):
+        compile_expression(f"{i} + 1")
+    assert cache_info().currsize == expression.CACHE_SIZE
+
+def test_normalize():
+    """Test whitespace and case are normalized for the cache key."""
+    assert normalize("  ANS *\t2 ") == "ans * 2"
+
+def test_power_node():
+    """Test '^' and '**' both use the Power operation."""
+    assert isinstance(parse("x ^ 2").operation, Power)
+    assert isinstance(parse("x ** 2").operation, Power)
@@ -0,0 +1,143 @@
+"""
+Tests for the columnar NumPy export. The columns are checked to match the
+history on every storage backend, to open memory-mapped, to grow by only the
+new rows on the next export, and to be rebuilt when exported rows were undone.
+"""
+
+import logging
+from unittest.mock import patch
+import numpy as np
+import pytest
+from app.calculator import calculator
+from app.history_export import (EXPORT_SUFFIX, NPY_HEADER_SIZE, column_path, export_history,
+                                load_columns, load_state)
+from app.history_manager import History
+from app.operations import Add, Divide, Multiply
+from app.storage import opcodes
+
+STORAGES = ["csv", "binary", "sqlite", "segmented"]
+
+
+def add_records(history, count, start=0):
+    """Adds 'count' records with distinct values."""
+    operations = [Add(), Multiply(), Divide()]
+    for index in range(start, start + count):
+        operation = operations[index % 3]
+        history.add_to_history(operation, float(index), 2.0,
+                               operation.calculate(float(index), 2.0))
+
+
+def check_columns(history, directory):
+    """Assert the exported columns hold exactly the history's records."""
+    columns = load_columns(directory)
+    records = list(history.storage.iter_records())
+    codes = opcodes()
+    assert all(isinstance(column, np.memmap) or len(column) == 0 for column in columns.values())
+    assert columns['opcode'].tolist() == [codes[record[0]] for record in records]
+    assert columns['operand1'].tolist() == [record[1] for record in records]
+    assert columns['operand2'].tolist() == [record[2] for record in records]
+    assert columns['result'].tolist() == [record[3] for record in records]
+
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_incremental_export(tmp_path, monkeypatch, storage):
+    """Test a second export only appends the rows added since the first."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history"))
+    history = History(storage=storage)
+    directory = str(tmp_path / "columns")
+
+    add_records(history, 10)
+    assert export_history(history, directory) == (10, 10, True)
+    check_columns(history, directory)
+
+    add_records(history, 5, start=10)
+    assert export_history(history, directory) == (15, 5, False)
+    check_columns(history, directory)
+
+    assert export_history(history, directory) == (15, 0, False)
+    history.close()
+
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_export_after_undo(tmp_path, monkeypatch, storage):
+    """Test the columns are rebuilt when exported rows are no longer in the history."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history"))
+    history = History(storage=storage)
+    directory = str(tmp_path / "columns")
+    add_records(history, 4)
+    export_history(history, directory)
+
+    with patch('builtins.print'):
+        history.undo_last()
+    add_records(history, 1, start=100)
+    assert export_history(history, directory) == (4, 4, True)
+    check_columns(history, directory)
+    history.close()
+
+
+def test_export_streams_in_chunks(tmp_path):
+    """Test a large export is converted chunk by chunk and appended in order."""
+    history = History()
+    directory = str(tmp_path / "columns")
+    add_records(history, 5)
+    export_history(history, directory)
+    add_records(history, 20, start=5)
+    with patch('app.history_export.EXPORT_CHUNK_ROWS', 3):
+        assert export_history(history, directory) == (25, 20, False)
+    check_columns(history, directory)
+
+
+def test_interrupted_export_cut_off(tmp_path):
+    """Test rows written after the last saved state are replaced by the next export."""
+    history = History()
+    directory = str(tmp_path / "columns")
+    add_records(history, 3)
+    export_history(history, directory)
+    with open(column_path(directory, 'result'), mode='ab') as file:
+        file.write(b'\0' * 80)  # An export that stopped before saving its state
+
+    add_records(history, 2, start=3)
+    export_history(history, directory)
+    check_columns(history, directory)
+
+
+def test_empty_history(tmp_path):
+    """Test an empty history exports empty columns that still load."""
+    history = History()
+    report = export_history(history, str(tmp_path / "columns"))
+    assert report == (0, 0, True)
+    assert all(len(column) == 0 for column in load_columns(str(tmp_path / "columns")).values())
+
+
+def test_npy_header_size_fixed(tmp_path):
+    """Test the data starts at the same offset whatever the row count."""
+    history = History()
+    directory = str(tmp_path / "columns")
+    add_records(history, 12)
+    export_history(history, directory)
+    for name in ['opcode', 'result']:
+        column = np.load(column_path(directory, name), mmap_mode='r')
+        assert column.offset == NPY_HEADER_SIZE
+    assert load_state(directory)['rows'] == 12
+
+
+def test_default_directory():
+    """Test the columns go next to the history file by default."""
+    history = History()
+    add_records(history, 2)
+    export_history(history)
+    assert len(load_columns(history.filename + EXPORT_SUFFIX)['result']) == 2
+
+
+@patch('builtins.print')
+def test_repl_export(mock_print, tmp_path, caplog):
+    """Test the REPL's export command."""
+    directory = str(tmp_path / "columns")
+    inputs = ["add 1 2", f"export {directory}", "multiply 3 4", f"export {directory}",
+              "export a b", "exit"]
+    with patch('builtins.input', side_effect=inputs), caplog.at_level(logging.CRITICAL):
+        calculator()
+    mock_print.assert_any_call("Exported 1 new operations (1 in total).")
+    mock_print.assert_any_call("Exported 1 new operations (2 in total).")
+    mock_print.assert_any_call("Invalid input. Usage: export [<directory>]")
+    assert load_columns(directory)['result'].tolist() == [3.0, 12.0]
@@ -0,0 +1,157 @@
+"""
+Tests for importing history CSV files. Rows are checked to be streamed in
+chunks, duplicates of the history and of earlier source rows to be skipped,
+bad rows and wrong results to be reported, and the REPL's 'import' command
+is checked end to end.
+"""
+
+import logging
+from unittest.mock import patch
+import pytest
+from app.calculator import calculator
+from app.history_import import BloomFilter, import_history, read_chunks, record_key
+from app.history_manager import History
+from app.operations import Add
+
+SOURCE = (
+    "Operation,Operand #1,Operand #2,Result\r\n"
+    "Add,1.0,2.0,3.0\r\n"
+    "Multiply,3,4,12\r\n"
+    "Add,1,2,3\r\n"            # Same record as line 2
+    "Divide,1.0,4.0,0.3\r\n"   # Wrong result
+    "Power,2.0,3.0,8.0\r\n"
+    "Square,2.0,0.0,4.0\r\n"   # Unknown operation
+    "Add,x,1.0,1.0\r\n"        # Not a number
+    "Subtract,5.0,1.0\r\n"     # Missing field
+)
+
+
+@pytest.fixture(name="source")
+def source_file(tmp_path):
+    """A history CSV from another machine."""
+    path = tmp_path / "other.csv"
+    path.write_text(SOURCE, encoding="utf-8", newline="")
+    return str(path)
+
+
+def test_bloom_filter():
+    """Test added keys are always found and few others are taken for them."""
+    bloom = BloomFilter(10000, error_rate=1e-3)
+    keys = [f"key {index}".encode() for index in range(10000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert not any(bloom.add(key) for key in keys)
+    false_positives = sum(f"other {index}".encode() in bloom for index in range(10000))
+    assert false_positives < 50
+
+
+def test_bloom_filter_size_capped():
+    """Test the filter never grows past 'max_bytes'."""
+    bloom = BloomFilter(10 ** 9, max_bytes=1024)
+    assert len(bloom._bits) == 1024
+
+
+def test_record_key():
+    """Test records with the same values have the same key, whatever their text."""
+    assert record_key(("Add", 1.0, 2.0, 3.0)) == record_key(("Add", 1, 2, 3))
+    assert record_key(("Add", 1.0, 2.0, 3.0)) != record_key(("Subtract", 1.0, 2.0, 3.0))
+
+
+def test_read_chunks(source):
+    """Test rows come in chunks of 'chunk_rows' with their line numbers."""
+    chunks = list(read_chunks(source, chunk_rows=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 2]
+    assert chunks[0][0] == (2, ["Add", "1.0", "2.0", "3.0"])
+
+
+@pytest.mark.parametrize("header", [
+    "", "Operation,Operand #1,Operand #2\n", "Result,Operand #1,Operand #2,Operation\n",
+])
+def test_wrong_header(tmp_path, header):
+    """Test a file without the history header is rejected before anything is imported."""
+    path = tmp_path / "other.csv"
+    path.write_text(header + "Add,1.0,2.0,3.0\n", encoding="utf-8")
+    history = History()
+    with pytest.raises(ValueError, match="is not a history file"):
+        import_history(history, str(path))
+    assert history.storage.tail(5) == []
+
+
+def test_header_with_spaces(tmp_path):
+    """Test the header may have spaces after the commas."""
+    path = tmp_path / "other.csv"
+    path.write_text("Operation, Operand #1, Operand #2, Result\nAdd, 1, 2, 3\n", encoding="utf-8")
+    report = import_history(History(), str(path))
+    assert report.imported == 1
+
+
+@pytest.mark.parametrize("storage", ["csv", "binary", "sqlite", "segmented"])
+def test_import(tmp_path, monkeypatch, source, storage):
+    """Test new records are appended and duplicates of the history are skipped."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history"))
+    history = History(storage=storage)
+    history.add_to_history(Add(), 1.0, 2.0, 3.0)
+
+    report = import_history(history, source, chunk_rows=2)
+    assert report == (3, 2, 3, 0)
+    assert history.storage.tail(10) == [
+        ("Add", 1.0, 2.0, 3.0), ("Multiply", 3.0, 4.0, 12.0),
+        ("Divide", 1.0, 4.0, 0.3), ("Power", 2.0, 3.0, 8.0),
+    ]
+    assert history.summary().count == 4
+
+    # Importing the same file again adds nothing
+    assert import_history(history, source).imported == 0
+    history.close()
+
+
+@pytest.mark.parametrize("verify, report, result", [
+    ("check", (3, 1, 3, 1), None),
+    ("recompute", (4, 1, 3, 0), 0.25),
+])
+def test_import_verify(source, verify, report, result):
+    """Test wrong results are skipped or replaced by the recomputed result."""
+    history = History()
+    assert import_history(history, source, verify) == report
+    divisions = [record[3] for record in history.storage.tail(10) if record[0] == "Divide"]
+    assert divisions == ([] if result is None else [result])
+
+
+def test_import_unknown_verify_mode(source):
+    """Test an unknown verify mode is rejected."""
+    with pytest.raises(ValueError, match="Unknown verify mode"):
+        import_history(History(), source, "maybe")
+
+
+def test_import_appends_in_chunks(source):
+    """Test every chunk is appended in one group."""
+    history = History()
+    with patch.object(history.storage, 'append_many') as append_many:
+        import_history(history, source, chunk_rows=4)
+    assert [len(call.args[0]) for call in append_many.call_args_list] == [3, 1]
+
+
+def test_imported_records_can_be_undone(source):
+    """Test imported records count for the session like added ones."""
+    history = History()
+    import_history(history, source)
+    assert history.counter == 4
+    with patch('builtins.print'):
+        history.undo_last()
+    assert history.storage.tail(1) == [("Divide", 1.0, 4.0, 0.3)]
+
+
+@patch('builtins.print')
+def test_repl_import(mock_print, source, caplog):
+    """Test the REPL's import command and its errors."""
+    inputs = [f"import {source}", f"import {source} recompute", "import", "import a b c",
+              "import missing.csv", "exit"]
+    with patch('builtins.input', side_effect=inputs), caplog.at_level(logging.CRITICAL):
+        calculator()
+    mock_print.assert_any_call(f"Imported 4 operations from {source}.")
+    mock_print.assert_any_call("Skipped 1 duplicates, 3 invalid rows and 0 wrong results.")
+    mock_print.assert_any_call(f"Imported 1 operations from {source}.")  # The corrected division
+    mock_print.assert_any_call("Invalid input. Usage: import <path> [check | recompute]")
+    assert any(str(call.args[0]).startswith("Could not import history:")
+               for call in mock_print.call_args_list if call.args)
@@ -60,22 +60,23 @@ def test_add_to_history(operation_class, operand1, operand2, result):
         assert history.counter == 3  # Counter should be 3 after three operations
 
 
-def test_undo_last():
-    """Test the undo_last method without file interaction."""
-    # Reset the History singleton instance before each test
+@pytest.fixture
+def history_file(tmp_path, monkeypatch):
+    """Point History at a temporary CSV file and reset the singleton."""
+    filename = tmp_path / "history.csv"
+    monkeypatch.setenv("HISTORY_FILENAME", str(filename))
     History._instance = None
+    return filename
+
 
+def test_undo_last(history_file):
+    """Test the undo_last method removes the last record from the file."""
     # Create a new History instance for each test
     history = History()
 
-    # Mock file-writing methods (open) to avoid file operations
-    with patch('builtins.open', MagicMock()), \
-         patch.object(pd, 'read_csv', return_value=pd.DataFrame({
-             "Operation": ["Add"],
-             "Operand #1": [5],
-             "Operand #2": [3],
-             "Result": [8]
-         })):  # Simulate a DataFrame with one row of data
+    # Undo must not load the file into a DataFrame
+    with patch.object(pd, 'read_csv', side_effect=AssertionError("file was loaded")), \
+         patch('builtins.print') as mock_print:
 
         # Add an operation to history
         mock_operation = Add()
@@ -90,21 +91,63 @@ def test_undo_last():
         # Assert the counter is decremented after undo
         assert history.counter == 0  # Counter should be 0 after undoing
 
+        mock_print.assert_any_call("    5.0 Add 3.0 = 8.0")
 
-def test_print_history():
-    """Test printing the history without file writing."""
-    # Reset the History singleton instance before each test
-    History._instance = None
+    # Only the header is left in the file
+    assert history_file.read_bytes() == b"Operation,Operand #1,Operand #2,Result\r\n"
+
+
+def test_undo_last_truncates_in_order(history_file):
+    """Test repeated undos remove records from the end, one at a time."""
+    history = History()
+    with patch('builtins.print'):
+        history.add_to_history(Add(), 1.0, 2.0, 3.0)
+        history.add_to_history(Subtract(), 5.0, 3.0, 2.0)
+        history.add_to_history(Multiply(), 3.0, 4.0, 12.0)
+
+        history.undo_last()
+        history.undo_last()
+
+    assert history.counter == 1
+    assert history_file.read_text(encoding='utf-8').splitlines() == [
+        "Operation,Operand #1,Operand #2,Result",
+        "Add,1.0,2.0,3.0",
+    ]
+
+
+def test_undo_last_long_record(history_file):
+    """Test the backward scan finds a record longer than one scan block."""
+    history = History()
+    with patch('app.storage.SCAN_BLOCK_SIZE', 4), patch('builtins.print'):
+        history.add_to_history(Add(), 1, 2, 3)
+        history.add_to_history(Divide(), 123456789.125, 0.5, 246913578.25)
+        history.undo_last()
+
+    assert history_file.read_text(encoding='utf-8').splitlines()[-1] == "Add,1,2,3"
+
+
+def test_undo_last_header_only(history_file):
+    """Test undo does not remove the header if the records were removed elsewhere."""
+    history = History()
+    history.add_to_history(Add(), 1, 2, 3)
+    history.flush()
+    history_file.write_text("Operation,Operand #1,Operand #2,Result\n", encoding='utf-8')
 
+    with patch('builtins.print') as mock_print:
+        history.undo_last()
+        mock_print.assert_called_with("No operations to undo.")
+    assert history_file.read_text(encoding='utf-8') == "Operation,Operand #1,Operand #2,Result\n"
+
+
+def test_print_history(history_file):
+    """Test printing the history without loading the whole file."""
     # Create a new History instance for each test
     history = History()
 
-    # Mock file-writing methods (open) to avoid file operations
-    with patch('builtins.open', MagicMock()), \
-         patch.object(pd,
-            'read_csv',
-            return_value=pd.DataFrame(columns=["Operation", "Operand #1", "Operand #2", "Result"])
-        ), \
+    # Rows written by an earlier session must not be printed
+    history.storage.append(("Multiply", 2.0, 2.0, 4.0))
+
+    with patch.object(pd, 'read_csv', side_effect=AssertionError("file was loaded")), \
          patch('builtins.print') as mock_print:
 
         # Add some operations to history
@@ -116,23 +159,105 @@ def test_print_history():
 
         # Mock the DataFrame's to_string method to return a controlled output
         with patch.object(pd.DataFrame, 'to_string', return_value=(
-            "   Operation  Operand #1  Operand #2  Result\n"
-            "37       Add           5           3       8\n"
-            "38  Subtract          10           5       5"
+            "Operation Operand #1 Operand #2 Result\n"
+            "      Add          5          3      8\n"
+            " Subtract         10          5      5"
         )) as mock_to_string:
             # Print the history
             history.print_history()
 
             # Assert that print was called with the expected string
             mock_print.assert_called_with(
-                "   Operation  Operand #1  Operand #2  Result\n"
-                "37       Add           5           3       8\n"
-                "38  Subtract          10           5       5"
+                "Operation Operand #1 Operand #2 Result\n"
+                "      Add          5          3      8\n"
+                " Subtract         10          5      5"
             )
 
             # Ensure to_string was called as expected
             mock_to_string.assert_called_once()
 
+        # Only this session's rows were put in the DataFrame
+        history.print_history()
+        printed = mock_print.call_args.args[0]
+        assert "Add" in printed and "Subtract" in printed
+        assert "Multiply" not in printed
+
+
+def test_print_session_from_memory(history_file):
+    """Test the session is listed from memory, without reading the storage."""
+    history = History()
+    history.add_to_history(Add(), 1, 2, 3)
+    history.add_to_history(Multiply(), 2, 3, 6)
+    history.add_to_history(Divide(), 8, 2, 4)
+    with patch('builtins.print') as mock_print:
+        history.undo_last()
+
+        with patch.object(history.storage, 'tail', side_effect=AssertionError("file was read")):
+            history.print_history()
+    assert printed_operands(mock_print) == [1, 2]
+    assert "Multiply" in mock_print.call_args.args[0]
+
+
+def test_print_session_capped(history_file, monkeypatch):
+    """Test a long session only keeps its newest records in memory."""
+    monkeypatch.setenv("HISTORY_SESSION_SIZE", "3")
+    history = History()
+    fill_history(history, 5)
+    with patch('builtins.print') as mock_print:
+        history.print_history()
+        table = mock_print.call_args_list[-2].args[0]
+        mock_print.assert_called_with("Showing the last 3 of 5 operations of this session.")
+    assert [int(float(line.split()[1])) for line in table.splitlines()[1:]] == [3, 4, 5]
+
+
+def fill_history(history, count):
+    """Add 'count' additions numbered 1 to 'count' to history."""
+    for i in range(1, count + 1):
+        history.add_to_history(Add(), i, 0, i)
+
+
+def printed_operands(mock_print):
+    """Return the first operands of the last printed history table."""
+    return [int(float(line.split()[1])) for line in mock_print.call_args.args[0].splitlines()[1:]]
+
+
+@pytest.mark.parametrize("count, expected", [
+    (1, [25]),
+    (3, [23, 24, 25]),
+    (30, list(range(1, 26))),  # Asking for more records than exist shows them all
+])
+def test_print_history_count(history_file, count, expected):
+    """Test printing the last 'count' records of the file."""
+    history = History()
+    fill_history(history, 25)
+    with patch('app.storage.SCAN_BLOCK_SIZE', 16), patch('builtins.print') as mock_print:
+        history.print_history(count=count)
+    assert printed_operands(mock_print) == expected
+
+
+@pytest.mark.parametrize("page, expected", [
+    (1, list(range(16, 26))),
+    (2, list(range(6, 16))),
+    (3, list(range(1, 6))),
+])
+def test_print_history_page(history_file, page, expected):
+    """Test printing one page of records, page 1 being the most recent."""
+    history = History()
+    fill_history(history, 25)
+    with patch('app.storage.SCAN_BLOCK_SIZE', 16), patch('builtins.print') as mock_print:
+        history.print_history(page=page)
+    assert printed_operands(mock_print) == expected
+
+
+@pytest.mark.parametrize("kwargs", [{"page": 4}, {"count": 0}])
+def test_print_history_past_the_end(history_file, kwargs):
+    """Test pages past the first record and empty counts print an empty history."""
+    history = History()
+    fill_history(history, 25)
+    with patch('builtins.print') as mock_print:
+        history.print_history(**kwargs)
+    mock_print.assert_called_with("History is empty.")
+
 
 def test_undo_empty_history():
     """Test undoing when history is empty."""
@@ -172,3 +297,97 @@ def test_print_empty_history():
         history.print_history()
         # Assert the correct message is printed
         mock_print.assert_called_with("History is empty.")
+
+
+def test_write_behind_mode(tmp_path, monkeypatch):
+    """Test write-behind mode queues rows and writes them on flush and close."""
+    filename = tmp_path / "history.csv"
+    monkeypatch.setenv("HISTORY_FILENAME", str(filename))
+    monkeypatch.setenv("HISTORY_WRITE_BEHIND", "True")
+    History._instance = None
+
+    history = History()
+    with patch('builtins.print'):
+        history.add_to_history(Add(), 1, 2, 3)
+        history.add_to_history(Divide(), 8, 2, 4)
+        assert history.counter == 2
+
+        # Undo sees the queued rows because it flushes first
+        history.undo_last()
+        assert history.counter == 1
+
+    history.add_to_history(Multiply(), 3, 4, 12)
+    history.close()
+    history.close()  # Closing twice is harmless
+
+    assert filename.read_text(encoding='utf-8').splitlines() == [
+        "Operation,Operand #1,Operand #2,Result",
+        "Add,1,2,3",
+        "Multiply,3,4,12",
+    ]
+
+
+def test_write_behind_argument(tmp_path, monkeypatch):
+    """Test the write_behind argument overrides the environment."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history.csv"))
+    monkeypatch.setenv("HISTORY_WRITE_BEHIND", "True")
+    History._instance = None
+
+    history = History(write_behind=False)
+    # Direct mode: the writer thread is woken for every record
+    assert history._writer.batch_size == 1  # pylint: disable=protected-access
+    history.flush()
+    history.close()
+
+
+def test_binary_storage(tmp_path, monkeypatch):
+    """Test History works the same way with the binary storage backend."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history.bin"))
+    monkeypatch.setenv("HISTORY_STORAGE", "binary")
+    History._instance = None
+
+    history = History()
+    with patch('builtins.print') as mock_print:
+        history.add_to_history(Add(), 5.0, 3.0, 8.0)
+        history.add_to_history(Divide(), 9.0, 3.0, 3.0)
+        history.undo_last()
+        mock_print.assert_any_call("    9.0 Divide 3.0 = 3.0")
+
+        history.print_history()
+        assert "Add" in mock_print.call_args.args[0]
+    assert history.storage.load()['result'].tolist() == [8.0]
+
+
+def test_sqlite_storage(tmp_path, monkeypatch):
+    """Test History can record to the SQLite backend and query it."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history.db"))
+    monkeypatch.setenv("HISTORY_STORAGE", "sqlite")
+    History._instance = None
+
+    history = History(write_behind=True)
+    history.add_to_history(Divide(), 8.0, 2.0, 4.0)
+    history.add_to_history(Add(), 1.0, 2.0, 3.0)
+    history.flush()
+    assert history.storage.query(operation="Divide") == [("Divide", 8.0, 2.0, 4.0)]
+    history.close()
+
+
+def test_segmented_storage(tmp_path, monkeypatch):
+    """Test History rotates segments and lists and undoes across them."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "segments"))
+    monkeypatch.setenv("HISTORY_STORAGE", "segmented")
+    monkeypatch.setenv("HISTORY_SEGMENT_SIZE", "50")
+    History._instance = None
+
+    history = History()
+    for number in range(6):
+        history.add_to_history(Add(), float(number), 1.0, number + 1.0)
+        history.flush()  # One append per record, so the segments rotate between them
+    assert len(history.storage.segments()) > 2
+
+    with patch('builtins.print') as mock_print:
+        for _ in range(4):
+            history.undo_last()
+        mock_print.assert_any_call("    2.0 Add 1.0 = 3.0")
+    assert list(history.storage.iter_records()) == [("Add", 0.0, 1.0, 1.0), ("Add", 1.0, 1.0, 2.0)]
+    history.close()
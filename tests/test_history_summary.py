@@ -0,0 +1,162 @@
+"""
+Tests for the incrementally maintained history summary. The running
+aggregates are compared with statistics computed from scratch after
+every add and undo, and the sidecar file is checked to be reused only
+while it matches the history file.
+"""
+
+import json
+import random
+import statistics
+from unittest.mock import patch
+import pytest
+from app.calculator import calculator
+from app.history_manager import History
+from app.history_summary import HistorySummary, history_signature
+from app.operations import Add, Divide, Multiply
+
+RECORDS = [
+    ("Add", 1.0, 2.0, 3.0),
+    ("Multiply", 3.0, 4.0, 12.0),
+    ("Divide", 1.0, 4.0, 0.25),
+    ("Add", -5.0, 2.0, -3.0),
+]
+
+
+def check(summary, records):
+    """Assert the summary matches statistics computed from 'records'."""
+    report = summary.report()
+    results = [record[3] for record in records]
+    assert report.count == len(records)
+    assert report.per_operation == {
+        name: sum(record[0] == name for record in records) for name in {r[0] for r in records}
+    }
+    if not records:
+        assert (report.minimum, report.maximum, report.mean, report.variance) == (None,) * 4
+        return
+    assert report.total == pytest.approx(sum(results))
+    assert report.minimum == min(results)
+    assert report.maximum == max(results)
+    assert report.mean == pytest.approx(statistics.fmean(results))
+    assert report.variance == pytest.approx(statistics.pvariance(results), abs=1e-9)
+
+
+def test_add_and_remove():
+    """Test every add and undo keeps the summary equal to a full recount."""
+    summary, records = HistorySummary(), []
+    for record in RECORDS:
+        summary.add(record)
+        records.append(record)
+        check(summary, records)
+    while records:
+        summary.remove(records.pop())
+        check(summary, records)
+
+
+def test_random_adds_and_undos():
+    """Test min and max come back correctly after undoing random records."""
+    rng = random.Random(7)
+    summary, records = HistorySummary(), []
+    for _ in range(2000):
+        if records and rng.random() < 0.4:
+            summary.remove(records.pop())
+        else:
+            record = ("Add", 0.0, 0.0, float(rng.randint(-50, 50)))
+            summary.add(record)
+            records.append(record)
+    check(summary, records)
+
+    # Only changes of the min or max are kept, not one entry per record
+    assert len(summary._min_changes) + len(summary._max_changes) < len(records)
+
+
+def test_division_error_share():
+    """Test division errors are counted and kept across undo."""
+    summary = HistorySummary()
+    summary.add(RECORDS[0])
+    summary.add_division_error()
+    assert summary.report().division_error_share == 0.5
+    summary.remove(RECORDS[0])
+    assert summary.report().division_errors == 1
+    assert HistorySummary().report().division_error_share == 0.0
+
+
+def test_save_and_load(tmp_path):
+    """Test a saved summary loads back only with the same signature."""
+    path = str(tmp_path / "history.csv.summary.json")
+    summary = HistorySummary.from_records(RECORDS)
+    summary.save(path, [["history.csv", 10, 1]])
+
+    loaded = HistorySummary.load(path, [["history.csv", 10, 1]])
+    assert loaded.report() == summary.report()
+    loaded.remove(RECORDS[-1])
+    check(loaded, RECORDS[:-1])
+
+    assert HistorySummary.load(path, [["history.csv", 11, 1]]) is None
+    assert HistorySummary.load(str(tmp_path / "missing.json")) is None
+
+
+def test_load_unreadable(tmp_path):
+    """Test a corrupt sidecar is ignored."""
+    path = tmp_path / "summary.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert HistorySummary.load(str(path)) is None
+    path.write_text(json.dumps({"count": 1}), encoding="utf-8")
+    assert HistorySummary.load(str(path)) is None
+
+
+def test_history_summary(tmp_path):
+    """Test History keeps its summary up to date on add and undo."""
+    history = History()
+    history.add_to_history(Add(), 1, 2, 3)
+    history.add_to_history(Multiply(), 3, 4, 12)
+    with patch('builtins.print'):
+        history.undo_last()
+    report = history.summary()
+    assert (report.count, report.per_operation, report.total) == (1, {"Add": 1}, 3)
+
+
+@pytest.mark.parametrize("storage", ["csv", "binary", "sqlite", "segmented"])
+def test_sidecar_reused(tmp_path, monkeypatch, storage):
+    """Test the sidecar is saved on close and used by the next session."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history"))
+    monkeypatch.setenv("HISTORY_STORAGE", storage)
+    history = History()
+    history.add_to_history(Add(), 1, 2, 3)
+    history.add_to_history(Divide(), 1, 4, 0.25)
+    history.record_division_error()
+    history.close()
+
+    with patch('app.history_summary.HistorySummary.from_records') as rebuild:
+        History._instance = None
+        history = History()
+    rebuild.assert_not_called()
+    report = history.summary()
+    assert (report.count, report.division_errors) == (2, 1)
+    history.close()
+
+
+def test_stale_sidecar_rebuilt(tmp_path):
+    """Test a sidecar that does not match the history file is rebuilt from it."""
+    history = History()
+    history.add_to_history(Add(), 1, 2, 3)
+    history.close()
+
+    # Another program appends to the history after the sidecar was saved
+    with open(history.filename, "a", encoding="utf-8") as file:
+        file.write("Multiply,3.0,4.0,12.0\n")
+    assert HistorySummary.load(history.summary_file,
+                               history_signature(history.filename)) is None
+
+    History._instance = None
+    report = History().summary()
+    assert (report.count, report.total, report.maximum) == (2, 15, 12)
+
+
+@patch('builtins.input', side_effect=['divide 1 0', 'add 1 2', 'summary', 'exit'])
+@patch('builtins.print')
+def test_summary_command(mock_print, _mock_input):
+    """Test the REPL counts division errors and prints the summary."""
+    calculator()
+    mock_print.assert_any_call("Calculations: 1")
+    mock_print.assert_any_call("Division errors: 1 (50.0% of calculations)")
@@ -0,0 +1,121 @@
+"""
+Tests for the background HistoryWriter. Checks rows are written
+in order, flushed by count and by time, and drained on close.
+"""
+
+import threading
+import time
+from unittest.mock import patch
+from app.history_writer import HistoryWriter
+from app.storage import CsvStorage
+
+
+def read_rows(path):
+    """Return the record lines written to the file, without the header."""
+    return path.read_text(encoding='utf-8').splitlines()[1:]
+
+
+def test_write_and_flush(tmp_path):
+    """Test flush blocks until queued rows are in the file, in order."""
+    path = tmp_path / "history.csv"
+    writer = HistoryWriter(CsvStorage(str(path)), flush_interval=60)
+    for i in range(5):
+        writer.write(["Add", i, 1, i + 1])
+    writer.flush()
+    assert read_rows(path) == [f"Add,{i},1,{i + 1}" for i in range(5)]
+    writer.close()
+
+
+def test_flush_by_count(tmp_path):
+    """Test a full batch is written without an explicit flush."""
+    path = tmp_path / "history.csv"
+    writer = HistoryWriter(CsvStorage(str(path)), batch_size=3, flush_interval=60)
+    for i in range(3):
+        writer.write(["Multiply", i, 2, i * 2])
+
+    # Wait for the writer thread to write the full batch
+    for _ in range(100):
+        if len(read_rows(path)) == 3:
+            break
+        time.sleep(0.01)
+    assert len(read_rows(path)) == 3
+    writer.close()
+
+
+def test_flush_by_time(tmp_path):
+    """Test a partial batch is written once the flush interval passes."""
+    path = tmp_path / "history.csv"
+    writer = HistoryWriter(CsvStorage(str(path)), batch_size=1000, flush_interval=0.05)
+    writer.write(["Subtract", 5, 3, 2])
+
+    for _ in range(100):
+        if read_rows(path):
+            break
+        time.sleep(0.01)
+    assert read_rows(path) == ["Subtract,5,3,2"]
+    writer.close()
+
+
+def test_close_drains_queue(tmp_path):
+    """Test close writes every queued row and stops the thread."""
+    path = tmp_path / "history.csv"
+    writer = HistoryWriter(CsvStorage(str(path)), batch_size=1000, flush_interval=60)
+    for i in range(2000):
+        writer.write(["Add", i, 0, i])
+    writer.close()
+    assert len(read_rows(path)) == 2000
+    assert not writer._thread.is_alive()  # pylint: disable=protected-access
+    # Flushing a closed writer does nothing
+    writer.flush()
+
+
+def test_close_registered_at_exit(tmp_path):
+    """Test the writer drains itself at interpreter shutdown."""
+    with patch('atexit.register') as mock_register, patch('atexit.unregister') as mock_unregister:
+        writer = HistoryWriter(CsvStorage(str(tmp_path / "history.csv")))
+        mock_register.assert_called_once_with(writer.close)
+        writer.close()
+        mock_unregister.assert_called_once_with(writer.close)
+
+
+def test_concurrent_writers(tmp_path):
+    """Test rows from many threads are all written, with callers held back by max_queue."""
+    path = tmp_path / "history.csv"
+    writer = HistoryWriter(CsvStorage(str(path)), max_queue=50, batch_size=10,
+                           flush_interval=60)
+
+    def write_rows(index):
+        for i in range(100):
+            writer.write(["Add", index, i, index + i])
+
+    threads = [threading.Thread(target=write_rows, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    rows = read_rows(path)
+    assert sorted(rows) == sorted(f"Add,{t},{i},{t + i}" for t in range(8) for i in range(100))
+
+
+def test_pop_and_append_many_after_queued_rows(tmp_path):
+    """Test pop and append_many write the queued rows first, so the order is kept."""
+    path = tmp_path / "history.csv"
+    writer = HistoryWriter(CsvStorage(str(path)), batch_size=1000, flush_interval=60)
+    writer.write(["Add", 1, 2, 3])
+    writer.write(["Subtract", 5, 3, 2])
+    assert writer.pop() == ("Subtract", 5.0, 3.0, 2.0)
+    writer.write(["Multiply", 3, 4, 12])
+    writer.append_many([["Divide", 8, 2, 4]])
+    assert read_rows(path) == ["Add,1,2,3", "Multiply,3,4,12", "Divide,8,2,4"]
+    writer.close()
+
+
+def test_write_after_close(tmp_path):
+    """Test rows written to a closed writer are written in the calling thread."""
+    path = tmp_path / "history.csv"
+    writer = HistoryWriter(CsvStorage(str(path)))
+    writer.close()
+    writer.write(["Add", 1, 2, 3])
+    assert read_rows(path) == ["Add,1,2,3"]
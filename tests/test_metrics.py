@@ -0,0 +1,131 @@
+'''
+Tests the built-in metrics: counters, latency histograms,
+the Prometheus export and the instrumented calls.
+'''
+
+from unittest.mock import patch
+import pytest
+from app.metrics import METRICS, BUCKETS, Metrics, timed, enable_metrics, configure_metrics
+from app.calculation import Calculation
+from app.operation_factory import OperationFactory
+from app.history_manager import History
+
+def test_observe_buckets():
+    """Test each latency lands in the first bucket whose bound is not below it."""
+    metrics = Metrics()
+    for seconds in (0.5e-6, 1e-6, 3e-6, 2.0):
+        metrics.observe('perform_operation', 'Add', seconds)
+    metrics.observe('perform_operation', 'Add', 1e-6, error=True)
+    (stats,) = metrics.snapshot()
+    assert (stats.calls, stats.errors) == (5, 1)
+    assert stats.buckets[0] == 3  # <= 1µs
+    assert stats.buckets[2] == 1  # <= 5µs
+    assert stats.buckets[-1] == 1  # +Inf
+    assert stats.total == pytest.approx(2.0000055)
+    assert stats.p50 == 1e-6
+    assert stats.p99 == float('inf')
+
+def test_prometheus_format():
+    """Test the export has cumulative buckets, sum, count and error counters."""
+    metrics = Metrics()
+    metrics.observe('perform_operation', 'Divide', 3e-6)
+    metrics.observe('perform_operation', 'Divide', 3e-6, error=True)
+    text = metrics.to_prometheus()
+    labels = 'stage="perform_operation",operation="Divide"'
+    assert "# TYPE calculator_duration_seconds histogram" in text
+    assert f'calculator_duration_seconds_bucket{{{labels},le="2.5e-06"}} 0' in text
+    assert f'calculator_duration_seconds_bucket{{{labels},le="5e-06"}} 2' in text
+    assert f'calculator_duration_seconds_bucket{{{labels},le="1.0"}} 2' in text
+    assert f'calculator_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f'calculator_duration_seconds_sum{{{labels}}} 6e-06' in text
+    assert f'calculator_duration_seconds_count{{{labels}}} 2' in text
+    assert f'calculator_calls_total{{{labels}}} 2' in text
+    assert f'calculator_errors_total{{{labels}}} 1' in text
+    bucket_lines = [line for line in text.splitlines() if '_bucket{' in line]
+    assert len(bucket_lines) == len(BUCKETS) + 1
+
+def test_write_prometheus(tmp_path):
+    """Test the export replaces the file at once."""
+    path = tmp_path / "metrics.prom"
+    path.write_text("old", encoding='utf-8')
+    metrics = Metrics()
+    metrics.observe('undo_last', '', 1e-3)
+    metrics.write_prometheus(str(path))
+    assert path.read_text(encoding='utf-8') == metrics.to_prometheus()
+    assert list(tmp_path.iterdir()) == [path]
+
+def test_timed_disabled_records_nothing():
+    """Test instrumented functions only check the flag while metrics are off."""
+    @timed('stage', lambda value: str(value))
+    def double(value):
+        return value * 2
+
+    with patch('app.metrics.time.perf_counter') as mock_clock:
+        assert double(2) == 4
+    mock_clock.assert_not_called()
+    assert not METRICS.snapshot()
+
+def test_timed_records_calls_and_errors():
+    """Test instrumented functions record their latency and errors."""
+    @timed('stage', lambda value: f"op{value}")
+    def check(value):
+        if value < 0:
+            raise ValueError("negative")
+        return value
+
+    enable_metrics()
+    check(1)
+    check(1)
+    with pytest.raises(ValueError):
+        check(-1)
+    calls = {(stats.operation, stats.calls, stats.errors) for stats in METRICS.snapshot()}
+    assert calls == {("op1", 2, 0), ("op-1", 1, 1)}
+
+def test_instrumented_stages():
+    """Test the factory, calculations and history record their own stages."""
+    enable_metrics()
+    operation = OperationFactory.create_operation('Add')
+    with pytest.raises(ValueError):
+        OperationFactory.create_operation('made-up')
+    Calculation(operation, 1.0, 2.0).perform_operation()
+    with pytest.raises(ValueError):
+        Calculation(OperationFactory.create_operation('divide'), 1.0, 0.0).perform_operation()
+    history = History()
+    history.add_to_history(operation, 1.0, 2.0, 3.0)
+    history.undo_last()
+
+    recorded = {(stats.stage, stats.operation): (stats.calls, stats.errors)
+                for stats in METRICS.snapshot()}
+    assert recorded == {
+        ('create_operation', 'add'): (1, 0),
+        ('create_operation', 'divide'): (1, 0),
+        ('create_operation', 'unknown'): (1, 1),
+        ('perform_operation', 'Add'): (1, 0),
+        ('perform_operation', 'Divide'): (1, 1),
+        ('add_to_history', 'Add'): (1, 0),
+        ('undo_last', ''): (1, 0),
+    }
+
+@pytest.mark.parametrize("value, enabled", [("True", True), ("False", False), (None, False)])
+def test_configure_metrics(monkeypatch, value, enabled):
+    """Test METRICS=True turns metrics on."""
+    if value is None:
+        monkeypatch.delenv("METRICS", raising=False)
+    else:
+        monkeypatch.setenv("METRICS", value)
+    configure_metrics()
+    assert METRICS.enabled is enabled
+
+def test_print_stats(capsys):
+    """Test the stats table has one line per series."""
+    metrics = Metrics()
+    metrics.print_stats()
+    assert capsys.readouterr().out == "No metrics recorded yet.\n"
+    metrics.observe('perform_operation', 'Add', 2e-6)
+    metrics.observe('undo_last', '', 2.0)
+    metrics.print_stats()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["Stage", "Operation", "Calls", "Errors", "Mean", "µs",
+                                "p50", "µs", "p99", "µs"]
+    assert lines[1].split() == ["perform_operation", "Add", "1", "0", "2.0", "2.5", "2.5"]
+    assert lines[2].split() == ["undo_last", "-", "1", "0", "2000000.0", ">1e6", ">1e6"]
@@ -0,0 +1,41 @@
+'''
+Tests the microbenchmark harness: timing, the JSON format
+and the slowdown gate against a baseline.
+'''
+
+from unittest.mock import MagicMock
+from benchmarks import micro
+from benchmarks.micro import BenchResult
+
+def test_measure_calls_function_until_min_time():
+    """Test every repeat runs for at least min_time and the median is per call."""
+    func = MagicMock()
+    result = micro.measure(func, repeat=3, min_time=0.001)
+    assert func.call_count == result.calls + 1  # One warm-up call
+    assert 0 < result.best <= result.median
+
+def test_measure_runs_setup_before_every_call():
+    """Test setup runs once per timed call."""
+    func, setup = MagicMock(), MagicMock()
+    result = micro.measure(func, setup, repeat=2, min_time=0.001)
+    assert setup.call_count == result.calls
+    assert func.call_count == result.calls + 1
+
+def test_save_and_load(tmp_path):
+    """Test results survive a JSON round trip."""
+    path = str(tmp_path / "results.json")
+    results = {"b": BenchResult(2e-6, 1e-6, 10), "a": BenchResult(3e-6, 2e-6, 20)}
+    micro.save(results, path)
+    assert micro.load(path) == results
+
+def test_compare():
+    """Test only benchmarks slower than the allowed ratio are reported."""
+    baseline = {"fast": BenchResult(1e-6, 1e-6, 1), "slow": BenchResult(1e-6, 1e-6, 1)}
+    results = {
+        "fast": BenchResult(1.4e-6, 1e-6, 1),
+        "slow": BenchResult(2e-6, 1e-6, 1),
+        "new": BenchResult(9.0, 9.0, 1),  # Not in the baseline
+    }
+    regressions = micro.compare(results, baseline, max_slowdown=1.5)
+    assert [regression.name for regression in regressions] == ["slow"]
+    assert regressions[0].ratio == 2.0
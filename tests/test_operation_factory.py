@@ -2,9 +2,12 @@
 Testing operation factory with parameterized tests
 '''
 
+from unittest.mock import patch, MagicMock
 import pytest
 from app.operation_factory import OperationFactory
-from app.operations import Add, Subtract, Multiply, Divide
+from app.operations import (
+    OPERATIONS, OperationTemplate, Add, Subtract, Multiply, Divide, Power, Modulo, IntegerDivide
+)
 
 @pytest.mark.parametrize("operation_name, expected_class", [
     ('add', Add),
@@ -28,3 +31,76 @@ def test_create_case_insensitive_operation():
     """Test creating operations with different cases."""
     operation = OperationFactory.create_operation('ADd')
     assert isinstance(operation, Add), "Expected an instance of Add."
+
+@pytest.mark.parametrize("operation_name, expected_class", [
+    ('power', Power),
+    ('modulo', Modulo),
+    ('intdivide', IntegerDivide),
+])
+def test_create_new_operations(operation_name, expected_class):
+    """Test the power, modulo and integer division operations are registered."""
+    assert isinstance(OperationFactory.create_operation(operation_name), expected_class)
+
+def test_shared_instances():
+    """Test the factory returns the same shared instance on every call."""
+    assert OperationFactory.create_operation('add') is OperationFactory.create_operation('ADD')
+
+def test_available_operations():
+    """Test every registered operation name is listed."""
+    assert OperationFactory.available_operations()[:4] == ['add', 'subtract', 'multiply', 'divide']
+
+@pytest.fixture
+def clean_registry():
+    """Remove operations registered by a test."""
+    before = dict(OPERATIONS)
+    yield
+    OPERATIONS.clear()
+    OPERATIONS.update(before)
+
+def test_register_operation(clean_registry):  # pylint: disable=unused-argument,redefined-outer-name
+    """Test a new operation can be registered without editing the factory."""
+    @OperationFactory.register_operation('hypot', opcode=100)
+    class Hypot(OperationTemplate):
+        '''Length of the hypotenuse.'''
+        def execute(self, a, b):
+            return (a ** 2 + b ** 2) ** 0.5
+
+        def __repr__(self):
+            return "Hypot"
+
+    operation = OperationFactory.create_operation('Hypot')
+    assert isinstance(operation, Hypot)
+    assert operation.opcode == 100
+    assert operation.calculate(3, 4) == 5
+
+@pytest.mark.parametrize("name, opcode, message", [
+    ('add', None, "Operation 'add' is already registered."),
+    ('new', 1, "Opcode 1 is already registered."),
+])
+def test_register_duplicate(clean_registry, name, opcode, message):  # pylint: disable=unused-argument,redefined-outer-name
+    """Test names and opcodes can only be registered once."""
+    with pytest.raises(ValueError, match=message):
+        @OperationFactory.register_operation(name, opcode=opcode)
+        class Duplicate(Add):  # pylint: disable=unused-variable
+            '''Duplicate operation.'''
+
+def test_entry_points_loaded_on_miss(clean_registry, monkeypatch):  # pylint: disable=unused-argument,redefined-outer-name
+    """Test entry points are loaded only when a name is missing, and only once."""
+    def load():
+        OperationFactory.register_operation('double')(type(
+            'Double', (Multiply,), {'execute': lambda self, a, b: 2 * a}
+        ))
+
+    entry_point = MagicMock(load=load)
+    entry_point.name = 'double'
+    broken = MagicMock(load=MagicMock(side_effect=ImportError))
+    monkeypatch.setattr(OperationFactory, '_entry_points_loaded', False)
+
+    with patch('importlib.metadata.entry_points', return_value=[broken, entry_point]) as mock_eps:
+        assert OperationFactory.create_operation('add').calculate(1, 1) == 2  # No lookup needed
+        mock_eps.assert_not_called()
+
+        assert OperationFactory.create_operation('double').calculate(4, 0) == 8
+        with pytest.raises(ValueError, match="Operation does not exist."):
+            OperationFactory.create_operation('triple')
+    mock_eps.assert_called_once_with(group='calculator.operations')
@@ -2,8 +2,12 @@
 Testing operations with parameterized tests
 '''
 
+import logging
+from array import array
+import numpy as np
 import pytest
-from app.operations import Add, Subtract, Multiply, Divide
+from app.config import set_log_sampling
+from app.operations import Add, Subtract, Multiply, Divide, Power, Modulo, IntegerDivide
 
 # Parameterized tests for addition
 @pytest.mark.parametrize("a, b, expected", [
@@ -85,6 +89,54 @@ def test_division(a, b, expected):
     else:
         assert operation.calculate(a, b) == expected
 
+# Parameterized tests for power
+@pytest.mark.parametrize("a, b, expected", [
+    (2, 3, 8),                 # positive numbers
+    (-2, 3, -8),               # negative base
+    (4, 0.5, 2.0),             # fractional exponent
+    (2, -1, 0.5),              # negative exponent
+    (0, 0, 1),                 # zero
+    ('abc', 2, ValueError),    # invalid input (string)
+    (None, 2, ValueError),     # invalid input (None)
+])
+def test_power(a, b, expected):
+    """Test the Power operation."""
+    operation = Power()
+    if expected is ValueError:
+        with pytest.raises(ValueError):
+            operation.calculate(a, b)
+    else:
+        assert operation.calculate(a, b) == expected
+
+@pytest.mark.parametrize("a, b, message", [
+    (0.0, -1.0, "Cannot divide by zero."),        # zero to a negative power
+    (10.0, 400.0, "Result is too large."),        # overflow
+    (-8.0, 1 / 3, "Result is not a real number."),  # complex result
+])
+def test_power_errors(a, b, message):
+    """Test Power raises a ValueError instead of returning invalid results."""
+    with pytest.raises(ValueError, match=message):
+        Power().calculate(a, b)
+
+# Parameterized tests for modulo and integer division
+@pytest.mark.parametrize("operation, a, b, expected", [
+    (Modulo(), 7, 3, 1),
+    (Modulo(), -7, 3, 2),        # same sign as the divisor
+    (Modulo(), 7.5, 2, 1.5),
+    (IntegerDivide(), 7, 2, 3),
+    (IntegerDivide(), -7, 2, -4),  # rounded down
+    (IntegerDivide(), 7.5, 2, 3.0),
+])
+def test_modulo_and_integer_division(operation, a, b, expected):
+    """Test the Modulo and IntegerDivide operations."""
+    assert operation.calculate(a, b) == expected
+
+@pytest.mark.parametrize("operation", [Modulo(), IntegerDivide()])
+def test_modulo_and_integer_division_by_zero(operation):
+    """Test Modulo and IntegerDivide raise a ValueError for a zero divisor."""
+    with pytest.raises(ValueError, match="Cannot divide by zero."):
+        operation.calculate(10, 0)
+
 # Test for division by zero
 def test_division_by_zero():
     """Test that dividing by zero raises a ValueError."""
@@ -100,8 +152,104 @@ def test_division_by_zero():
     (Add(), "Add"),
     (Subtract(), "Subtract"),
     (Multiply(), "Multiply"),
-    (Divide(), "Divide")
+    (Divide(), "Divide"),
+    (Power(), "Power"),
+    (Modulo(), "Modulo"),
+    (IntegerDivide(), "IntegerDivide"),
 ])
 def test_operation_repr(operation, expected_repr):
     """Test the __repr__ method for different operations."""
     assert repr(operation) == expected_repr
+
+# ------------------------------------------------------
+# Tests for the batch calculate_many method
+# ------------------------------------------------------
+
+@pytest.mark.parametrize("operation, expected", [
+    (Add(), [5.0, 1.0, -2.0]),
+    (Subtract(), [-1.0, 3.0, 0.0]),
+    (Multiply(), [6.0, -2.0, 1.0]),
+    (Divide(), [2 / 3, -2.0, 1.0]),
+    (Power(), [8.0, 0.5, -1.0]),
+    (Modulo(), [2.0, -0.0, -0.0]),
+    (IntegerDivide(), [0.0, -2.0, 1.0]),
+])
+def test_calculate_many(operation, expected):
+    """Test calculate_many returns the same results as calculate for every pair."""
+    a = np.array([2, 2, -1])
+    b = np.array([3.0, -1.0, -1.0])
+    result = operation.calculate_many(a, b)
+    assert isinstance(result, np.ndarray)
+    assert result.dtype == np.float64
+    np.testing.assert_allclose(result, expected)
+    assert list(result) == [operation.calculate(float(x), float(y)) for x, y in zip(a, b)]
+
+def test_calculate_many_buffer_protocol():
+    """Test calculate_many accepts buffer-protocol sequences like array.array."""
+    result = Add().calculate_many(array('d', [1.0, 2.0]), array('d', [3.0, 4.0]))
+    np.testing.assert_array_equal(result, [4.0, 6.0])
+
+def test_calculate_many_logs_once(caplog):
+    """Test one summary is logged for the whole batch."""
+    with caplog.at_level(logging.INFO):
+        Multiply().calculate_many(np.arange(1000), np.arange(1000))
+    assert len(caplog.records) == 1
+    assert "1000 pairs" in caplog.records[0].getMessage()
+
+@pytest.mark.parametrize("a, b, message", [
+    (['abc', 'def'], [1, 2], "Both inputs must be numbers."),
+    ([True, False], [1, 2], "Both inputs must be numbers."),
+    ([None, 1], [1, 2], "Both inputs must be numbers."),
+    ([[1, 2], [3]], [1, 2], "Both inputs must be numbers."),
+    ([1, 2, 3], [1, 2], "Both inputs must have the same shape."),
+])
+def test_calculate_many_invalid_input(a, b, message):
+    """Test the batch is rejected when validation fails."""
+    with pytest.raises(ValueError, match=message):
+        Add().calculate_many(a, b)
+
+def test_calculate_many_unknown_policy():
+    """Test an unknown zero division policy raises a ValueError."""
+    with pytest.raises(ValueError, match="Unknown zero division policy"):
+        Divide().calculate_many([1], [1], zero_division='ignore')
+
+@pytest.mark.parametrize("operation", [Divide(), Modulo(), IntegerDivide()])
+def test_calculate_many_division_by_zero_raise(operation):
+    """Test the default policy raises a ValueError when any divisor is zero."""
+    with pytest.raises(ValueError, match="Cannot divide by zero."):
+        operation.calculate_many([1.0, 2.0], [1.0, 0.0])
+
+@pytest.mark.parametrize("operation, expected", [
+    (Divide(), [0.5, np.nan, 1.0]),
+    (Modulo(), [1.0, np.nan, 0.0]),
+    (IntegerDivide(), [0.0, np.nan, 1.0]),
+])
+def test_calculate_many_division_by_zero_nan(operation, expected):
+    """Test the 'nan' policy fills NaN only where the divisor is zero."""
+    result = operation.calculate_many([1.0, 2.0, 3.0], [2.0, 0.0, 3.0], zero_division='nan')
+    np.testing.assert_array_equal(result, expected)
+
+def test_calculate_many_division_by_zero_mask():
+    """Test the 'mask' policy masks only the pairs dividing by zero."""
+    result = Divide().calculate_many([1.0, 2.0, 3.0], [2.0, 0.0, 3.0], zero_division='mask')
+    assert isinstance(result, np.ma.MaskedArray)
+    assert list(result.mask) == [False, True, False]
+    assert result.compressed().tolist() == [0.5, 1.0]
+
+def test_log_result_is_sampled_per_operation(caplog):
+    """Test 1 in N successes is logged per operation, and every error is logged."""
+    set_log_sampling(2)
+    try:
+        with caplog.at_level(logging.INFO):
+            for _ in range(4):
+                Multiply().calculate(2.0, 2.0)
+                Subtract().calculate(2.0, 2.0)
+            for _ in range(3):
+                with pytest.raises(ValueError):
+                    Divide().calculate(1.0, 0.0)
+    finally:
+        set_log_sampling(1)
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages.count("Operation performed: 2.0 and 2.0 -> Result: 4.0") == 2
+    assert messages.count("Operation performed: 2.0 and 2.0 -> Result: 0.0") == 2
+    assert messages.count("Attempted to divide by zero.") == 3
@@ -0,0 +1,130 @@
+'''
+Tests the parallel batch mode.
+Checks chunks end on line boundaries and the merged output, errors
+and history match the single-process batch mode.
+'''
+
+import io
+from unittest.mock import patch, MagicMock
+import pytest
+
+import main
+from app.batch import read_commands, run_batch
+from app.parallel import chunk_ranges, count_lines, evaluate_chunk, run_parallel, parallel_batch
+
+@pytest.fixture(autouse=True)
+def set_test_mode(monkeypatch):
+    """Fixture to set TEST_MODE to 'True' during tests."""
+    monkeypatch.setenv("TEST_MODE", "True")
+
+COMMANDS = [
+    "add 1 2", "", "divide 1 0", "multiply 3 3", "root 2 2", "subtract 10 4",
+    "power 2 8", "add x 1", "   ", "modulo 7 4", "intdivide 9 2",
+] * 40
+
+@pytest.fixture(name="commands_file")
+def fixture_commands_file(tmp_path):
+    """Writes the test commands to a file."""
+    path = tmp_path / "commands.txt"
+    path.write_text("\n".join(COMMANDS) + "\n", encoding='utf-8')
+    return path
+
+def run_serial(lines):
+    """Runs the single-process batch mode and returns (output, errors, history rows)."""
+    output, errors, history = io.StringIO(), io.StringIO(), MagicMock()
+    failed = run_batch(read_commands(lines), output, errors, history)
+    rows = [(repr(c.args[0]),) + c.args[1:] for c in history.add_to_history.call_args_list]
+    return failed, output.getvalue(), errors.getvalue(), rows
+
+def run_parallel_file(path, **kwargs):
+    """Runs the parallel batch mode and returns (output, errors, history rows)."""
+    output, errors, history = io.StringIO(), io.StringIO(), MagicMock()
+    failed = run_parallel(str(path), output, errors, history, **kwargs)
+    rows = [(repr(c.args[0]),) + c.args[1:] for c in history.add_to_history.call_args_list]
+    return failed, output.getvalue(), errors.getvalue(), rows
+
+def test_chunk_ranges_end_on_lines(commands_file):
+    """Test chunks cover the whole file and end right after a newline."""
+    data = commands_file.read_bytes()
+    ranges = chunk_ranges(str(commands_file), chunk_size=50)
+    assert len(ranges) > 10
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[end - 1:end] == b"\n"
+
+def test_chunk_ranges_empty_file(tmp_path):
+    """Test an empty file has no chunks."""
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert chunk_ranges(str(path)) == []
+
+@pytest.mark.parametrize("data, expected", [
+    (b"", 0),
+    (b"add 1 2", 1),
+    (b"add 1 2\n", 1),
+    (b"a\r\nb\rc\n\n", 4),
+])
+def test_count_lines(data, expected):
+    """Test lines are counted like text mode reads them."""
+    assert count_lines(data) == expected
+    assert count_lines(data) == len(io.StringIO(data.decode(), newline=None).readlines())
+
+def test_evaluate_chunk(commands_file):
+    """Test a worker evaluates its own byte range with chunk-relative line numbers."""
+    start = len(b"add 1 2\n\n")
+    chunk = evaluate_chunk(str(commands_file), start, start + len(b"divide 1 0\nmultiply 3 3\n"))
+    assert chunk.output == "9.0\n"
+    assert chunk.errors == [(1, "Cannot divide by zero.")]
+    assert chunk.rows == [("multiply", 3.0, 3.0, 9.0)]
+    assert (chunk.lines, chunk.stopped) == (2, False)
+
+@pytest.mark.parametrize("chunk_size, workers", [(1 << 20, 1), (64, 2), (7, 3)])
+def test_parallel_matches_serial(commands_file, chunk_size, workers):
+    """Test results, error line numbers and history are merged in input order."""
+    expected = run_serial(COMMANDS)
+    assert run_parallel_file(commands_file, workers=workers, chunk_size=chunk_size) == expected
+
+def test_parallel_crlf(tmp_path):
+    """Test Windows line endings are numbered like in the batch mode."""
+    path = tmp_path / "commands.txt"
+    path.write_bytes(b"add 1 1\r\n\r\ndivide 1 0\r\nadd 2 2\r\n")
+    _, output, errors, _ = run_parallel_file(path, workers=2, chunk_size=4)
+    assert output == "2.0\n4.0\n"
+    assert errors == "line 3: Cannot divide by zero.\n"
+
+def test_parallel_stops_at_exit(tmp_path):
+    """Test nothing after 'exit' is evaluated or recorded."""
+    path = tmp_path / "commands.txt"
+    path.write_text("add 1 1\nadd 2 2\nexit\nadd 3 3\ndivide 1 0\n" * 20, encoding='utf-8')
+    failed, output, errors, rows = run_parallel_file(path, workers=2, chunk_size=8)
+    assert (failed, output, errors) == (0, "2.0\n4.0\n", "")
+    assert len(rows) == 2
+
+def test_parallel_batch_from_file(commands_file, capfd):
+    """Test the parallel batch mode writes results to stdout and errors to stderr."""
+    failed = parallel_batch(str(commands_file), workers=2, record_history=False, chunk_size=64)
+    out, err = capfd.readouterr()
+    _, expected_out, expected_err, _ = run_serial(COMMANDS)
+    assert failed == 3 * 40
+    assert (out, err) == (expected_out, expected_err)
+
+def test_parallel_batch_rejects_stdin():
+    """Test stdin cannot be split into byte ranges."""
+    with pytest.raises(ValueError, match="needs a file"):
+        parallel_batch('-')
+
+@pytest.mark.parametrize("argv, workers", [
+    (['--batch', 'commands.txt', '--workers', '4'], 4),
+    (['--batch', 'commands.txt', '--workers', '0'], None),
+])
+def test_main_workers(argv, workers):
+    """Test --workers starts the parallel batch mode (0 uses every core)."""
+    with patch('app.parallel.parallel_batch', return_value=0) as mock_parallel:
+        assert main.main(argv) == 0
+    mock_parallel.assert_called_once_with('commands.txt', workers, record_history=True)
+
+def test_main_workers_stdin():
+    """Test --workers with stdin is a usage error."""
+    with pytest.raises(SystemExit):
+        main.main(['--batch', '-', '--workers', '2'])
@@ -0,0 +1,130 @@
+'''
+Tests the result memoization cache: LRU and LFU eviction,
+the hit/miss/eviction counters and turning the cache on and off.
+'''
+
+import logging
+from unittest.mock import MagicMock
+import pytest
+from app import result_cache
+from app.result_cache import ResultCache, cached_calculate, configure_cache
+from app.operations import Add, Divide
+
+def fill(cache, *keys):
+    """Looks up every key, computing the key itself on a miss."""
+    for key in keys:
+        cache.get(key, lambda key=key: key)
+
+def test_hits_and_misses():
+    """Test a repeated key is computed once and counted as a hit."""
+    cache = ResultCache(maxsize=4)
+    compute = MagicMock(return_value=5.0)
+    assert cache.get('a', compute) == 5.0
+    assert cache.get('a', compute) == 5.0
+    compute.assert_called_once()
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 1, 0, 1)
+    assert stats.hit_rate == 0.5
+
+def test_lru_eviction():
+    """Test LRU drops the least recently used key."""
+    cache = ResultCache(maxsize=2, policy='lru')
+    fill(cache, 'a', 'b', 'a', 'c')  # 'b' is the least recently used
+    assert cache.stats().evictions == 1
+    fill(cache, 'a')
+    assert cache.stats().hits == 2
+    fill(cache, 'b')
+    assert cache.stats().misses == 4
+
+def test_lfu_eviction():
+    """Test LFU drops the least frequently used key, the oldest one on ties."""
+    cache = ResultCache(maxsize=3, policy='lfu')
+    fill(cache, 'a', 'a', 'a', 'b', 'b', 'c', 'd')  # 'c' is used least
+    fill(cache, 'a', 'b', 'd')
+    assert cache.stats()[:3] == (6, 4, 1)
+    fill(cache, 'e')  # 'd' has the fewest uses (2) and is dropped
+    fill(cache, 'b', 'a')
+    assert cache.stats().evictions == 2
+    assert cache.stats().hits == 8
+    assert len(cache) == 3
+
+def test_lfu_ties_evict_oldest():
+    """Test keys with the same use count are evicted oldest first."""
+    cache = ResultCache(maxsize=2, policy='lfu')
+    fill(cache, 'a', 'b', 'c')
+    fill(cache, 'b')
+    assert cache.stats().hits == 1
+    fill(cache, 'a')
+    assert cache.stats().misses == 4
+
+def test_errors_are_not_cached():
+    """Test a failed calculation is computed again next time."""
+    cache = ResultCache()
+    compute = MagicMock(side_effect=ValueError("Cannot divide by zero."))
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.get('a', compute)
+    assert compute.call_count == 2
+    assert len(cache) == 0
+
+def test_clear():
+    """Test clear drops every result and resets the counters."""
+    cache = ResultCache(policy='lfu')
+    fill(cache, 'a', 'a', 'b')
+    cache.clear()
+    assert cache.stats() == (0, 0, 0, 0, 1024, 'lfu')
+    fill(cache, 'a')
+    assert cache.stats().misses == 1
+
+@pytest.mark.parametrize("maxsize, policy, message", [
+    (0, 'lru', "Cache size must be at least 1."),
+    (8, 'fifo', "Unknown cache policy: fifo."),
+])
+def test_invalid_cache(maxsize, policy, message):
+    """Test invalid sizes and policies raise a ValueError."""
+    with pytest.raises(ValueError, match=message):
+        ResultCache(maxsize, policy)
+
+def test_cached_calculate_skips_logging(caplog):
+    """Test a cache hit skips validation, execution and logging."""
+    result_cache.enable_cache(maxsize=8)
+    with caplog.at_level(logging.INFO):
+        assert cached_calculate(Divide(), 6.0, 3.0) == 2.0
+        caplog.clear()
+        assert cached_calculate(Divide(), 6.0, 3.0) == 2.0
+    assert not caplog.records
+
+def test_cached_calculate_keeps_types_apart():
+    """Test 1 and 1.0, 0.0 and -0.0 use different cache entries."""
+    cache = result_cache.enable_cache(maxsize=8)
+    assert repr(cached_calculate(Add(), 1, 2)) == "3"
+    assert repr(cached_calculate(Add(), 1.0, 2.0)) == "3.0"
+    assert repr(cached_calculate(Add(), -0.0, -0.0)) == "-0.0"
+    assert repr(cached_calculate(Add(), 0.0, 0.0)) == "0.0"
+    assert cache.stats().hits == 0
+
+def test_cached_calculate_off_by_default():
+    """Test calculations are not cached until the cache is turned on."""
+    assert result_cache.get_cache() is None
+    assert cached_calculate(Add(), 1.0, 2.0) == 3.0
+    assert result_cache.get_cache() is None
+
+@pytest.mark.parametrize("size, policy, expected", [
+    (None, None, None),
+    ("0", None, None),
+    ("64", None, (64, 'lru')),
+    ("16", "LFU", (16, 'lfu')),
+])
+def test_configure_cache(monkeypatch, size, policy, expected):
+    """Test RESULT_CACHE_SIZE and RESULT_CACHE_POLICY turn the cache on."""
+    for name, value in (("RESULT_CACHE_SIZE", size), ("RESULT_CACHE_POLICY", policy)):
+        if value is None:
+            monkeypatch.delenv(name, raising=False)
+        else:
+            monkeypatch.setenv(name, value)
+    cache = configure_cache()
+    if expected is None:
+        assert cache is None and result_cache.get_cache() is None
+    else:
+        assert (cache.maxsize, cache.policy) == expected
+        assert result_cache.get_cache() is cache
@@ -0,0 +1,106 @@
+"""
+Tests for the segmented storage backend: rotation at the size limit,
+compressed sealed segments, undo and tail across segments, and
+streaming every record in order.
+"""
+
+import gzip
+import lzma
+import os
+import pytest
+from app.segmented_storage import SegmentedStorage
+
+# Each record is one short CSV row, so a 60 byte limit rotates every couple of rows
+RECORDS = [("Add", float(i), 1.0, float(i + 1)) for i in range(10)]
+
+@pytest.fixture(name="storage", params=["gzip", "lzma"])
+def fixture_storage(request, tmp_path):
+    """Segmented storage that rotates after about two records."""
+    backend = SegmentedStorage(str(tmp_path / "segments"), segment_size=60,
+                               compression=request.param)
+    yield backend
+    backend.close()
+
+def test_rotation_and_compression(storage):
+    """Test full segments are sealed and compressed, and only the last one is plain."""
+    for record in RECORDS:
+        storage.append(record)
+    segments = storage.segments()
+    assert len(segments) > 3
+    extension = '.gz' if storage.compression == 'gzip' else '.xz'
+    assert all(path.endswith(f".csv{extension}") for path in segments[:-1])
+    assert segments[-1].endswith(".csv")
+    assert os.path.getsize(segments[-1]) < 60 + 30  # Active segment stays small
+
+    opener = gzip.open if storage.compression == 'gzip' else lzma.open
+    with opener(segments[0], mode='rt', encoding='utf-8') as file:
+        assert file.readline().strip() == "Operation,Operand #1,Operand #2,Result"
+
+def test_iter_records_across_segments(storage):
+    """Test every record streams back in order across sealed and active segments."""
+    for record in RECORDS:
+        storage.append(record)
+    assert list(storage.iter_records()) == RECORDS
+
+@pytest.mark.parametrize("count, skip", [(3, 0), (5, 2), (10, 0), (20, 3), (2, 9), (1, 10)])
+def test_tail_across_segments(storage, count, skip):
+    """Test tail reaches into sealed segments when the active one is too short."""
+    for record in RECORDS:
+        storage.append(record)
+    end = len(RECORDS) - skip
+    assert storage.tail(count, skip) == RECORDS[max(0, end - count):max(0, end)]
+
+def test_pop_across_segments(storage):
+    """Test undo unseals older segments once the active one is empty."""
+    for record in RECORDS:
+        storage.append(record)
+    for record in reversed(RECORDS[4:]):
+        assert storage.pop() == record
+    assert list(storage.iter_records()) == RECORDS[:4]
+
+    storage.append(("Subtract", 9.0, 9.0, 0.0))
+    assert storage.tail(2) == [RECORDS[3], ("Subtract", 9.0, 9.0, 0.0)]
+
+    while storage.pop() is not None:
+        pass
+    assert storage.segments() == [os.path.join(storage.filename, "000001.csv")]
+
+def test_reopen_keeps_segments(storage):
+    """Test a reopened directory continues with the same active segment."""
+    for record in RECORDS:
+        storage.append(record)
+    segments = storage.segments()
+    storage.close()
+
+    reopened = SegmentedStorage(storage.filename, segment_size=60)
+    assert reopened.segments() == segments
+    reopened.append(("Multiply", 2.0, 2.0, 4.0))
+    assert list(reopened.iter_records()) == RECORDS + [("Multiply", 2.0, 2.0, 4.0)]
+
+def test_interrupted_rotation(tmp_path):
+    """Test a segment left both plain and sealed keeps only the sealed copy."""
+    storage = SegmentedStorage(str(tmp_path / "segments"), segment_size=60)
+    for record in RECORDS[:3]:
+        storage.append(record)
+    storage.close()
+
+    # Put back a plain copy of the first sealed segment, as if rotation stopped half way
+    sealed = storage.segments()[0]
+    with gzip.open(sealed, mode='rb') as packed, open(sealed[:-3], mode='wb') as plain:
+        plain.write(packed.read())
+
+    reopened = SegmentedStorage(storage.filename, segment_size=60)
+    assert not os.path.exists(sealed[:-3])
+    assert list(reopened.iter_records()) == RECORDS[:3]
+
+def test_environment_settings(tmp_path, monkeypatch):
+    """Test segment size and compression can come from the environment."""
+    monkeypatch.setenv("HISTORY_SEGMENT_SIZE", "123")
+    monkeypatch.setenv("HISTORY_COMPRESSION", "LZMA")
+    storage = SegmentedStorage(str(tmp_path / "segments"))
+    assert (storage.segment_size, storage.compression) == (123, 'lzma')
+
+def test_unknown_compression(tmp_path):
+    """Test an unknown compression raises a ValueError."""
+    with pytest.raises(ValueError, match="Unknown compression: zip."):
+        SegmentedStorage(str(tmp_path / "segments"), compression="zip")
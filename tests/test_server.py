@@ -0,0 +1,159 @@
+'''
+Tests the asyncio calculator server.
+Checks the line protocol, pipelined requests, many concurrent
+clients and that calculations are recorded in history.
+'''
+
+import asyncio
+from unittest.mock import patch, MagicMock
+import pytest
+
+import main
+from app.operations import Add, Divide
+from app.server import CalculatorServer, parse_address, serve
+from app import server as server_module
+
+@pytest.fixture(autouse=True)
+def set_test_mode(monkeypatch):
+    """Fixture to set TEST_MODE to 'True' during tests."""
+    monkeypatch.setenv("TEST_MODE", "True")
+
+async def exchange(listener_start, payload: bytes) -> list:
+    """Connects one client, writes 'payload' at once and reads every response line."""
+    reader, writer = await listener_start()
+    writer.write(payload)
+    await writer.drain()
+    writer.write_eof()
+    lines = (await reader.read()).decode().splitlines()
+    writer.close()
+    await writer.wait_closed()
+    return lines
+
+def run_unix(tmp_path, calculator_server, client):
+    """Starts the server on a Unix socket and runs 'client(connect)' against it."""
+    path = str(tmp_path / "calc.sock")
+
+    async def scenario():
+        listener = await calculator_server.start_unix(path)
+        async with listener:
+            return await client(lambda: asyncio.open_unix_connection(path))
+    return asyncio.run(scenario())
+
+def test_handle_command():
+    """Test requests use the REPL grammar and answer 'ok' or 'error'."""
+    calculator_server = CalculatorServer()
+    variables = {}
+    assert calculator_server.handle_command("add 1 2", variables) == "ok 3.0"
+    assert calculator_server.handle_command("eval ans * 2", variables) == "ok 6.0"
+    assert calculator_server.handle_command("divide 1 0", variables) == "error Cannot divide by zero."
+    assert calculator_server.handle_command("root 1 2", variables) == (
+        "error Operation does not exist."
+    )
+    assert calculator_server.handle_command("eval", variables).startswith("error")
+    assert variables == {'ans': 6.0}
+
+def test_pipelined_requests(tmp_path):
+    """Test many requests written at once are answered in order."""
+    payload = b"add 1 2\ndivide 1 0\n\nmultiply 3 3\neval ans + 1\n" * 500
+    lines = run_unix(tmp_path, CalculatorServer(), lambda connect: exchange(connect, payload))
+    assert lines == ["ok 3.0", "error Cannot divide by zero.", "ok 9.0", "ok 10.0"] * 500
+
+def test_quit_closes_connection(tmp_path):
+    """Test 'quit' closes the connection and later requests are ignored."""
+    lines = run_unix(tmp_path, CalculatorServer(),
+                     lambda connect: exchange(connect, b"add 1 1\nQUIT\nadd 2 2\n"))
+    assert lines == ["ok 2.0"]
+
+def test_line_too_long(tmp_path):
+    """Test a line over the limit is rejected and the connection closed."""
+    with patch.object(server_module, 'MAX_LINE_BYTES', 32):
+        calculator_server = CalculatorServer()
+        lines = run_unix(tmp_path, calculator_server,
+                         lambda connect: exchange(connect, b"add 1 1\n" + b"9" * 100 + b"\n"))
+    assert lines == ["ok 2.0", "error Line is too long."]
+
+def test_concurrent_clients(tmp_path):
+    """Test many clients connected at the same time each get their own answers and 'ans'."""
+    calculator_server = CalculatorServer()
+    clients = 300
+
+    async def client(connect):
+        async def one(number):
+            reader, writer = await connect()
+            writer.write(f"add {number} 0\neval ans * 2\n".encode())
+            await writer.drain()
+            lines = [(await reader.readline()).decode().strip() for _ in range(2)]
+            writer.close()
+            await writer.wait_closed()
+            return lines
+
+        peak = 0
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, calculator_server.connections)
+                await asyncio.sleep(0)
+
+        watcher = asyncio.create_task(watch())
+        results = await asyncio.gather(*(one(number) for number in range(clients)))
+        watcher.cancel()
+        return results, peak
+
+    results, peak = run_unix(tmp_path, calculator_server, client)
+    assert results == [[f"ok {n}.0", f"ok {2 * n}.0"] for n in range(clients)]
+    assert peak > 1
+    assert calculator_server.connections == 0
+
+def test_tcp_records_history():
+    """Test the TCP server records calculations in history."""
+    history = MagicMock()
+    calculator_server = CalculatorServer(history)
+
+    async def scenario():
+        listener = await calculator_server.start_tcp('127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return await exchange(lambda: asyncio.open_connection('127.0.0.1', port),
+                                  b"add 1 2\ndivide 1 0\neval 8 / 2\neval 5\n")
+
+    assert asyncio.run(scenario()) == [
+        "ok 3.0", "error Cannot divide by zero.", "ok 4.0", "ok 5.0"
+    ]
+    recorded = history.add_to_history.call_args_list
+    assert len(recorded) == 2  # Errors and single values are not recorded
+    assert isinstance(recorded[0].args[0], Add)
+    assert isinstance(recorded[1].args[0], Divide)
+    assert recorded[1].args[1:] == (8.0, 2.0, 4.0)
+
+@pytest.mark.parametrize("address, expected", [
+    ("8765", ('127.0.0.1', 8765)),
+    ("0.0.0.0:9000", ('0.0.0.0', 9000)),
+    ("[::1]:9000", ('::1', 9000)),
+])
+def test_parse_address(address, expected):
+    """Test '[host:]port' addresses are parsed."""
+    assert parse_address(address) == expected
+
+def test_parse_address_invalid():
+    """Test an address without a port raises a ValueError."""
+    with pytest.raises(ValueError, match="Usage"):
+        parse_address("localhost")
+
+def test_serve_closes_history():
+    """Test serve stops on Ctrl+C and closes the history."""
+    with patch('app.server.History') as mock_history, \
+         patch('app.server.asyncio.run', side_effect=KeyboardInterrupt) as mock_run:
+        serve(path="calc.sock")
+    mock_history.assert_called_once_with(write_behind=True)
+    mock_history.return_value.close.assert_called_once()
+    mock_run.call_args.args[0].close()  # Discard the coroutine that never ran
+
+@pytest.mark.parametrize("argv, expected", [
+    (['--serve', '9000'], (('9000', None), {'record_history': True})),
+    (['--unix', 'calc.sock', '--no-history'], ((None, 'calc.sock'), {'record_history': False})),
+])
+def test_main_serve(argv, expected):
+    """Test main starts the server for --serve and --unix."""
+    with patch('app.server.serve') as mock_serve:
+        assert main.main(argv) == 0
+    assert (mock_serve.call_args.args, mock_serve.call_args.kwargs) == expected
@@ -0,0 +1,82 @@
+"""
+Tests for the SQLite history backend. The shared append, pop and
+tail tests are in test_storage.py; these check the database setup,
+sessions and the query API.
+"""
+
+import sqlite3
+import pytest
+from app.sqlite_storage import SqliteStorage
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Path of a temporary database."""
+    return str(tmp_path / "history.db")
+
+
+def test_wal_and_indexes(database):
+    """Test the database uses WAL journaling and has the query indexes."""
+    storage = SqliteStorage(database)
+    storage.close()
+
+    connection = sqlite3.connect(database)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list(history)")}
+    assert {"history_operation", "history_session", "history_result"} <= indexes
+    plan = connection.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM history WHERE operation = 'Divide'"
+    ).fetchall()
+    assert "history_operation" in str(plan)
+    connection.close()
+
+
+def test_append_many_single_transaction(database):
+    """Test a group of records is inserted in one transaction."""
+    storage = SqliteStorage(database)
+    statements = []
+    storage._connection.set_trace_callback(statements.append)  # pylint: disable=protected-access
+
+    storage.append_many([("Add", float(i), 1.0, i + 1.0) for i in range(100)])
+
+    assert sum(s.startswith("BEGIN") for s in statements) == 1
+    assert statements.count("COMMIT") == 1
+    assert len(storage) == 100
+    storage.close()
+
+
+def test_query(database):
+    """Test filtering by operation, session and result range."""
+    first = SqliteStorage(database, session="first")
+    second = SqliteStorage(database, session="second")
+    first.append_many([("Add", 1.0, 2.0, 3.0), ("Divide", 9.0, 3.0, 3.0)])
+    second.append_many([("Divide", 8.0, 2.0, 4.0), ("Multiply", 5.0, 5.0, 25.0)])
+
+    assert first.query(operation="Divide") == [
+        ("Divide", 9.0, 3.0, 3.0), ("Divide", 8.0, 2.0, 4.0)
+    ]
+    assert first.query(operation="Divide", session="second") == [("Divide", 8.0, 2.0, 4.0)]
+    assert first.query(min_result=3.5, max_result=30) == [
+        ("Divide", 8.0, 2.0, 4.0), ("Multiply", 5.0, 5.0, 25.0)
+    ]
+    assert first.query(session="first", limit=1) == [("Add", 1.0, 2.0, 3.0)]
+    assert len(first.query()) == 4
+    first.close()
+    second.close()
+
+
+def test_new_session_per_storage(database):
+    """Test each storage gets its own session id unless one is given."""
+    first, second = SqliteStorage(database), SqliteStorage(database)
+    assert first.session != second.session
+    first.close()
+    second.close()
+
+
+def test_reconnect_after_close(database):
+    """Test the storage reopens the database when used after close."""
+    storage = SqliteStorage(database)
+    storage.close()
+    storage.append(("Add", 1.0, 1.0, 2.0))
+    assert storage.tail(1) == [("Add", 1.0, 1.0, 2.0)]
+    storage.close()
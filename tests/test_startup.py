@@ -0,0 +1,46 @@
+'''
+Startup regression tests. Checks the calculator starts without
+importing heavy modules and tests the startup benchmark's parsing.
+'''
+
+import json
+from unittest.mock import patch
+from benchmarks import startup
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        900 |     app.operations
+import time:      1000 |       2500 | main
+"""
+
+def test_parse_importtime():
+    """Test '-X importtime' lines are parsed into module timings."""
+    assert startup.parse_importtime(IMPORTTIME_OUTPUT) == [
+        ("_io", 120, 120),
+        ("app.operations", 300, 900),
+        ("main", 1000, 2500),
+    ]
+
+def test_no_heavy_imports_at_startup():
+    """Test starting the calculator does not import pandas, numpy or sqlite3."""
+    timings = startup.measure_imports('main', runs=1)
+    assert 'app.calculator' in timings
+    assert not [name for name in startup.HEAVY_MODULES if name in timings]
+
+def test_benchmark_report(tmp_path, capsys):
+    """Test the benchmark prints a report and saves JSON."""
+    timings = {"main": (1000, 2500), "app.operations": (300, 900)}
+    output = tmp_path / "startup.json"
+    with patch.object(startup, 'measure_imports', return_value=timings):
+        assert startup.main(['--json', str(output)]) == 0
+    assert "Total import time of main: 2.50 ms" in capsys.readouterr().out
+    assert json.loads(output.read_text(encoding='utf-8'))['total_ms'] == 2.5
+
+def test_benchmark_regressions(capsys):
+    """Test the benchmark fails when too slow or when a heavy module is imported."""
+    timings = {"main": (1000, 250000), "pandas": (500, 200000)}
+    with patch.object(startup, 'measure_imports', return_value=timings):
+        assert startup.main(['--max-ms', '100']) == 1
+    out = capsys.readouterr().out
+    assert "heavy modules imported at startup: pandas" in out
+    assert "startup took 250.00 ms, limit is 100.00 ms" in out
@@ -0,0 +1,236 @@
+"""
+Tests for the history storage backends. Every backend is run through
+the same append, pop and tail tests. Binary specific tests check the
+fixed-width layout and zero-copy loading.
+"""
+
+import multiprocessing
+import os
+from unittest.mock import patch
+import numpy as np
+import pytest
+from app.storage import (
+    StorageFactory, CsvStorage, BinaryStorage, MAGIC, RECORD_FORMAT
+)
+from app.sqlite_storage import SqliteStorage
+from app.segmented_storage import SegmentedStorage
+
+RECORDS = [
+    ("Add", 1.0, 2.0, 3.0),
+    ("Subtract", 5.0, 3.0, 2.0),
+    ("Multiply", 3.0, 4.0, 12.0),
+    ("Divide", 1.0, 3.0, 1 / 3),
+]
+
+
+@pytest.fixture(params=["csv", "binary", "sqlite", "segmented"])
+def storage(request, tmp_path):
+    """Create an empty storage backend of each kind."""
+    backend = StorageFactory.create_storage(request.param, str(tmp_path / "history"))
+    yield backend
+    backend.close()
+
+
+def test_append_and_tail(storage):
+    """Test records come back from tail in the order they were appended."""
+    storage.append(RECORDS[0])
+    storage.append_many(RECORDS[1:])
+    assert storage.tail(10) == RECORDS
+    assert storage.tail(2) == RECORDS[2:]
+
+
+@pytest.mark.parametrize("count, skip, expected", [
+    (2, 1, RECORDS[1:3]),
+    (10, 3, RECORDS[:1]),
+    (1, 4, []),
+    (1, 10, []),
+])
+def test_tail_skip(storage, count, skip, expected):
+    """Test tail skips the most recent records."""
+    storage.append_many(RECORDS)
+    with patch('app.storage.SCAN_BLOCK_SIZE', 8):
+        assert storage.tail(count, skip) == expected
+
+
+def test_pop(storage):
+    """Test pop removes and returns records from the end until none are left."""
+    storage.append_many(RECORDS)
+    for record in reversed(RECORDS):
+        assert storage.pop() == record
+    assert storage.pop() is None
+    assert storage.tail(10) == []
+
+
+def test_iter_records(storage):
+    """Test iter_records streams every record, oldest first."""
+    assert not list(storage.iter_records())
+    storage.append_many(RECORDS)
+    storage.pop()
+    assert list(storage.iter_records()) == RECORDS[:-1]
+
+
+def test_append_after_pop(storage):
+    """Test appending after a pop continues at the new end."""
+    storage.append_many(RECORDS[:2])
+    storage.pop()
+    storage.append(RECORDS[2])
+    assert storage.tail(10) == [RECORDS[0], RECORDS[2]]
+
+
+def test_reopen(storage):
+    """Test records are kept when the file is opened again."""
+    storage.append_many(RECORDS)
+    storage.close()
+    reopened = type(storage)(storage.filename)
+    assert reopened.tail(10) == RECORDS
+
+
+@pytest.fixture(name="shared", params=["csv", "binary", "sqlite"])
+def fixture_shared(request, tmp_path):
+    """Two storages on one file, standing in for two processes sharing it."""
+    filename = str(tmp_path / "history")
+    first = StorageFactory.create_storage(request.param, filename)
+    second = StorageFactory.create_storage(request.param, filename)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_pop_only_own_records(shared):
+    """Test pop removes the caller's own records, even with others' records after them."""
+    first, second = shared
+    first.append(RECORDS[0])
+    second.append(RECORDS[1])
+    first.append(RECORDS[2])
+    second.append(RECORDS[3])
+
+    assert first.pop() == RECORDS[2]
+    assert first.tail(10) == [RECORDS[0], RECORDS[1], RECORDS[3]]
+    assert second.pop() == RECORDS[3]
+    assert second.pop() == RECORDS[1]
+    assert first.pop() == RECORDS[0]
+    assert first.tail(10) == []
+
+
+def test_pop_after_earlier_record_removed(shared):
+    """Test an own record is still found after another process removed one before it."""
+    first, second = shared
+    second.append(RECORDS[0])
+    first.append_many(RECORDS[1:3])
+    second.append(RECORDS[3])
+
+    with patch('app.storage.SCAN_BLOCK_SIZE', 4):
+        assert second.pop() == RECORDS[3]
+        assert second.pop() == RECORDS[0]  # Moves the first storage's records back
+        assert first.pop() == RECORDS[2]
+    assert first.tail(10) == [RECORDS[1]]
+
+
+def test_pop_removed_elsewhere(tmp_path):
+    """Test pop returns None if the own record was removed by someone else."""
+    storage = CsvStorage(str(tmp_path / "history.csv"))
+    storage.append(RECORDS[0])
+    with open(storage.filename, "w", encoding="utf-8") as file:
+        file.write("Operation,Operand #1,Operand #2,Result\n")
+    assert storage.pop() is None
+
+
+def write_records(kind, filename, worker, count):
+    """Process target: appends 'count' records in groups and undoes every fifth group."""
+    storage = StorageFactory.create_storage(kind, filename)
+    for index in range(count):
+        group = [("Add", float(worker), float(index), float(part)) for part in range(4)]
+        storage.append_many(group)
+        if index % 5 == 4:
+            assert storage.pop() == group[-1]
+    storage.close()
+
+
+@pytest.mark.parametrize("kind", ["csv", "binary"])
+def test_concurrent_processes(tmp_path, kind):
+    """Test records of several processes are neither lost, torn nor removed by others."""
+    filename = str(tmp_path / "history")
+    workers, count = 4, 100
+    processes = [
+        multiprocessing.Process(target=write_records, args=(kind, filename, worker, count))
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    records = StorageFactory.create_storage(kind, filename).tail(10 ** 6)
+    expected = sorted(
+        ("Add", float(worker), float(index), float(part))
+        for worker in range(workers) for index in range(count)
+        for part in range(3 if index % 5 == 4 else 4)
+    )
+    assert sorted(records) == expected
+
+
+def test_binary_fixed_width(tmp_path):
+    """Test each binary record takes an opcode byte plus three float64 values."""
+    storage = BinaryStorage(str(tmp_path / "history.bin"))
+    storage.append_many(RECORDS)
+    assert RECORD_FORMAT.size == 25
+    assert os.path.getsize(storage.filename) == len(MAGIC) + 4 * 25
+    assert len(storage) == 4
+
+
+def test_binary_load_memmap(tmp_path):
+    """Test load opens the records as a read-only memory-mapped array."""
+    storage = BinaryStorage(str(tmp_path / "history.bin"))
+    assert len(storage.load()) == 0
+
+    storage.append_many(RECORDS)
+    data = storage.load()
+    assert isinstance(data, np.memmap)
+    assert not data.flags.writeable
+    assert data['opcode'].tolist() == [1, 2, 3, 4]
+    np.testing.assert_array_equal(data['result'], [r[3] for r in RECORDS])
+
+
+def test_binary_unknown_operation(tmp_path):
+    """Test operations without an opcode are rejected and nothing is written."""
+    storage = BinaryStorage(str(tmp_path / "history.bin"))
+    with pytest.raises(ValueError, match="has no opcode"):
+        storage.append(("Unknown", 2.0, 3.0, 8.0))
+    assert len(storage) == 0
+
+
+def test_binary_wrong_file(tmp_path):
+    """Test a file without the binary header is rejected."""
+    path = tmp_path / "history.csv"
+    path.write_text("Operation,Operand #1,Operand #2,Result\n", encoding='utf-8')
+    with pytest.raises(ValueError, match="is not a binary history file"):
+        BinaryStorage(str(path))
+
+
+def test_csv_header(tmp_path):
+    """Test a new CSV file starts with the header row."""
+    storage = CsvStorage(str(tmp_path / "history.csv"))
+    with open(storage.filename, encoding='utf-8') as file:
+        assert file.read() == "Operation,Operand #1,Operand #2,Result\n"
+
+
+@pytest.mark.parametrize("kind, expected_class, filename", [
+    ("csv", CsvStorage, "history.csv"),
+    ("BINARY", BinaryStorage, "history.bin"),
+    ("sqlite", SqliteStorage, "history.db"),
+    ("segmented", SegmentedStorage, "history_segments"),
+])
+def test_factory_defaults(tmp_path, monkeypatch, kind, expected_class, filename):
+    """Test the factory picks the backend and its default file name."""
+    monkeypatch.chdir(tmp_path)
+    storage = StorageFactory.create_storage(kind)
+    assert isinstance(storage, expected_class)
+    assert storage.filename == filename
+    storage.close()
+
+
+def test_factory_unknown():
+    """Test an unknown storage name raises a ValueError."""
+    with pytest.raises(ValueError, match="Storage does not exist."):
+        StorageFactory.create_storage("xml", "history.xml")
@@ -0,0 +1,103 @@
+"""
+Stress tests for using the calculator core from many threads at once.
+32 threads create operations, perform calculations and record them in
+the shared History; every record must end up in the file exactly once.
+"""
+
+import sys
+import threading
+from collections import Counter
+from unittest.mock import patch
+import pytest
+from app.calculation import Calculation
+from app.history_manager import History
+from app.operation_factory import OperationFactory
+from app.storage import StorageFactory
+
+THREADS = 32
+CALCULATIONS = 100
+
+
+@pytest.fixture(autouse=True)
+def frequent_switches():
+    """Switch threads far more often than usual, so races show up."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def run_threads(target):
+    """Start THREADS threads running target(index) together and wait for them."""
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def worker(index):
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_singleton_created_once():
+    """Test concurrent History() calls build one instance with one storage."""
+    instances = []
+    with patch.object(StorageFactory, 'create_storage',
+                      wraps=StorageFactory.create_storage) as create_storage:
+        run_threads(lambda index: instances.append(History()))
+    assert len({id(instance) for instance in instances}) == 1
+    create_storage.assert_called_once()
+    instances[0].close()
+
+
+@pytest.mark.parametrize("storage", ["csv", "binary", "sqlite"])
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_no_records_lost_or_duplicated(storage, write_behind):
+    """Test every thread's records are written exactly once."""
+    history = History(write_behind=write_behind, storage=storage)
+
+    def calculate(index):
+        for number in range(CALCULATIONS):
+            operation = OperationFactory.create_operation('add')
+            calculation = Calculation(operation, float(index), float(number))
+            history.add_to_history(operation, float(index), float(number),
+                                   calculation.perform_operation())
+
+    run_threads(calculate)
+    history.close()
+
+    expected = Counter(
+        ("Add", float(index), float(number), float(index + number))
+        for index in range(THREADS) for number in range(CALCULATIONS)
+    )
+    assert Counter(history.storage.iter_records()) == expected
+    assert history.counter == THREADS * CALCULATIONS
+    assert history.summary().count == THREADS * CALCULATIONS
+
+
+def test_concurrent_adds_and_undos():
+    """Test undos from many threads keep the file, counter and summary in step."""
+    history = History()
+
+    def add_and_undo(index):
+        operation = OperationFactory.create_operation('multiply')
+        for number in range(20):
+            history.add_to_history(operation, float(index), float(number), float(index * number))
+            if number % 2:
+                history.undo_last()
+
+    with patch('builtins.print'):
+        run_threads(add_and_undo)
+
+    records = list(history.storage.iter_records())
+    assert len(records) == history.counter == THREADS * 10
+    assert history.summary().count == THREADS * 10
+    assert history.summary().total == sum(record[3] for record in records)
@@ -0,0 +1,190 @@
+"""
+Tests for multi-level undo and redo. The journal is checked to rebuild the
+redo stack after a restart, to be compacted without losing entries, and to
+be cleared by a new calculation; the REPL's 'undo <count>' and 'redo <count>'
+commands are checked end to end.
+"""
+
+import logging
+from unittest.mock import patch
+import pytest
+from app.calculator import calculator, parse_count
+from app.history_manager import History
+from app.operations import Add, Multiply
+from app.undo_journal import UndoJournal
+
+RECORDS = [
+    ("Add", 1.0, 2.0, 3.0),
+    ("Multiply", 3.0, 4.0, 12.0),
+    ("Divide", 1.0, 4.0, 0.25),
+]
+
+
+def test_tombstone_and_restore(tmp_path):
+    """Test records are redone newest first, and nothing once the stack is empty."""
+    journal = UndoJournal(str(tmp_path / "journal"))
+    for record in RECORDS:
+        journal.tombstone(record)
+    assert len(journal) == 3
+    assert [journal.restore() for _ in range(4)] == [*reversed(RECORDS), None]
+    journal.close()
+
+
+def test_stack_rebuilt_from_journal(tmp_path):
+    """Test a new journal object replays the entries after the last clear."""
+    path = str(tmp_path / "journal")
+    journal = UndoJournal(path)
+    journal.tombstone(RECORDS[0])
+    journal.clear()
+    journal.tombstone(RECORDS[1])
+    journal.tombstone(RECORDS[2])
+    journal.restore()
+    journal.close()
+
+    journal = UndoJournal(path)
+    assert journal.restore() == RECORDS[1]
+    assert journal.restore() is None
+    journal.close()
+
+
+def test_clear_writes_nothing_when_empty(tmp_path):
+    """Test clearing an empty stack does not touch the file (it runs on every add)."""
+    path = tmp_path / "journal"
+    journal = UndoJournal(str(path))
+    journal.clear()
+    assert not path.exists()
+
+
+def test_partial_line_ignored(tmp_path):
+    """Test a line cut off by a crash is skipped when the stack is rebuilt."""
+    path = tmp_path / "journal"
+    path.write_bytes(b'["U", "Add", 1.0, 2.0, 3.0]\n["U", "Mul')
+    journal = UndoJournal(str(path))
+    assert journal.restore() == RECORDS[0]
+    journal.close()
+
+
+@pytest.mark.parametrize("content, stack", [
+    (b'["C"]\n["U", "Add", 1.0, 2.0, 3.0]\n', [RECORDS[0]]),
+    (b'["U", "Add", 1.0, 2.0, 3.0]\n["C"]\n', []),
+    (b'["U", "Add", 1.0, 2.0, 3.0]\n' * 2000 + b'["C"]\n' + b'["R"]\n' * 1000, []),
+])
+def test_clear_entries(tmp_path, content, stack):
+    """Test entries before the last clear entry are ignored, wherever it is."""
+    path = tmp_path / "journal"
+    path.write_bytes(content)
+    journal = UndoJournal(str(path))
+    assert journal._stack == stack
+    journal.close()
+
+
+@pytest.mark.parametrize("entries", [10, 5000])
+def test_compaction(tmp_path, entries):
+    """Test compaction keeps the same stack and leaves one line per record."""
+    path = tmp_path / "journal"
+    journal = UndoJournal(str(path), compact_after=64)
+    for index in range(entries):
+        journal.tombstone(("Add", float(index), 1.0, index + 1.0))
+        if index % 3 == 0:
+            journal.restore()
+    expected = list(journal._stack)
+    journal.close()  # Waits for a running compaction
+    journal.compact()
+
+    assert len(path.read_bytes().splitlines()) == len(expected)
+    journal = UndoJournal(str(path))
+    assert journal._stack == expected
+    journal.close()
+
+
+def test_two_journals_share_a_file(tmp_path):
+    """Test entries written after another journal compacted the file are not lost."""
+    path = str(tmp_path / "journal")
+    first, second = UndoJournal(path), UndoJournal(path)
+    first.tombstone(RECORDS[0])
+    second.tombstone(RECORDS[1])
+    first.compact()  # Replaces the file 'second' has open
+    second.tombstone(RECORDS[2])
+    first.close()
+    second.close()
+
+    journal = UndoJournal(path)
+    assert journal._stack == RECORDS
+    journal.close()
+
+
+@pytest.mark.parametrize("storage", ["csv", "binary", "sqlite", "segmented"])
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_redo_after_restart(tmp_path, monkeypatch, storage, write_behind):
+    """Test operations undone in one session can be redone in the next."""
+    monkeypatch.setenv("HISTORY_FILENAME", str(tmp_path / "history"))
+    history = History(write_behind=write_behind, storage=storage)
+    history.add_to_history(Add(), 1.0, 2.0, 3.0)
+    history.add_to_history(Multiply(), 3.0, 4.0, 12.0)
+    with patch('builtins.print'):
+        history.undo(2)
+    history.close()
+
+    History._instance = None
+    history = History(write_behind=write_behind, storage=storage)
+    with patch('builtins.print') as mock_print:
+        history.redo(3)
+    mock_print.assert_any_call("    3.0 Multiply 4.0 = 12.0")
+    mock_print.assert_called_with("Nothing to redo.")
+    history.flush()
+    assert history.storage.tail(5) == RECORDS[:2]
+    assert history.summary().count == 2
+    assert history.counter == 2  # Redone records can be undone again
+    history.close()
+
+
+def test_new_calculation_clears_redo():
+    """Test nothing can be redone after a new calculation."""
+    history = History()
+    history.add_to_history(Add(), 1.0, 2.0, 3.0)
+    with patch('builtins.print') as mock_print:
+        history.undo_last()
+        history.add_to_history(Multiply(), 3.0, 4.0, 12.0)
+        assert history.redo_last() is False
+    mock_print.assert_called_with("Nothing to redo.")
+    history.flush()
+    assert history.storage.tail(5) == [RECORDS[1]]
+
+
+def test_undo_more_than_recorded():
+    """Test 'undo <count>' stops once no operations are left."""
+    history = History()
+    history.add_to_history(Add(), 1.0, 2.0, 3.0)
+    with patch('builtins.print') as mock_print:
+        history.undo(3)
+    mock_print.assert_called_with("No operations to undo.")
+    assert history.counter == 0
+
+
+@pytest.mark.parametrize("command, count", [("undo", 1), ("redo 4", 4), ("undo  12", 12)])
+def test_parse_count(command, count):
+    """Test parsing valid undo and redo commands."""
+    assert parse_count(command) == count
+
+
+@pytest.mark.parametrize("command", ["undo 0", "redo -1", "undo 1 2", "redo x"])
+def test_parse_count_invalid(command):
+    """Test invalid counts raise ValueError with the usage."""
+    with pytest.raises(ValueError, match=r"Usage: (undo|redo) \[<count>\]"):
+        parse_count(command)
+
+
+@patch('builtins.input', side_effect=[
+    "add 1 2", "multiply 3 4", "undo 2", "redo", "redo 5", "undo x", "exit",
+])
+@patch('builtins.print')
+def test_repl_undo_redo(mock_print, mock_input, caplog):
+    """Test the REPL's undo and redo commands."""
+    with caplog.at_level(logging.CRITICAL):
+        calculator()
+    mock_print.assert_any_call("    1.0 Add 2.0 = 3.0")
+    mock_print.assert_any_call("Restored operation")
+    mock_print.assert_any_call("Nothing to redo.")
+    mock_print.assert_any_call("Invalid input. Usage: undo [<count>]")
+    History._instance = None  # The calculator closed its history on exit
+    assert History().storage.tail(5) == RECORDS[:2]